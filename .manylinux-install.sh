@@ -32,7 +32,9 @@ tox_env_map() {
         *"cp311"*) echo 'py311';;
         *"cp312"*) echo 'py312';;
         *"cp313"*) echo 'py313';;
+        *"cp314t"*) echo 'py314t';;
         *"cp314"*) echo 'py314';;
+        *"cp315t"*) echo 'py315t';;
         *"cp315"*) echo 'py315';;
         *) echo 'py';;
     esac
@@ -46,8 +48,10 @@ for PYBIN in /opt/python/*/bin; do
        [[ "${PYBIN}" == *"cp312/"* ]] || \
        [[ "${PYBIN}" == *"cp313/"* ]] || \
        [[ "${PYBIN}" == *"cp314/"* ]] || \
-       [[ "${PYBIN}" == *"cp315/"* ]] ; then
-        if [[ "${PYBIN}" == *"cp315/"* ]] ; then
+       [[ "${PYBIN}" == *"cp314t/"* ]] || \
+       [[ "${PYBIN}" == *"cp315/"* ]] || \
+       [[ "${PYBIN}" == *"cp315t/"* ]] ; then
+        if [[ "${PYBIN}" == *"cp315/"* ]] || [[ "${PYBIN}" == *"cp315t/"* ]] ; then
             "${PYBIN}/pip" install --pre -e /io/
             "${PYBIN}/pip" wheel /io/ --pre -w wheelhouse/
         else
@@ -0,0 +1,67 @@
+"""Stress the allocation of short-lived messages.
+
+Simulates request cycles which create and drop many messages, mostly
+copies of factory messages with a mapping per request, and measures how
+long collecting the garbage takes while many messages are alive: the C
+implementation does not track messages which only hold strings and
+numbers.  Run with::
+
+    python benchmarks/bench_alloc.py -o alloc.json
+"""
+import gc
+import time
+
+import pyperf
+
+from zope.i18nmessageid import message as messageid
+
+
+def request_cycle(loops, Message, messages):
+    start = time.perf_counter()
+    for i in range(loops):
+        mapping = {'name': 'value', 'count': i}
+        rendered = [Message(message, mapping=mapping) for message in messages]
+        for message in rendered:
+            message.mapping
+        del rendered
+    return time.perf_counter() - start
+
+
+def plain_churn(loops, Message):
+    start = time.perf_counter()
+    for i in range(loops):
+        messages = [Message(f'msgid-{j}', 'domain', 'Default')
+                    for j in range(100)]
+        del messages
+    return time.perf_counter() - start
+
+
+def collect(loops, Message):
+    messages = [Message(f'msgid-{i}', 'domain', 'Default')
+                for i in range(100000)]
+    start = time.perf_counter()
+    for _ in range(loops):
+        gc.collect()
+    elapsed = time.perf_counter() - start
+    del messages
+    return elapsed
+
+
+def main():
+    runner = pyperf.Runner()
+    impls = [('py', messageid.pyMessage), ('jit', messageid.jitMessage)]
+    if not issubclass(messageid.Message, messageid.pyMessage):
+        impls.insert(0, ('C', messageid.Message))
+    for tag, Message in impls:
+        factory = [Message(f'msgid-{i}', 'domain', 'Default ${name}')
+                   for i in range(100)]
+        runner.bench_time_func(f'request cycle [{tag}]', request_cycle,
+                               Message, factory, inner_loops=100)
+        runner.bench_time_func(f'plain churn [{tag}]', plain_churn, Message,
+                               inner_loops=100)
+        runner.bench_time_func(f'gc.collect, 100000 alive [{tag}]', collect,
+                               Message)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""Encode documents holding messages to JSON.
+
+Compares ``zope.i18nmessageid.json.dumps`` using the C encoder, which
+writes messages from their fields, with the Python encoder (selected by
+an option the C encoder does not support), which first replaces messages
+by their ``__json__()`` objects, and with ``json.dumps`` of the same
+document holding plain strings.  Run with::
+
+    python benchmarks/bench_json.py -o json.json
+"""
+import functools
+import json
+import time
+
+import pyperf
+
+from zope.i18nmessageid import Message
+from zope.i18nmessageid.json import dumps
+
+
+def encode(loops, dumps, document):
+    start = time.perf_counter()
+    for _ in range(loops):
+        dumps(document)
+    return time.perf_counter() - start
+
+
+def main():
+    runner = pyperf.Runner()
+    plain = {'rows': [{'id': i, 'title': f'title-{i}', 'tags': ['a', 'b']}
+                      for i in range(1000)]}
+    messages = {'rows': [{'id': i,
+                          'title': Message(f'title-{i}', 'domain',
+                                           mapping={'count': i}),
+                          'tags': ['a', 'b']}
+                         for i in range(1000)]}
+    compact = functools.partial(json.dumps, separators=(',', ':'))
+    runner.bench_time_func('json.dumps, plain strings', encode, compact,
+                           plain)
+    runner.bench_time_func('dumps, plain strings', encode, dumps, plain)
+    runner.bench_time_func('dumps, messages', encode, dumps, messages)
+    py_dumps = functools.partial(dumps, check_circular=True)
+    runner.bench_time_func('dumps, messages, Python encoder', encode,
+                           py_dumps, messages)
+
+
+if __name__ == '__main__':
+    main()
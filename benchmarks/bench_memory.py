@@ -0,0 +1,71 @@
+"""Memory footprint of messages, in bytes per instance.
+
+Measured with :mod:`tracemalloc` for the C implementation of ``Message``,
+when it is available, and for the Python ones.  The results are written in
+pyperf's JSON format, next to the timings of ``bench_message.py``::
+
+    python benchmarks/bench_memory.py --append memory.json
+"""
+import argparse
+import gc
+import sys
+import tracemalloc
+
+import pyperf
+from bench_message import implementations
+
+
+COUNT = 10000
+
+SCENARIOS = [
+    ('msgid only', lambda Message, msgid, mapping: Message(msgid)),
+    ('with domain', lambda Message, msgid, mapping: Message(msgid, 'domain')),
+    ('with default',
+     lambda Message, msgid, mapping: Message(msgid, 'domain', 'Default')),
+    ('with mapping',
+     lambda Message, msgid, mapping: Message(msgid, 'domain', None, mapping)),
+    ('with plural',
+     lambda Message, msgid, mapping: Message(
+         msgid, 'domain', 'Default', None, 'msgids', 'Defaults', 2)),
+]
+
+
+def bytes_per_instance(make, Message):
+    """Return the average size of the messages built by *make*.
+    """
+    msgids = [f'msgid-{i:06}' for i in range(COUNT)]
+    mapping = {'name': 'value'}
+    messages = [None] * COUNT
+    gc.collect()
+    tracemalloc.start()
+    try:
+        start = tracemalloc.get_traced_memory()[0]
+        for i, msgid in enumerate(msgids):
+            messages[i] = make(Message, msgid, mapping)
+        size = tracemalloc.get_traced_memory()[0] - start
+    finally:
+        tracemalloc.stop()
+    return size / COUNT
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        '--append', metavar='FILENAME',
+        help='append the results to this pyperf JSON file')
+    args = parser.parse_args(argv)
+
+    for tag, Message in implementations():
+        for name, make in SCENARIOS:
+            value = bytes_per_instance(make, Message)
+            name = f'memory {name} [{tag}]'
+            print(f'{name}: {value:.1f} bytes')
+            if args.append:
+                run = pyperf.Run(
+                    [value], metadata={'name': name, 'unit': 'byte'},
+                    collect_metadata=False)
+                pyperf.add_runs(args.append, pyperf.Benchmark([run]))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""Benchmarks for the hot paths of messages and message factories.
+
+Each benchmark runs against the C implementation of ``Message``, when it
+is available, and against the Python ones, the plain one and the one
+used when the C extension is missing: the benchmark names end with
+``[C]``, ``[py]`` or ``[jit]``.  The results are written in pyperf's
+JSON format, so that releases can be compared with
+``python -m pyperf compare_to``::
+
+    python benchmarks/bench_message.py -o speed.json
+"""
+import pickle
+
+import pyperf
+
+from zope.i18nmessageid import bulk
+from zope.i18nmessageid import message as messageid
+
+
+BENCHMARKS = [
+    ('construct', "Message('msgid', 'domain', 'Default')"),
+    ('construct with mapping',
+     "Message('msgid', 'domain', 'Default', mapping)"),
+    ('copy', "Message(message)"),
+    ('copy with mapping', "Message(message, mapping=mapping)"),
+    ('with_ mapping', "message.with_(mapping=mapping)"),
+    ('pickle', "dumps(message)"),
+    ('unpickle', "loads(pickled)"),
+    ('hash', "hash(Message(message))"),
+    ('dict lookup', "catalog[other]"),
+    ('equality', "message == other"),
+]
+
+
+def implementations():
+    """Return the ``(tag, class)`` pairs of the available implementations.
+    """
+    impls = [('py', messageid.pyMessage), ('jit', messageid.jitMessage)]
+    if not issubclass(messageid.Message, messageid.pyMessage):
+        impls.insert(0, ('C', messageid.Message))
+    return impls
+
+
+def namespace(Message):
+    message = Message('msgid', 'domain', 'Default')
+    other = Message('msgid', 'domain', 'Default')
+    ns = {
+        'Message': Message,
+        'message': message,
+        'other': other,
+        'mapping': {'name': 'value'},
+        'catalog': {Message(f'msgid-{i}'): i for i in range(100)},
+        'dumps': pickle.dumps,
+        'loads': pickle.loads,
+    }
+    ns['catalog'][message] = 'translation'
+    try:
+        ns['pickled'] = pickle.dumps(message)
+    except pickle.PicklingError:
+        # Only the active implementation can be pickled.
+        ns['pickled'] = None
+    return ns
+
+
+def main():
+    runner = pyperf.Runner()
+    runner.metadata['description'] = __doc__.splitlines()[0]
+    for tag, Message in implementations():
+        ns = namespace(Message)
+        for name, stmt in BENCHMARKS:
+            if ns['pickled'] is None and 'pickle' in name:
+                continue
+            runner.timeit(f'{name} [{tag}]', stmt, globals=ns)
+
+    # Without the C extension, messageid.Message is jitMessage.
+    tag = ('jit' if issubclass(messageid.Message, messageid.pyMessage)
+           else 'C')
+    factory = messageid.MessageFactory('domain')
+    interning = messageid.MessageFactory('domain', cache_size=1000)
+    ns = {'factory': factory, 'interning': interning,
+          'mapping': {'name': 'value'}}
+    runner.timeit(f'factory [{tag}]', "factory('msgid', 'Default')",
+                  globals=ns)
+    runner.timeit(f'factory with mapping [{tag}]',
+                  "factory('msgid', 'Default', mapping)", globals=ns)
+    runner.timeit(f'interning factory [{tag}]',
+                  "interning('msgid', 'Default')", globals=ns)
+
+    messages = [messageid.Message(f'msgid-{i}', f'domain-{i % 10}',
+                                  f'Default {i}') for i in range(1000)]
+    ns = {'bulk': bulk, 'messages': messages,
+          'columns': bulk.to_columns(messages)}
+    runner.timeit(f'1000 attribute reads [{tag}]',
+                  "[(m.domain, m.default, m.mapping, m.number)"
+                  " for m in messages]", globals=ns)
+    runner.timeit(f'1000 to_columns [{tag}]', "bulk.to_columns(messages)",
+                  globals=ns)
+    runner.timeit(f'1000 from_columns [{tag}]', "bulk.from_columns(columns)",
+                  globals=ns)
+
+
+if __name__ == '__main__':
+    main()
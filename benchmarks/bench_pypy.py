@@ -0,0 +1,47 @@
+"""Compare the Python implementations of messages.
+
+``pyMessage`` is the plain Python implementation, and ``jitMessage`` the
+one tuned for PyPy's JIT, which is used whenever the C extension is not,
+e.g. on PyPy.  The benchmark names end with ``[py]`` or ``[jit]``.  Run
+on PyPy with::
+
+    pypy3 benchmarks/bench_pypy.py -o pypy.json
+    python -m pyperf compare_to --table pypy.json
+"""
+import pyperf
+
+from zope.i18nmessageid import message as messageid
+
+
+BENCHMARKS = [
+    ('construct', "Message('msgid', 'domain', 'Default')"),
+    ('construct with mapping',
+     "Message('msgid', 'domain', 'Default', mapping)"),
+    ('construct plural',
+     "Message('msgid', 'domain', 'Default', msgid_plural='msgids',"
+     " default_plural='Defaults', number=2)"),
+    ('copy', "Message(message)"),
+    ('with_ mapping', "message.with_(mapping=mapping)"),
+    ('reduce', "message.__reduce__()"),
+    ('from_records', "Message.from_records(records)"),
+]
+
+
+def main():
+    runner = pyperf.Runner()
+    runner.metadata['description'] = __doc__.splitlines()[0]
+    for tag, Message in [('py', messageid.pyMessage),
+                         ('jit', messageid.jitMessage)]:
+        ns = {
+            'Message': Message,
+            'message': Message('msgid', 'domain', 'Default'),
+            'mapping': {'name': 'value'},
+            'records': [(f'msgid-{i}', 'domain', 'Default')
+                        for i in range(100)],
+        }
+        for name, stmt in BENCHMARKS:
+            runner.timeit(f'{name} [{tag}]', stmt, globals=ns)
+
+
+if __name__ == '__main__':
+    main()
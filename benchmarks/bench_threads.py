@@ -0,0 +1,60 @@
+"""Measure how creating and pickling messages scales with threads.
+
+Each thread builds, copies and reduces the same number of messages, so
+that the time of a run stays flat as threads are added when they really
+run in parallel, as on free-threaded builds of Python, and grows with
+their number when they are serialized by the GIL.  Run with::
+
+    python benchmarks/bench_threads.py -o threads.json
+"""
+import sys
+import threading
+import time
+
+import pyperf
+
+from zope.i18nmessageid.message import Message
+
+
+THREADS = (1, 2, 4, 8)
+
+
+def work(messages):
+    for message in messages:
+        copy = Message(message, mapping={'name': 'value'})
+        copy.mapping
+        copy.cache_key
+        copy.__reduce__()
+
+
+def run(loops, nthreads):
+    messages = [Message(f'msgid-{i}', 'domain', 'Default')
+                for i in range(100)]
+    barrier = threading.Barrier(nthreads + 1)
+
+    def target():
+        barrier.wait()
+        for _ in range(loops):
+            work(messages)
+
+    threads = [threading.Thread(target=target) for _ in range(nthreads)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start
+
+
+def main():
+    runner = pyperf.Runner()
+    gil = getattr(sys, '_is_gil_enabled', lambda: True)()
+    runner.metadata['gil'] = 'enabled' if gil else 'disabled'
+    for nthreads in THREADS:
+        runner.bench_time_func(f'{nthreads} threads', run, nthreads,
+                               inner_loops=100)
+
+
+if __name__ == '__main__':
+    main()
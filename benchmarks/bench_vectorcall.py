@@ -0,0 +1,34 @@
+"""Compare calling ``Message`` with the regular ``tp_new`` path.
+
+Calling the C ``Message`` type goes through its vectorcall entry point,
+while ``Message.__new__(Message, ...)`` still builds an argument tuple
+and keyword dict and parses them.  Run with::
+
+    python benchmarks/bench_vectorcall.py -o vectorcall.json
+"""
+import pyperf
+
+from zope.i18nmessageid.message import Message
+from zope.i18nmessageid.message import MessageFactory
+
+
+def main():
+    runner = pyperf.Runner()
+    factory = MessageFactory('domain')
+    setup = {'Message': Message, 'factory': factory}
+    for name, stmt in [
+        ('vectorcall positional', "Message('msgid', 'domain', 'Default')"),
+        ('tp_new positional',
+         "Message.__new__(Message, 'msgid', 'domain', 'Default')"),
+        ('vectorcall keywords',
+         "Message('msgid', domain='domain', default='Default')"),
+        ('tp_new keywords',
+         "Message.__new__(Message, 'msgid', domain='domain',"
+         " default='Default')"),
+        ('factory call', "factory('msgid', default='Default')"),
+    ]:
+        runner.timeit(name, stmt, globals=setup)
+
+
+if __name__ == '__main__':
+    main()
@@ -15,7 +15,15 @@
 """
 from zope.i18nmessageid.message import Message
 from zope.i18nmessageid.message import MessageFactory
+from zope.i18nmessageid.message import disable_stats
+from zope.i18nmessageid.message import enable_stats
+from zope.i18nmessageid.message import reset_stats
+from zope.i18nmessageid.message import stats
 
 
-#  import this as _ to create i18n messages in the zope domain
-ZopeMessageFactory = MessageFactory('zope')
+def __getattr__(name):
+    #  import ZopeMessageFactory as _ to create i18n messages in the zope
+    #  domain.  It is only created when first imported.
+    if name == 'ZopeMessageFactory':
+        return globals().setdefault(name, MessageFactory('zope'))
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
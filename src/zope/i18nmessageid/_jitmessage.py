@@ -0,0 +1,96 @@
+##############################################################################
+#
+# Copyright (c) 2026 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""Python implementation of messages tuned for PyPy's JIT.
+
+The C extension is not built on PyPy, where this implementation is used
+instead.  It behaves like `zope.i18nmessageid._pymessage.Message`, from
+which it derives, but its constructor first computes the value of every
+attribute, then stores each of them once, always in the same way,
+through the slot descriptors.  No ``__setattr__`` is involved, which
+simply refuses any change: the traces compiled by the JIT stay short and
+free of guards on the readonly flag.
+"""
+from sys import intern
+from types import MappingProxyType
+
+from zope.i18nmessageid import _pymessage
+from zope.i18nmessageid import message as _message
+
+
+__docformat__ = "reStructuredText"
+_marker = _pymessage._marker
+_Message = _pymessage.Message
+
+# Store the attributes through their slots, bypassing __setattr__.
+_set_domain = _Message.domain.__set__
+_set_default = _Message.default.__set__
+_set_mapping = _Message._mapping.__set__
+_set_msgid_plural = _Message.msgid_plural.__set__
+_set_default_plural = _Message.default_plural.__set__
+_set_number = _Message.number.__set__
+
+
+class Message(_Message):
+    __doc__ = _Message.__doc__
+
+    # Keep the name under which it was always defined, e.g. for pickles.
+    __module__ = 'zope.i18nmessageid.message'
+
+    __slots__ = ()
+
+    # Messages are readonly from the start: no need for a flag per message.
+    _readonly = True
+
+    def __new__(cls, ustr, domain=_marker, default=_marker, mapping=_marker,
+                msgid_plural=_marker, default_plural=_marker, number=_marker):
+        self = str.__new__(cls, ustr)
+        copied = isinstance(ustr, _Message)
+        if domain is _marker:
+            domain = ustr.domain if copied else None
+        elif type(domain) is str:
+            # Share one object per domain, e.g. among unpickled messages.
+            domain = intern(domain)
+        if default is _marker:
+            default = ustr.default if copied else None
+        if mapping is _marker:
+            mapping = ustr.mapping if copied else None
+        elif mapping is not None and type(mapping) is not dict:
+            # A plain dict is wrapped lazily, when first accessed.
+            mapping = MappingProxyType(mapping)
+        if msgid_plural is _marker:
+            msgid_plural = ustr.msgid_plural if copied else None
+        if default_plural is _marker:
+            default_plural = ustr.default_plural if copied else None
+        if number is _marker:
+            number = ustr.number if copied else None
+        elif number is not None and not isinstance(number, (int, float)):
+            raise TypeError('`number` should be an integer or a float')
+
+        _set_domain(self, domain)
+        _set_default(self, default)
+        _set_mapping(self, mapping)
+        _set_msgid_plural(self, msgid_plural)
+        _set_default_plural(self, default_plural)
+        _set_number(self, number)
+        if _message._stats_enabled:
+            _message._record(
+                domain, _message._COPIED if copied else _message._CREATED)
+        return self
+
+    def __setattr__(self, key, value):
+        """Message is immutable
+
+        It cannot be changed once the message id is created.
+        """
+        raise AttributeError('readonly attribute')
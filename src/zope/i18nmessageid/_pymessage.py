@@ -0,0 +1,245 @@
+##############################################################################
+#
+# Copyright (c) 2004 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""Python implementation of messages.
+
+It is the base of the implementation used when the C extension is not
+available, `zope.i18nmessageid._jitmessage.Message`, and is otherwise
+only imported when `zope.i18nmessageid.message.pyMessage` is accessed.
+"""
+import types
+from sys import intern
+
+from zope.i18nmessageid import message as _message
+
+
+__docformat__ = "reStructuredText"
+_marker = object()
+
+_RECORD_KEYS = frozenset([
+    'domain', 'default', 'mapping', 'msgid_plural', 'default_plural',
+    'number'])
+
+
+class Message(str):
+    """Message (Python implementation)
+
+    This is a string used as a message.  It has a domain attribute that is
+    its source domain, and a default attribute that is its default text to
+    display when there is no translation.  domain may be None meaning there is
+    no translation domain.  default may also be None, in which case the
+    message id itself implicitly serves as the default text.
+    """
+
+    # Keep the name under which it was always defined, e.g. for pickles.
+    __module__ = 'zope.i18nmessageid.message'
+
+    __slots__ = (
+        'domain', 'default', '_mapping', '_readonly',
+        'msgid_plural', 'default_plural', 'number', '_cache_key')
+
+    def __new__(cls, ustr, domain=_marker, default=_marker, mapping=_marker,
+                msgid_plural=_marker, default_plural=_marker, number=_marker):
+        self = str.__new__(cls, ustr)
+        copied = isinstance(ustr, self.__class__)
+        if copied:
+            self.domain = ustr.domain
+            self.default = ustr.default
+            self._mapping = ustr.mapping
+            self.msgid_plural = ustr.msgid_plural
+            self.default_plural = ustr.default_plural
+            self.number = ustr.number
+        else:
+            self.domain = None
+            self.default = None
+            self._mapping = None
+            self.msgid_plural = None
+            self.default_plural = None
+            self.number = None
+
+        if domain is not _marker:
+            # Share one object per domain, e.g. among unpickled messages.
+            self.domain = intern(domain) if type(domain) is str else domain
+        if default is not _marker:
+            self.default = default
+        if mapping is None:
+            self._mapping = None
+        elif type(mapping) is dict:
+            # Wrapped lazily, when first accessed: see `mapping`.
+            self._mapping = mapping
+        elif mapping is not _marker:
+            self._mapping = types.MappingProxyType(mapping)
+        if msgid_plural is not _marker:
+            self.msgid_plural = msgid_plural
+        if default_plural is not _marker:
+            self.default_plural = default_plural
+        if number is not _marker:
+            self.number = number
+
+        if self.number is not None and not isinstance(
+                self.number, (int, float)):
+            raise TypeError('`number` should be an integer or a float')
+
+        self._readonly = True
+        if _message._stats_enabled:
+            _message._record(
+                self.domain, _message._COPIED if copied else _message._CREATED)
+        return self
+
+    def with_(self, *, domain=_marker, default=_marker, mapping=_marker,
+              msgid_plural=_marker, default_plural=_marker, number=_marker):
+        """Return a copy of the message with some attributes replaced
+
+        The attributes which are not given are shared with this message.
+        """
+        # Pass only the given attributes, as keywords, so that subclasses
+        # overriding the constructor never see the marker.
+        given = {name: value for name, value in (
+            ('domain', domain), ('default', default), ('mapping', mapping),
+            ('msgid_plural', msgid_plural),
+            ('default_plural', default_plural), ('number', number))
+            if value is not _marker}
+        return self.__class__(self, **given)
+
+    def interpolate(self, mapping=None):
+        """Return the message's text with a mapping interpolated
+
+        The text is the default, or else the message id.  The mapping
+        defaults to the message's mapping.
+        """
+        from zope.i18nmessageid.interpolation import interpolate
+        text = self.default if self.default is not None else str(self)
+        return interpolate(text, self._mapping if mapping is None else mapping)
+
+    @classmethod
+    def from_records(cls, records, domain=_marker):
+        """Create a list of messages from an iterable of records
+
+        Each record is either a string, a tuple of the constructor's
+        positional arguments, or a dict with a 'msgid' key and the
+        constructor's keyword arguments.  If *domain* is given, the
+        messages are created in that domain, which the records then
+        leave out: their tuples hold the arguments following it.
+        """
+        messages = []
+        append = messages.append
+        if domain is _marker:
+            keys = _RECORD_KEYS
+            max_size = 7
+        else:
+            keys = _RECORD_KEYS - {'domain'}
+            max_size = 6
+        for record in records:
+            if isinstance(record, str):
+                append(cls(record) if domain is _marker
+                       else cls(record, domain))
+            elif isinstance(record, tuple):
+                if not 1 <= len(record) <= max_size:
+                    raise TypeError(
+                        f'message record takes 1 to {max_size} items'
+                        f' ({len(record)} given)')
+                append(cls(*record) if domain is _marker
+                       else cls(record[0], domain, *record[1:]))
+            elif isinstance(record, dict):
+                if 'msgid' not in record:
+                    raise TypeError("message record is missing 'msgid'")
+                kw = dict(record)
+                msgid = kw.pop('msgid')
+                unexpected = kw.keys() - keys
+                if unexpected:
+                    raise TypeError('message record has an unexpected key'
+                                    f' {unexpected.pop()!r}')
+                if domain is not _marker:
+                    kw['domain'] = domain
+                append(cls(msgid, **kw))
+            else:
+                raise TypeError(
+                    'message record must be a str, tuple or dict,'
+                    f' not {type(record).__name__}')
+        return messages
+
+    @property
+    def mapping(self):
+        # A plain dict mapping is kept as given, and only wrapped into a
+        # read-only proxy when first accessed: many messages are pickled
+        # or compared without their mapping ever being read.
+        mapping = self._mapping
+        if type(mapping) is dict:
+            mapping = types.MappingProxyType(mapping)
+            str.__setattr__(self, '_mapping', mapping)
+            if _message._stats_enabled:
+                _message._record(self.domain, _message._MAPPING_WRAPS)
+        return mapping
+
+    @property
+    def cache_key(self):
+        """Hashable key of all the message's attributes but its mapping
+
+        Unlike the message itself, which hashes and compares as its
+        message id, keys of messages which only differ by their domain or
+        default are different.  The key is a tuple, built when first
+        accessed and then kept; like any tuple, it is hashed again on each
+        lookup.
+        """
+        try:
+            return self._cache_key
+        except AttributeError:
+            key = (self.domain, str(self), self.default,
+                   self.msgid_plural, self.default_plural, self.number)
+            str.__setattr__(self, '_cache_key', key)
+            return key
+
+    def __setattr__(self, key, value):
+        """Message is immutable
+
+        It cannot be changed once the message id is created.
+        """
+        if getattr(self, '_readonly', False):
+            raise AttributeError('readonly attribute')
+        else:
+            return str.__setattr__(self, key, value)
+
+    def __getstate__(self):
+        # A copy: types.MappingProxyType is not picklable, and a plain
+        # dict not wrapped yet must stay read-only.
+        mapping = self._mapping
+        if mapping is not None:
+            mapping = dict(mapping)
+        return (
+            str(self),
+            self.domain,
+            self.default,
+            mapping,
+            self.msgid_plural,
+            self.default_plural,
+            self.number,
+        )
+
+    def __json__(self):
+        """Return the message as a JSON serializable array.
+
+        The array holds the arguments of the constructor, as reduced for
+        pickling, and is used by :mod:`zope.i18nmessageid.json`.
+        """
+        # Leave out trailing arguments which are None, to keep pickles
+        # of simple messages small.
+        state = self.__getstate__()
+        size = len(state)
+        while size > 1 and state[size - 1] is None:
+            size -= 1
+        return state[:size]
+
+    def __reduce__(self):
+        if _message._stats_enabled:
+            _message._record(self.domain, _message._PICKLED)
+        return self.__class__, self.__json__()
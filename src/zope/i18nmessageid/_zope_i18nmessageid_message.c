@@ -15,317 +15,2230 @@
 #include "Python.h"
 #include "structmember.h"
 
-static int is_message(PyTypeObject* type, PyObject* obj);  /* forward ref */
+/*
+ * Critical sections lock an object in free-threaded builds, and do nothing
+ * otherwise.  They are only available since Python 3.13.
+ */
+#ifndef Py_BEGIN_CRITICAL_SECTION
+#define Py_BEGIN_CRITICAL_SECTION(op) {
+#define Py_END_CRITICAL_SECTION() }
+#endif
+
+static struct PyModuleDef _zim_module;  /* forward ref */
+
+/*
+ *  Per-module state
+ */
+
+/* Indexes of the counters of the statistics, see zim_record */
+enum {
+    STATS_CREATED,
+    STATS_COPIED,
+    STATS_MAPPING_WRAPS,
+    STATS_PICKLED,
+    STATS_COUNT
+};
+
+typedef struct {
+    PyTypeObject*  message_type;
+    PyTypeObject*  factory_type;
+    /* Interned "_call", the Python method of factories, see Factory */
+    PyObject*      call_name;
+    /* Interned Message_arg_names, to match keywords by identity */
+    PyObject*      arg_names[7];
+    /* zope.i18nmessageid.interpolation.interpolate, imported when needed */
+    PyObject*      interpolate;
+    /* Statistics, only recorded when enabled: see _configure_stats */
+    int            stats_enabled;
+    /* Lists of STATS_COUNT counters by domain */
+    PyObject*      stats;
+    /* Call sampler(domain) every sample_every messages, if not 0 */
+    Py_ssize_t     sample_every;
+    Py_ssize_t     sample_countdown;
+    PyObject*      sampler;
+} _zim_module_state;
+
+/*
+ *  Macro to speed lookup of state members
+ */
+#define _zim_state(o) ((_zim_module_state*)PyModule_GetState(o))
+
+/*
+ * Return the state of the module defining 'type', or one of its bases
+ * for Python subclasses of Message.
+ */
+static _zim_module_state*
+_zim_type_state(PyTypeObject* type)
+{
+#if PY_VERSION_HEX >= 0x030B0000
+    PyObject* module = PyType_GetModuleByDef(type, &_zim_module);
+    if (module == NULL) { return NULL; }
+    return _zim_state(module);
+#else
+    PyObject* mro = type->tp_mro;
+    PyObject* module;
+    PyTypeObject* base;
+    Py_ssize_t i;
+
+    for (i = 0; mro != NULL && i < PyTuple_GET_SIZE(mro); i++) {
+        base = (PyTypeObject*)PyTuple_GET_ITEM(mro, i);
+        if (!PyType_HasFeature(base, Py_TPFLAGS_HEAPTYPE)) {
+            continue;
+        }
+        module = PyType_GetModule(base);
+        if (module == NULL) {
+            PyErr_Clear();
+        } else if (PyModule_GetDef(module) == &_zim_module) {
+            return _zim_state(module);
+        }
+    }
+    PyErr_Format(PyExc_TypeError,
+                 "%s is not a subclass of Message", type->tp_name);
+    return NULL;
+#endif
+}
+
+/*
+ * Count an event for messages of 'domain', and sample the creation of
+ * messages.  Only call it when state->stats_enabled is set.  Unhashable
+ * domains are all counted under "<unhashable>", as message.py does.
+ */
+static int
+zim_record(_zim_module_state* state, PyObject* domain, int event)
+{
+    PyObject* stats = state->stats;
+    PyObject* counts;
+    PyObject* count;
+    PyObject* sampler = NULL;
+    PyObject* result;
+    PyObject* key;
+    Py_ssize_t i;
+    int status = 0;
+
+    if (stats == NULL) { return 0; }
+    if (domain == NULL) {
+        domain = Py_None;
+    }
+    if (PyObject_Hash(domain) != -1) {
+        key = domain;
+        Py_INCREF(key);
+    } else if (PyErr_ExceptionMatches(PyExc_TypeError)) {
+        PyErr_Clear();
+        key = PyUnicode_InternFromString("<unhashable>");
+        if (key == NULL) { return -1; }
+    } else {
+        return -1;
+    }
+    Py_BEGIN_CRITICAL_SECTION(stats);
+    counts = PyDict_GetItemWithError(stats, key);
+    if (counts == NULL && !PyErr_Occurred()) {
+        counts = PyList_New(STATS_COUNT);
+        if (counts != NULL) {
+            for (i = 0; i < STATS_COUNT; i++) {
+                PyList_SET_ITEM(counts, i, PyLong_FromLong(0));
+            }
+            if (PyDict_SetItem(stats, key, counts) < 0) {
+                Py_CLEAR(counts);
+            } else {
+                /* Now owned by the dict */
+                Py_DECREF(counts);
+            }
+        }
+    }
+    if (counts == NULL) {
+        status = -1;
+    } else {
+        count = PyLong_FromSsize_t(
+            PyLong_AsSsize_t(PyList_GET_ITEM(counts, event)) + 1);
+        if (count == NULL) {
+            status = -1;
+        } else {
+            PyList_SetItem(counts, event, count);
+        }
+    }
+    if (status == 0 && event <= STATS_COPIED && state->sample_every > 0
+            && --state->sample_countdown <= 0) {
+        state->sample_countdown = state->sample_every;
+        sampler = state->sampler;
+        Py_XINCREF(sampler);
+    }
+    Py_END_CRITICAL_SECTION();
+
+    if (sampler != NULL) {
+        result = PyObject_CallOneArg(sampler, key);
+        Py_DECREF(sampler);
+        if (result == NULL) {
+            status = -1;
+        } else {
+            Py_DECREF(result);
+        }
+    }
+    Py_DECREF(key);
+    return status;
+}
 
 /*
  *  Message type subclasses str
+ *
+ *  Most messages only carry a domain and maybe a default: the attributes
+ *  which are rarely set live in a side block, only allocated when needed.
  */
 
 typedef struct
 {
-    PyUnicodeObject base;
-    PyObject* domain;
-    PyObject* default_;
     PyObject* mapping;
     PyObject* value_plural;
     PyObject* default_plural;
     PyObject* number;
+    PyObject* cache_key;
+} Message_extras;
+
+typedef struct
+{
+    PyUnicodeObject base;
+    PyObject* domain;
+    PyObject* default_;
+    Message_extras* extras;
 } Message;
 
+#define Message_EXTRA(self, field) \
+    ((self)->extras == NULL ? NULL : (self)->extras->field)
+
+/*
+ * The attributes of a message never change, but its mapping gets wrapped,
+ * and its cache key and side block are set, when first accessed.  In
+ * free-threaded builds, other threads read the side block under the
+ * message's lock, using Message_get_extras.
+ */
+
+/*
+ * Messages whose attributes are all strings or numbers cannot be part of
+ * a reference cycle: they are not tracked by the garbage collector, which
+ * then has fewer objects to traverse.
+ */
+static int
+Message_is_atomic_field(PyObject* field)
+{
+    return (field == NULL || PyUnicode_CheckExact(field) ||
+            PyLong_CheckExact(field) || PyFloat_CheckExact(field));
+}
+
+static void
+Message_maybe_untrack(Message* self)
+{
+    Message_extras* extras = self->extras;
+
+    if (Message_is_atomic_field(self->domain) &&
+        Message_is_atomic_field(self->default_) &&
+        (extras == NULL ||
+         (extras->mapping == NULL &&
+          Message_is_atomic_field(extras->value_plural) &&
+          Message_is_atomic_field(extras->default_plural) &&
+          Message_is_atomic_field(extras->number)))) {
+        PyObject_GC_UnTrack(self);
+    }
+}
+
+/*
+ *  Message type slot handlers
+ */
+
+static int
+Message_traverse(PyObject* pyobj_self, visitproc visit, void* arg)
+{
+    PyTypeObject* tp = Py_TYPE(pyobj_self);
+    Py_VISIT(tp);
+    Message* self = (Message*)pyobj_self;
+    Py_VISIT(self->domain);
+    Py_VISIT(self->default_);
+    if (self->extras != NULL) {
+        Py_VISIT(self->extras->mapping);
+        Py_VISIT(self->extras->value_plural);
+        Py_VISIT(self->extras->default_plural);
+        Py_VISIT(self->extras->number);
+        Py_VISIT(self->extras->cache_key);
+    }
+    return 0;
+}
+
+static int
+Message_clear(PyObject* pyobj_self)
+{
+    Message* self = (Message*)pyobj_self;
+    Message_extras* extras = self->extras;
+    Py_CLEAR(self->domain);
+    Py_CLEAR(self->default_);
+    if (extras != NULL) {
+        self->extras = NULL;
+        Py_CLEAR(extras->mapping);
+        Py_CLEAR(extras->value_plural);
+        Py_CLEAR(extras->default_plural);
+        Py_CLEAR(extras->number);
+        Py_CLEAR(extras->cache_key);
+        PyMem_Free(extras);
+    }
+    return 0;
+}
+
+static void
+Message_dealloc(PyObject* self)
+{
+    PyTypeObject* tp = Py_TYPE(self);
+    PyObject_GC_UnTrack(self);
+    Message_clear(self);
+    PyUnicode_Type.tp_dealloc((PyObject*)self);
+    Py_DECREF(tp);
+}
+
+/*
+ * A message keeps a plain dict mapping as given, and only wraps it into a
+ * read-only proxy when the 'mapping' attribute is first accessed: many
+ * messages are pickled or compared without their mapping ever being read.
+ */
+static int
+Message_wrap_mapping(Message* self)
+{
+    _zim_module_state* state;
+    PyObject* mapping;
+    PyObject* proxy;
+    int result = 0;
+    int wrapped = 0;
+
+    Py_BEGIN_CRITICAL_SECTION(self);
+    mapping = Message_EXTRA(self, mapping);
+    if (mapping != NULL && PyDict_CheckExact(mapping)) {
+        proxy = PyDictProxy_New(mapping);
+        if (proxy == NULL) {
+            result = -1;
+        } else {
+            /* The proxy keeps the dict alive for concurrent readers */
+            Py_SETREF(self->extras->mapping, proxy);
+            wrapped = 1;
+        }
+    }
+    Py_END_CRITICAL_SECTION();
+
+    if (wrapped) {
+        state = _zim_type_state(Py_TYPE(self));
+        if (state == NULL) { return -1; }
+        if (state->stats_enabled) {
+            result = zim_record(state, self->domain, STATS_MAPPING_WRAPS);
+        }
+    }
+    return result;
+}
+
+/*
+ * Copy the side block of a message into 'extras', as borrowed references
+ * which live as long as the message.
+ */
+static void
+Message_get_extras(Message* self, Message_extras* extras)
+{
+    Py_BEGIN_CRITICAL_SECTION(self);
+    if (self->extras == NULL) {
+        memset(extras, 0, sizeof(Message_extras));
+    } else {
+        *extras = *self->extras;
+    }
+    Py_END_CRITICAL_SECTION();
+}
+
+/*
+ * Create a new message of the given type.  NULL arguments were not given:
+ * they are copied from 'value' when it is a message, else left unset.
+ * None is stored as NULL for the extra attributes, so that passing None
+ * explicitly does not allocate the side block.
+ */
+static PyObject*
+Message_create(PyTypeObject* type, PyObject* value,
+               PyObject* domain, PyObject* default_, PyObject* mapping,
+               PyObject* value_plural, PyObject* default_plural,
+               PyObject* number)
+{
+    _zim_module_state* state;
+    PyObject *new_args;
+    PyObject *new_str;
+    Message  *new_msg;
+    Message  *other = NULL;
+    /* Borrowed references, except for 'proxy' */
+    Message_extras extras = {NULL, NULL, NULL, NULL, NULL};
+    PyObject *proxy = NULL;
+
+    if (number != NULL && Py_None != number) {
+        if (!(PyLong_Check(number) || PyFloat_Check(number))) {
+            PyErr_SetString(PyExc_TypeError,
+                            "`number` should be an integer or a float");
+            return NULL;
+        }
+    }
+
+    state = _zim_type_state(type);
+    if (state == NULL) { return NULL; }
+
+    if (PyObject_TypeCheck(value, state->message_type)) {
+        /* value is a Message so we copy it and use it as base */
+        other = (Message*)value;
+        if (mapping == NULL && Message_wrap_mapping(other) < 0) {
+            return NULL;
+        }
+        if (domain == NULL) {
+            domain = other->domain;
+        }
+        if (default_ == NULL) {
+            default_ = other->default_;
+        }
+        Message_get_extras(other, &extras);
+        extras.cache_key = NULL;
+    }
+
+    if (mapping == Py_None) {
+        extras.mapping = NULL;
+    } else if (mapping != NULL && PyDict_CheckExact(mapping)) {
+        /* Wrapped lazily, when first accessed: see Message_wrap_mapping */
+        extras.mapping = mapping;
+    } else if (mapping != NULL) {
+        /* Ensure that our mapping is immutable */
+        proxy = PyDictProxy_New(mapping);
+        if (proxy == NULL) { return NULL; }
+        extras.mapping = proxy;
+    }
+
+    if (value_plural != NULL) {
+        extras.value_plural = value_plural == Py_None ? NULL : value_plural;
+    }
+
+    if (default_plural != NULL) {
+        extras.default_plural =
+            default_plural == Py_None ? NULL : default_plural;
+    }
+
+    if (number != NULL) {
+        extras.number = number == Py_None ? NULL : number;
+    }
+
+    new_args = PyTuple_Pack(1, value);
+    if (new_args == NULL) {
+        Py_XDECREF(proxy);
+        return NULL;
+    }
+
+    new_str = PyUnicode_Type.tp_new(type, new_args, NULL);
+    Py_DECREF(new_args);
+    if (new_str == NULL) {
+        Py_XDECREF(proxy);
+        return NULL;
+    }
+
+    new_msg = (Message*)new_str;
+    Py_XINCREF(domain);
+    if (domain != NULL && PyUnicode_CheckExact(domain)) {
+        /* Share one object per domain, e.g. among unpickled messages */
+        PyUnicode_InternInPlace(&domain);
+    }
+    new_msg->domain = domain;
+    Py_XINCREF(default_);
+    new_msg->default_ = default_;
+    new_msg->extras = NULL;
+
+    if (extras.mapping != NULL || extras.value_plural != NULL ||
+        extras.default_plural != NULL || extras.number != NULL) {
+        new_msg->extras = PyMem_Malloc(sizeof(Message_extras));
+        if (new_msg->extras == NULL) {
+            Py_XDECREF(proxy);
+            Py_DECREF(new_msg);
+            return PyErr_NoMemory();
+        }
+        Py_XINCREF(extras.mapping);
+        Py_XINCREF(extras.value_plural);
+        Py_XINCREF(extras.default_plural);
+        Py_XINCREF(extras.number);
+        *new_msg->extras = extras;
+    }
+
+    Py_XDECREF(proxy);
+    if (type == state->message_type) {
+        /* Instances of subclasses may have a __dict__ */
+        Message_maybe_untrack(new_msg);
+    }
+    if (state->stats_enabled &&
+        zim_record(state, new_msg->domain,
+                   other == NULL ? STATS_CREATED : STATS_COPIED) < 0) {
+        Py_DECREF(new_msg);
+        return NULL;
+    }
+    return (PyObject*)new_msg;
+}
+
+static const char* Message_arg_names[] = {
+    "value", "domain", "default", "mapping",
+    "msgid_plural", "default_plural", "number", NULL
+};
+
+static PyObject*
+Message_new(PyTypeObject* type, PyObject* args, PyObject* kwds)
+{
+    PyObject *value;
+    PyObject *domain = NULL;
+    PyObject *default_ = NULL;
+    PyObject *mapping = NULL;
+    PyObject *value_plural = NULL;
+    PyObject *default_plural = NULL;
+    PyObject *number = NULL;
+
+    if (!PyArg_ParseTupleAndKeywords(
+        args, kwds, "O|OOOOOO", (char**)Message_arg_names,
+        &value, &domain, &default_, &mapping,
+        &value_plural, &default_plural, &number)
+    ) { return NULL; }
+
+    return Message_create(type, value, domain, default_, mapping,
+                          value_plural, default_plural, number);
+}
+
+/*
+ * Whether 'type' is a subclass overriding __new__ or __init__, which the
+ * shortcuts creating messages with Message_create would skip.
+ */
+#define Message_CUSTOM_INIT(type) \
+    ((type)->tp_new != Message_new || \
+     (type)->tp_init != PyBaseObject_Type.tp_init)
+
+/*
+ * Call 'type' with 'value' and the keyword arguments whose fields, in
+ * the order of Message_arg_names after 'value', are not NULL.
+ */
+static PyObject*
+Message_call(PyTypeObject* type, PyObject* value, PyObject* const* fields)
+{
+    PyObject* args;
+    PyObject* kwargs;
+    PyObject* result;
+    int i;
+
+    kwargs = PyDict_New();
+    if (kwargs == NULL) { return NULL; }
+    for (i = 0; i < 6; i++) {
+        if (fields[i] != NULL &&
+            PyDict_SetItemString(kwargs, Message_arg_names[i + 1],
+                                 fields[i]) < 0) {
+            Py_DECREF(kwargs);
+            return NULL;
+        }
+    }
+    args = PyTuple_Pack(1, value);
+    if (args == NULL) {
+        Py_DECREF(kwargs);
+        return NULL;
+    }
+    result = PyObject_Call((PyObject*)type, args, kwargs);
+    Py_DECREF(args);
+    Py_DECREF(kwargs);
+    return result;
+}
+
+/*
+ * Vectorcall entry point for calling the type: avoids building the argument
+ * tuple and keyword dict, and the PyArg_ParseTupleAndKeywords overhead.
+ */
+
+static PyObject*
+Message_vectorcall(PyObject* callable, PyObject* const* args,
+                   size_t nargsf, PyObject* kwnames)
+{
+    PyTypeObject* type = (PyTypeObject*)callable;
+    _zim_module_state* state = NULL;
+    PyObject* fields[7] = {NULL, NULL, NULL, NULL, NULL, NULL, NULL};
+    PyObject* name;
+    Py_ssize_t nargs = PyVectorcall_NARGS(nargsf);
+    Py_ssize_t nkwargs = kwnames == NULL ? 0 : PyTuple_GET_SIZE(kwnames);
+    Py_ssize_t i;
+    Py_ssize_t j;
+
+    if (Message_CUSTOM_INIT(type)) {
+        /* A subclass overriding __new__ or __init__: do a regular call */
+        PyObject* tuple;
+        PyObject* kwargs = NULL;
+        PyObject* result;
+
+        tuple = PyTuple_New(nargs);
+        if (tuple == NULL) { return NULL; }
+        for (i = 0; i < nargs; i++) {
+            Py_INCREF(args[i]);
+            PyTuple_SET_ITEM(tuple, i, args[i]);
+        }
+        if (nkwargs > 0) {
+            kwargs = PyDict_New();
+            if (kwargs == NULL) {
+                Py_DECREF(tuple);
+                return NULL;
+            }
+            for (i = 0; i < nkwargs; i++) {
+                if (PyDict_SetItem(kwargs, PyTuple_GET_ITEM(kwnames, i),
+                                   args[nargs + i]) < 0) {
+                    Py_DECREF(tuple);
+                    Py_DECREF(kwargs);
+                    return NULL;
+                }
+            }
+        }
+        result = PyType_Type.tp_call(callable, tuple, kwargs);
+        Py_DECREF(tuple);
+        Py_XDECREF(kwargs);
+        return result;
+    }
+
+    if (nargs > 7) {
+        PyErr_Format(PyExc_TypeError,
+                     "Message() takes at most 7 arguments (%zd given)",
+                     nargs + nkwargs);
+        return NULL;
+    }
+    for (i = 0; i < nargs; i++) {
+        fields[i] = args[i];
+    }
+
+    if (nkwargs > 0) {
+        state = (_zim_module_state*)PyType_GetModuleState(type);
+        if (state == NULL) { return NULL; }
+    }
+    for (i = 0; i < nkwargs; i++) {
+        name = PyTuple_GET_ITEM(kwnames, i);
+        /* Keyword names are usually interned: try identity first */
+        for (j = 0; j < 7; j++) {
+            if (name == state->arg_names[j]) {
+                break;
+            }
+        }
+        if (j == 7) {
+            for (j = 0; Message_arg_names[j] != NULL; j++) {
+                if (PyUnicode_CompareWithASCIIString(
+                        name, Message_arg_names[j]) == 0) {
+                    break;
+                }
+            }
+        }
+        if (Message_arg_names[j] == NULL) {
+            PyErr_Format(PyExc_TypeError,
+                         "'%U' is an invalid keyword argument for Message()",
+                         name);
+            return NULL;
+        }
+        if (fields[j] != NULL) {
+            PyErr_Format(PyExc_TypeError,
+                         "argument for Message() given by name ('%s') "
+                         "and position (%zd)", Message_arg_names[j], j + 1);
+            return NULL;
+        }
+        fields[j] = args[nargs + i];
+    }
+
+    if (fields[0] == NULL) {
+        PyErr_SetString(PyExc_TypeError,
+                        "Message() missing required argument 'value' (pos 1)");
+        return NULL;
+    }
+
+    return Message_create(type, fields[0], fields[1], fields[2], fields[3],
+                          fields[4], fields[5], fields[6]);
+}
+
+/*
+ * Message type methods
+ */
+
+/* Return the constructor arguments of a message, leaving out trailing
+ * arguments which are None.
+ */
+static PyObject*
+Message_arguments(Message* self)
+{
+    PyObject *args[7];
+    Message_extras extras;
+    PyObject *mapping;
+    PyObject *reduced;
+    Py_ssize_t size;
+    Py_ssize_t i;
+
+    args[0] = PyObject_CallFunctionObjArgs(
+        (PyObject*)&PyUnicode_Type, self, NULL);
+    if (args[0] == NULL) { return NULL;}
+
+    Message_get_extras(self, &extras);
+    args[1] = self->domain ? self->domain : Py_None;
+    args[2] = self->default_ ? self->default_ : Py_None;
+    mapping = extras.mapping;
+    if (mapping == NULL) {
+        args[3] = Py_None;
+        Py_INCREF(Py_None);
+    } else {
+        /* A copy, the message's own mapping being read-only, even when
+         * it is not wrapped yet */
+        args[3] = PyDict_CheckExact(mapping) ?
+            PyDict_Copy(mapping) :
+            PyObject_CallFunctionObjArgs(
+                (PyObject*)&PyDict_Type, mapping, NULL);
+        if (args[3] == NULL) {
+            Py_DECREF(args[0]);
+            return NULL;
+        }
+    }
+    args[4] = extras.value_plural;
+    args[5] = extras.default_plural;
+    args[6] = extras.number;
+    for (i = 4; i < 7; i++) {
+        if (args[i] == NULL) {
+            args[i] = Py_None;
+        }
+    }
+
+    size = 7;
+    while (size > 1 && args[size - 1] == Py_None) {
+        size--;
+    }
+
+    reduced = PyTuple_New(size);
+    if (reduced == NULL) {
+        Py_DECREF(args[0]);
+        Py_DECREF(args[3]);
+        return NULL;
+    }
+    for (i = 0; i < size; i++) {
+        /* args[0] and args[3] are new references, the others borrowed */
+        if (i != 0 && i != 3) {
+            Py_INCREF(args[i]);
+        }
+        PyTuple_SET_ITEM(reduced, i, args[i]);
+    }
+    if (size <= 3) {
+        Py_DECREF(args[3]);
+    }
+
+    return reduced;
+}
+
+static char Message_reduce__doc__[] = (
+    "Reduce messages to a serializable form\n\n"
+    "Notably, for use in pickling.  Trailing arguments which are None\n"
+    "are left out, to keep pickles of simple messages small."
+);
+
+static PyObject*
+Message_reduce(Message* self)
+{
+    _zim_module_state *state;
+    PyObject *reduced;
+    PyObject *result;
+
+    state = _zim_type_state(Py_TYPE(self));
+    if (state == NULL) { return NULL; }
+    if (state->stats_enabled &&
+        zim_record(state, self->domain, STATS_PICKLED) < 0) {
+        return NULL;
+    }
+
+    reduced = Message_arguments(self);
+    if (reduced == NULL) { return NULL; }
+    result = PyTuple_Pack(2, (PyObject*)Py_TYPE(self), reduced);
+    Py_DECREF(reduced);
+    return result;
+}
+
+static char Message_json__doc__[] = (
+    "Return the message as a JSON serializable array\n\n"
+    "The array holds the arguments of the constructor, as reduced for\n"
+    "pickling, and is used by zope.i18nmessageid.json."
+);
+
+static char Message_from_records__doc__[] = (
+    "Create a list of messages from an iterable of records\n\n"
+    "Each record is either a string, a tuple of the constructor's\n"
+    "positional arguments, or a dict with a 'msgid' key and the\n"
+    "constructor's keyword arguments.  If 'domain' is given, the messages\n"
+    "are created in that domain, which the records then leave out: their\n"
+    "tuples hold the arguments following it."
+);
+
+static char* Message_record_keys[] = {
+    "msgid", "domain", "default", "mapping",
+    "msgid_plural", "default_plural", "number", NULL
+};
+
+/*
+ * Create a message from 'record', in 'domain' unless it is NULL, in which
+ * case the record may set the domain.
+ */
+static PyObject*
+Message_from_record(PyTypeObject* type, PyObject* record, PyObject* domain)
+{
+    PyObject* fields[7] = {NULL, NULL, NULL, NULL, NULL, NULL, NULL};
+    PyObject* key;
+    PyObject* item;
+    Py_ssize_t pos = 0;
+    Py_ssize_t size;
+    Py_ssize_t max_size = domain == NULL ? 7 : 6;
+    Py_ssize_t i;
+
+    if (PyUnicode_Check(record)) {
+        fields[0] = record;
+    } else if (PyTuple_Check(record)) {
+        size = PyTuple_GET_SIZE(record);
+        if (size < 1 || size > max_size) {
+            PyErr_Format(PyExc_TypeError,
+                         "message record takes 1 to %zd items (%zd given)",
+                         max_size, size);
+            return NULL;
+        }
+        fields[0] = PyTuple_GET_ITEM(record, 0);
+        for (i = 1; i < size; i++) {
+            /* Leave the domain's field out when it is given */
+            fields[i + 7 - max_size] = PyTuple_GET_ITEM(record, i);
+        }
+    } else if (PyDict_Check(record)) {
+        /* Match the keys without creating strings for the names */
+        while (PyDict_Next(record, &pos, &key, &item)) {
+            for (i = 0; Message_record_keys[i] != NULL; i++) {
+                if (PyUnicode_Check(key) &&
+                    PyUnicode_CompareWithASCIIString(
+                        key, Message_record_keys[i]) == 0) {
+                    fields[i] = item;
+                    break;
+                }
+            }
+            if (Message_record_keys[i] == NULL ||
+                    (i == 1 && domain != NULL)) {
+                PyErr_Format(PyExc_TypeError,
+                             "message record has an unexpected key %R", key);
+                return NULL;
+            }
+        }
+        if (fields[0] == NULL) {
+            PyErr_SetString(PyExc_TypeError,
+                            "message record is missing 'msgid'");
+            return NULL;
+        }
+    } else {
+        PyErr_Format(PyExc_TypeError,
+                     "message record must be a str, tuple or dict, not %.200s",
+                     Py_TYPE(record)->tp_name);
+        return NULL;
+    }
+    if (domain != NULL) {
+        fields[1] = domain;
+    }
+
+    if (Message_CUSTOM_INIT(type)) {
+        return Message_call(type, fields[0], fields + 1);
+    }
+    return Message_create(type, fields[0], fields[1], fields[2], fields[3],
+                          fields[4], fields[5], fields[6]);
+}
+
+static PyObject*
+Message_from_records(PyTypeObject* type, PyObject* const* args,
+                     Py_ssize_t nargs, PyObject* kwnames)
+{
+    PyObject *records;
+    PyObject *domain = NULL;
+    PyObject *iterator;
+    PyObject *record;
+    PyObject *message;
+    PyObject *result;
+
+    if (kwnames != NULL && PyTuple_GET_SIZE(kwnames) > 0) {
+        if (nargs != 1 || PyTuple_GET_SIZE(kwnames) != 1 ||
+            PyUnicode_CompareWithASCIIString(
+                PyTuple_GET_ITEM(kwnames, 0), "domain") != 0) {
+            PyErr_SetString(PyExc_TypeError,
+                            "from_records() takes 'records' and 'domain'"
+                            " arguments");
+            return NULL;
+        }
+        domain = args[1];
+    } else if (nargs < 1 || nargs > 2) {
+        PyErr_Format(PyExc_TypeError,
+                     "from_records() takes 1 or 2 arguments (%zd given)",
+                     nargs);
+        return NULL;
+    } else if (nargs == 2) {
+        domain = args[1];
+    }
+    records = args[0];
+
+    result = PyList_New(0);
+    if (result == NULL) { return NULL; }
+
+    iterator = PyObject_GetIter(records);
+    if (iterator == NULL) {
+        Py_DECREF(result);
+        return NULL;
+    }
+
+    while ((record = PyIter_Next(iterator)) != NULL) {
+        message = Message_from_record(type, record, domain);
+        Py_DECREF(record);
+        if (message == NULL || PyList_Append(result, message) < 0) {
+            Py_XDECREF(message);
+            Py_DECREF(iterator);
+            Py_DECREF(result);
+            return NULL;
+        }
+        Py_DECREF(message);
+    }
+    Py_DECREF(iterator);
+
+    if (PyErr_Occurred()) {
+        Py_DECREF(result);
+        return NULL;
+    }
+    return result;
+}
+
+static char Message_with___doc__[] = (
+    "Return a copy of the message with some attributes replaced\n\n"
+    "Accepts the keyword arguments 'domain', 'default', 'mapping',\n"
+    "'msgid_plural', 'default_plural' and 'number'.  The other attributes\n"
+    "are shared with this message."
+);
+
+static PyObject*
+Message_with_(Message* self, PyObject* const* args, Py_ssize_t nargs,
+              PyObject* kwnames)
+{
+    /* Same order as Message_create's arguments, after 'value' */
+    static const char* names[] = {
+        "domain", "default", "mapping",
+        "msgid_plural", "default_plural", "number", NULL
+    };
+    PyObject* fields[6] = {NULL, NULL, NULL, NULL, NULL, NULL};
+    PyObject* name;
+    Py_ssize_t nkwargs;
+    Py_ssize_t i;
+    Py_ssize_t j;
+
+    if (nargs != 0) {
+        PyErr_SetString(PyExc_TypeError,
+                        "with_() takes no positional arguments");
+        return NULL;
+    }
+
+    nkwargs = kwnames == NULL ? 0 : PyTuple_GET_SIZE(kwnames);
+    for (i = 0; i < nkwargs; i++) {
+        name = PyTuple_GET_ITEM(kwnames, i);
+        for (j = 0; names[j] != NULL; j++) {
+            if (PyUnicode_CompareWithASCIIString(name, names[j]) == 0) {
+                fields[j] = args[i];
+                break;
+            }
+        }
+        if (names[j] == NULL) {
+            PyErr_Format(PyExc_TypeError,
+                         "with_() got an unexpected keyword argument %R",
+                         name);
+            return NULL;
+        }
+    }
+
+    if (Message_CUSTOM_INIT(Py_TYPE(self))) {
+        return Message_call(Py_TYPE(self), (PyObject*)self, fields);
+    }
+    return Message_create(Py_TYPE(self), (PyObject*)self,
+                          fields[0], fields[1], fields[2],
+                          fields[3], fields[4], fields[5]);
+}
+
+static char Message_interpolate__doc__[] = (
+    "Return the message's text with a mapping interpolated\n\n"
+    "The text is the default, or else the message id.  The mapping\n"
+    "defaults to the message's mapping."
+);
+
+static PyObject*
+Message_interpolate(Message* self, PyTypeObject* defining_class,
+                    PyObject* const* args, Py_ssize_t nargs,
+                    PyObject* kwnames)
+{
+    _zim_module_state* state;
+    Message_extras extras;
+    PyObject* mapping = NULL;
+    PyObject* text;
+    PyObject* module;
+    PyObject* interpolation;
+    PyObject* interpolate;
+    PyObject* result;
+
+    if (kwnames != NULL && PyTuple_GET_SIZE(kwnames) > 0) {
+        if (nargs != 0 || PyTuple_GET_SIZE(kwnames) != 1 ||
+            PyUnicode_CompareWithASCIIString(
+                PyTuple_GET_ITEM(kwnames, 0), "mapping") != 0) {
+            PyErr_SetString(PyExc_TypeError,
+                            "interpolate() takes only a 'mapping' argument");
+            return NULL;
+        }
+        mapping = args[0];
+    } else if (nargs > 1) {
+        PyErr_Format(PyExc_TypeError,
+                     "interpolate() takes at most 1 argument (%zd given)",
+                     nargs);
+        return NULL;
+    } else if (nargs == 1) {
+        mapping = args[0];
+    }
+    if (mapping == NULL || mapping == Py_None) {
+        Message_get_extras(self, &extras);
+        mapping = extras.mapping;
+        if (mapping == NULL) {
+            mapping = Py_None;
+        }
+    }
+
+    module = PyType_GetModule(defining_class);
+    if (module == NULL) { return NULL; }
+    state = _zim_state(module);
+    Py_BEGIN_CRITICAL_SECTION(module);
+    interpolate = state->interpolate;
+    Py_XINCREF(interpolate);
+    Py_END_CRITICAL_SECTION();
+    if (interpolate == NULL) {
+        interpolation = PyImport_ImportModule(
+            "zope.i18nmessageid.interpolation");
+        if (interpolation == NULL) { return NULL; }
+        interpolate = PyObject_GetAttrString(interpolation, "interpolate");
+        Py_DECREF(interpolation);
+        if (interpolate == NULL) { return NULL; }
+        /* Another thread may have imported it meanwhile */
+        Py_BEGIN_CRITICAL_SECTION(module);
+        if (state->interpolate == NULL) {
+            state->interpolate = interpolate;
+            Py_INCREF(interpolate);
+        }
+        Py_END_CRITICAL_SECTION();
+    }
+
+    if (self->default_ != NULL && self->default_ != Py_None) {
+        text = self->default_;
+        Py_INCREF(text);
+    } else {
+        text = PyObject_Str((PyObject*)self);
+        if (text == NULL) { return NULL; }
+    }
+
+    result = PyObject_CallFunctionObjArgs(interpolate, text, mapping, NULL);
+    Py_DECREF(interpolate);
+    Py_DECREF(text);
+    return result;
+}
+
+/*
+ *  Message type declaration structures
+ */
+
+static PyObject*
+Message_get_mapping(Message* self, void* closure)
+{
+    PyObject* mapping;
+
+    Message_extras extras;
+
+    if (Message_wrap_mapping(self) < 0) { return NULL; }
+    Message_get_extras(self, &extras);
+    mapping = extras.mapping;
+    if (mapping == NULL) { Py_RETURN_NONE; }
+    Py_INCREF(mapping);
+    return mapping;
+}
+
+/*
+ * The cache key is computed when first accessed, and kept in the side
+ * block, which is allocated then if the message had none.
+ */
+static PyObject*
+Message_get_cache_key(Message* self, void* closure)
+{
+    Message_extras extras;
+    Message_extras* block;
+    PyObject* key;
+    PyObject* fields[6];
+    int i;
+
+    Message_get_extras(self, &extras);
+    if (extras.cache_key != NULL) {
+        Py_INCREF(extras.cache_key);
+        return extras.cache_key;
+    }
+
+    fields[0] = self->domain;
+    fields[1] = PyUnicode_FromObject((PyObject*)self);
+    if (fields[1] == NULL) { return NULL; }
+    fields[2] = self->default_;
+    fields[3] = extras.value_plural;
+    fields[4] = extras.default_plural;
+    fields[5] = extras.number;
+    for (i = 0; i < 6; i++) {
+        if (fields[i] == NULL) {
+            fields[i] = Py_None;
+        }
+    }
+    key = PyTuple_Pack(6, fields[0], fields[1], fields[2],
+                       fields[3], fields[4], fields[5]);
+    Py_DECREF(fields[1]);
+    if (key == NULL) { return NULL; }
+
+    Py_BEGIN_CRITICAL_SECTION(self);
+    if (self->extras != NULL && self->extras->cache_key != NULL) {
+        /* Another thread set it meanwhile */
+        Py_SETREF(key, self->extras->cache_key);
+        Py_INCREF(key);
+    } else {
+        block = self->extras;
+        if (block == NULL) {
+            block = PyMem_Calloc(1, sizeof(Message_extras));
+        }
+        if (block == NULL) {
+            Py_CLEAR(key);
+            PyErr_NoMemory();
+        } else {
+            /* Fill the block before publishing it */
+            block->cache_key = key;
+            Py_INCREF(key);
+            self->extras = block;
+        }
+    }
+    Py_END_CRITICAL_SECTION();
+    return key;
+}
+
+/* Getter for the other attributes in the side block, closure is offset */
+static PyObject*
+Message_get_extra(Message* self, void* closure)
+{
+    Message_extras extras;
+    PyObject* value;
+
+    Message_get_extras(self, &extras);
+    value = *(PyObject**)((char*)&extras + (size_t)closure);
+    if (value == NULL) { Py_RETURN_NONE; }
+    Py_INCREF(value);
+    return value;
+}
+
+static int
+Message_set_readonly(Message* self, PyObject* value, void* closure)
+{
+    PyErr_SetString(PyExc_AttributeError, "readonly attribute");
+    return -1;
+}
+
+static PyGetSetDef Message_getset[] = {
+    { "mapping", (getter)Message_get_mapping,
+        (setter)Message_set_readonly, NULL, NULL },
+    { "msgid_plural", (getter)Message_get_extra,
+        (setter)Message_set_readonly, NULL,
+        (void*)offsetof(Message_extras, value_plural) },
+    { "default_plural", (getter)Message_get_extra,
+        (setter)Message_set_readonly, NULL,
+        (void*)offsetof(Message_extras, default_plural) },
+    { "number", (getter)Message_get_extra,
+        (setter)Message_set_readonly, NULL,
+        (void*)offsetof(Message_extras, number) },
+    { "cache_key", (getter)Message_get_cache_key,
+        (setter)Message_set_readonly,
+        "Hashable key of all the message's attributes but its mapping",
+        NULL },
+    { NULL } /* Sentinel */
+};
+
+static PyMemberDef Message_members[] = {
+    { "domain", T_OBJECT, offsetof(Message, domain), READONLY },
+    { "default", T_OBJECT, offsetof(Message, default_), READONLY },
+    { NULL } /* Sentinel */
+};
+
+static PyMethodDef Message_methods[] = {
+    { "__reduce__",
+        (PyCFunction)Message_reduce, METH_NOARGS, Message_reduce__doc__ },
+    { "__json__",
+        (PyCFunction)Message_arguments, METH_NOARGS, Message_json__doc__ },
+    { "with_",
+        (PyCFunction)(void(*)(void))Message_with_,
+        METH_FASTCALL | METH_KEYWORDS, Message_with___doc__ },
+    { "interpolate",
+        (PyCFunction)(void(*)(void))Message_interpolate,
+        METH_METHOD | METH_FASTCALL | METH_KEYWORDS,
+        Message_interpolate__doc__ },
+    { "from_records",
+        (PyCFunction)(void(*)(void))Message_from_records,
+        METH_FASTCALL | METH_KEYWORDS | METH_CLASS,
+        Message_from_records__doc__ },
+    { NULL } /* Sentinel */
+};
+
+static char Message__name__[] = "zope.i18nmessageid.message.Message";
+static char Message__doc__[] =
+  "Message\n"
+  "\n"
+  "This is a string used as a message.  It has a domain attribute that is\n"
+  "its source domain, and a default attribute that is its default text to\n"
+  "display when there is no translation.  domain may be None meaning there is\n"
+  "no translation domain.  default may also be None, in which case the\n"
+  "message id itself implicitly serves as the default text.\n";
+
+/*
+ *  Heap type: MessageType
+ */
+static PyType_Slot Message_type_slots[] = {
+    {Py_tp_doc,         Message__doc__},
+    {Py_tp_new,         Message_new},
+    {Py_tp_dealloc,     Message_dealloc},
+    {Py_tp_traverse,    Message_traverse},
+    {Py_tp_clear,       Message_clear},
+    {Py_tp_methods,     Message_methods},
+    {Py_tp_members,     Message_members},
+    {Py_tp_getset,      Message_getset},
+    {0,                 NULL}
+};
+
+static PyType_Spec Message_type_spec = {
+    .name             = Message__name__,
+    .basicsize        = sizeof(Message),
+    .flags            = Py_TPFLAGS_DEFAULT |
+                        Py_TPFLAGS_BASETYPE |
+#if PY_VERSION_HEX >= 0x030a0000
+                        Py_TPFLAGS_IMMUTABLETYPE |
+#endif
+                        Py_TPFLAGS_HAVE_GC,
+    .slots            = Message_type_slots
+};
+
+
+/*
+ *  Factory type: the base of zope.i18nmessageid.message.MessageFactory
+ *
+ *  Calling a factory without an interning cache nor a registry, while
+ *  statistics are disabled, creates the message right away, without
+ *  running Python code nor building an argument tuple.  Other calls go
+ *  to the factory's Python method '_call'.
+ */
+
+typedef struct {
+    PyObject_HEAD
+    vectorcallfunc vectorcall;
+    PyObject*      domain;
+    /* Cleared by MessageFactory when calls may not create messages
+     * right away */
+    char           direct;
+} Factory;
+
+static int
+Factory_traverse(PyObject* pyobj_self, visitproc visit, void* arg)
+{
+    Py_VISIT(Py_TYPE(pyobj_self));
+    Py_VISIT(((Factory*)pyobj_self)->domain);
+    return 0;
+}
+
+static int
+Factory_clear(PyObject* pyobj_self)
+{
+    Py_CLEAR(((Factory*)pyobj_self)->domain);
+    return 0;
+}
+
+static void
+Factory_dealloc(PyObject* self)
+{
+    PyTypeObject* tp = Py_TYPE(self);
+    PyObject_GC_UnTrack(self);
+    Factory_clear(self);
+    tp->tp_free(self);
+    Py_DECREF(tp);
+}
+
+static PyObject*
+Factory_vectorcall(PyObject* callable, PyObject* const* args,
+                   size_t nargsf, PyObject* kwnames);
+
+static PyObject*
+Factory_new(PyTypeObject* type, PyObject* args, PyObject* kwds)
+{
+    Factory* self = (Factory*)type->tp_alloc(type, 0);
+    if (self != NULL) {
+        self->vectorcall = Factory_vectorcall;
+        /* Subclasses may set '_domain' without MessageFactory.__init__ */
+        self->direct = 1;
+    }
+    return (PyObject*)self;
+}
+
+/* '_domain' may be reassigned from Python while other threads call the
+ * factory: read and write it under the factory's lock.
+ */
+static PyObject*
+Factory_get_domain(PyObject* self, void* closure)
+{
+    PyObject* domain;
+
+    Py_BEGIN_CRITICAL_SECTION(self);
+    domain = ((Factory*)self)->domain;
+    if (domain == NULL) {
+        domain = Py_None;
+    }
+    Py_INCREF(domain);
+    Py_END_CRITICAL_SECTION();
+    return domain;
+}
+
+static int
+Factory_set_domain(PyObject* self, PyObject* value, void* closure)
+{
+    PyObject* old;
+
+    Py_XINCREF(value);
+    Py_BEGIN_CRITICAL_SECTION(self);
+    old = ((Factory*)self)->domain;
+    ((Factory*)self)->domain = value;
+    Py_END_CRITICAL_SECTION();
+    Py_XDECREF(old);
+    return 0;
+}
+
+/* The arguments of calling a factory */
+static const char* Factory_arg_names[] = {
+    "ustr", "default", "mapping",
+    "msgid_plural", "default_plural", "number", NULL
+};
+
+static PyObject*
+Factory_vectorcall(PyObject* callable, PyObject* const* args,
+                   size_t nargsf, PyObject* kwnames)
+{
+    Factory* self = (Factory*)callable;
+    _zim_module_state* state;
+    /* The text, then the arguments after the domain of Message_create */
+    PyObject* fields[6] = {NULL, NULL, NULL, NULL, NULL, NULL};
+    PyObject* method;
+    PyObject* result;
+    PyObject* name;
+    PyObject* domain;
+    Py_ssize_t nargs = PyVectorcall_NARGS(nargsf);
+    Py_ssize_t nkwargs = kwnames == NULL ? 0 : PyTuple_GET_SIZE(kwnames);
+    Py_ssize_t i;
+    Py_ssize_t j;
+
+    state = _zim_type_state(Py_TYPE(callable));
+    if (state == NULL) { return NULL; }
+
+    /* Check the arguments here, so that errors name the factory rather
+     * than its Python method */
+    if (nargs > 6) {
+        PyErr_Format(PyExc_TypeError,
+                     "%s() takes at most 6 arguments (%zd given)",
+                     Py_TYPE(callable)->tp_name, nargs + nkwargs);
+        return NULL;
+    }
+    for (i = 0; i < nargs; i++) {
+        fields[i] = args[i];
+    }
+    for (i = 0; i < nkwargs; i++) {
+        name = PyTuple_GET_ITEM(kwnames, i);
+        /* Keyword names are usually interned: try identity first */
+        for (j = 1; j < 6; j++) {
+            if (name == state->arg_names[j + 1]) {
+                break;
+            }
+        }
+        if (j == 6) {
+            for (j = 0; j < 6; j++) {
+                if (PyUnicode_CompareWithASCIIString(
+                        name, Factory_arg_names[j]) == 0) {
+                    break;
+                }
+            }
+        }
+        if (j == 6) {
+            PyErr_Format(PyExc_TypeError,
+                         "%s() got an unexpected keyword argument '%U'",
+                         Py_TYPE(callable)->tp_name, name);
+            return NULL;
+        }
+        if (fields[j] != NULL) {
+            PyErr_Format(PyExc_TypeError,
+                         "%s() got multiple values for argument '%s'",
+                         Py_TYPE(callable)->tp_name, Factory_arg_names[j]);
+            return NULL;
+        }
+        fields[j] = args[nargs + i];
+    }
+    if (fields[0] == NULL) {
+        PyErr_Format(PyExc_TypeError,
+                     "%s() missing required argument 'ustr'",
+                     Py_TYPE(callable)->tp_name);
+        return NULL;
+    }
+
+    if (!self->direct || state->stats_enabled) {
+        method = PyObject_GetAttr(callable, state->call_name);
+        if (method == NULL) { return NULL; }
+        result = PyObject_Vectorcall(method, args, nargsf, kwnames);
+        Py_DECREF(method);
+        return result;
+    }
+    for (i = 1; i < 6; i++) {
+        if (fields[i] == NULL) {
+            fields[i] = Py_None;
+        }
+    }
+    domain = Factory_get_domain(callable, NULL);
+    result = Message_create(state->message_type, fields[0], domain,
+                            fields[1], fields[2], fields[3],
+                            fields[4], fields[5]);
+    Py_DECREF(domain);
+    return result;
+}
+
+static PyGetSetDef Factory_getset[] = {
+    { "_domain", Factory_get_domain, Factory_set_domain, NULL, NULL },
+    { NULL } /* Sentinel */
+};
+
+static PyMemberDef Factory_members[] = {
+    { "_direct", T_BOOL, offsetof(Factory, direct), 0 },
+    { "__vectorcalloffset__", T_PYSSIZET,
+        offsetof(Factory, vectorcall), READONLY },
+    { NULL } /* Sentinel */
+};
+
+static PyType_Slot Factory_type_slots[] = {
+    {Py_tp_doc,         "Base of the message factories"},
+    {Py_tp_new,         Factory_new},
+    {Py_tp_call,        PyVectorcall_Call},
+    {Py_tp_dealloc,     Factory_dealloc},
+    {Py_tp_traverse,    Factory_traverse},
+    {Py_tp_clear,       Factory_clear},
+    {Py_tp_members,     Factory_members},
+    {Py_tp_getset,      Factory_getset},
+    {0,                 NULL}
+};
+
+static PyType_Spec Factory_type_spec = {
+    .name             = "zope.i18nmessageid.message._FactoryBase",
+    .basicsize        = sizeof(Factory),
+    .flags            = Py_TPFLAGS_DEFAULT |
+                        Py_TPFLAGS_BASETYPE |
+#if PY_VERSION_HEX >= 0x030a0000
+                        Py_TPFLAGS_IMMUTABLETYPE |
+#endif
+                        Py_TPFLAGS_HAVE_VECTORCALL |
+                        Py_TPFLAGS_HAVE_GC,
+    .slots            = Factory_type_slots
+};
+
+
+/*
+ *  Module initialization structures
+ */
+
+static char _zim__name__[]  = "_zope_i18nmessageid_message";
+static char _zim__doc__[]   = "I18n Messages";
+
+
+/*
+ *  Module functions, used by zope.i18nmessageid.message to manage the
+ *  statistics
+ */
+
+static PyObject*
+_zim_configure_stats(PyObject* module, PyObject* args)
+{
+    _zim_module_state* rec = _zim_state(module);
+    int enabled;
+    Py_ssize_t sample_every;
+    PyObject* sampler;
+
+    if (!PyArg_ParseTuple(args, "pnO:_configure_stats",
+                          &enabled, &sample_every, &sampler)) {
+        return NULL;
+    }
+    Py_BEGIN_CRITICAL_SECTION(rec->stats);
+    rec->sample_every = sample_every;
+    rec->sample_countdown = sample_every;
+    Py_INCREF(sampler);
+    Py_XSETREF(rec->sampler, sampler);
+    rec->stats_enabled = enabled;
+    Py_END_CRITICAL_SECTION();
+    Py_RETURN_NONE;
+}
+
+static PyObject*
+_zim_get_stats(PyObject* module, PyObject* unused)
+{
+    _zim_module_state* rec = _zim_state(module);
+    PyObject* result = PyDict_New();
+    PyObject* domain;
+    PyObject* counts;
+    PyObject* copy;
+    Py_ssize_t pos = 0;
+
+    if (result == NULL) { return NULL; }
+    Py_BEGIN_CRITICAL_SECTION(rec->stats);
+    while (PyDict_Next(rec->stats, &pos, &domain, &counts)) {
+        copy = PyList_AsTuple(counts);
+        if (copy == NULL || PyDict_SetItem(result, domain, copy) < 0) {
+            Py_XDECREF(copy);
+            Py_CLEAR(result);
+            break;
+        }
+        Py_DECREF(copy);
+    }
+    Py_END_CRITICAL_SECTION();
+    return result;
+}
+
+static PyObject*
+_zim_reset_stats(PyObject* module, PyObject* unused)
+{
+    _zim_module_state* rec = _zim_state(module);
+
+    Py_BEGIN_CRITICAL_SECTION(rec->stats);
+    PyDict_Clear(rec->stats);
+    rec->sample_countdown = rec->sample_every;
+    Py_END_CRITICAL_SECTION();
+    Py_RETURN_NONE;
+}
+
+/*
+ *  Columnar export of messages, used by zope.i18nmessageid.bulk
+ */
+
+/* Texts of a message stored in the UTF-8 blob: msgid, default,
+ * msgid_plural and default_plural
+ */
+#define COLUMNS_TEXTS 4
+
+/*
+ * Fill 'fields' with new references to the constructor arguments of a
+ * message, None when not set.
+ */
+static int
+_zim_message_fields(_zim_module_state* rec, PyObject* item,
+                    PyObject* fields[7])
+{
+    Message* message;
+    Message_extras extras;
+    PyObject* args;
+    PyObject* mapping;
+    Py_ssize_t size;
+    Py_ssize_t i;
+
+    if (PyObject_TypeCheck(item, rec->message_type)) {
+        message = (Message*)item;
+        Message_get_extras(message, &extras);
+        mapping = extras.mapping;
+        if (mapping != NULL) {
+            /* A copy, the message's own mapping being read-only */
+            mapping = PyDict_CheckExact(mapping) ?
+                PyDict_Copy(mapping) :
+                PyObject_CallFunctionObjArgs(
+                    (PyObject*)&PyDict_Type, mapping, NULL);
+            if (mapping == NULL) { return -1; }
+        }
+        fields[0] = item;
+        fields[1] = message->domain;
+        fields[2] = message->default_;
+        fields[3] = mapping;
+        fields[4] = extras.value_plural;
+        fields[5] = extras.default_plural;
+        fields[6] = extras.number;
+        for (i = 0; i < 7; i++) {
+            if (fields[i] == NULL) {
+                fields[i] = Py_None;
+            }
+            if (i != 3 || mapping == NULL) {
+                Py_INCREF(fields[i]);
+            }
+        }
+        return 0;
+    }
+
+    if (PyUnicode_CheckExact(item)) {
+        args = PyTuple_Pack(1, item);
+    } else {
+        /* Other implementations of messages */
+        args = PyObject_CallMethod(item, "__json__", NULL);
+    }
+    if (args == NULL) { return -1; }
+    if (!PyTuple_Check(args) || PyTuple_GET_SIZE(args) > 7) {
+        PyErr_SetString(PyExc_TypeError,
+                        "__json__ must return a tuple of at most 7 items");
+        Py_DECREF(args);
+        return -1;
+    }
+    size = PyTuple_GET_SIZE(args);
+    for (i = 0; i < 7; i++) {
+        fields[i] = i < size ? PyTuple_GET_ITEM(args, i) : Py_None;
+        Py_INCREF(fields[i]);
+    }
+    Py_DECREF(args);
+    return 0;
+}
+
+/*
+ * Append the UTF-8 encoding of 'text' to the growing 'data' buffer.
+ */
+static int
+_zim_append_utf8(char** data, Py_ssize_t* size, Py_ssize_t* allocated,
+                 PyObject* text)
+{
+    PyObject* encoded = NULL;
+    const char* source;
+    Py_ssize_t length;
+    char* grown;
+    Py_ssize_t needed;
+
+    if (!PyUnicode_Check(text)) {
+        PyErr_Format(PyExc_TypeError,
+                     "message texts must be str, not %.200s",
+                     Py_TYPE(text)->tp_name);
+        return -1;
+    }
+    if (PyUnicode_IS_ASCII(text)) {
+        /* Already UTF-8 */
+        source = (const char*)PyUnicode_DATA(text);
+        length = PyUnicode_GET_LENGTH(text);
+    } else {
+        encoded = PyUnicode_AsUTF8String(text);
+        if (encoded == NULL) { return -1; }
+        source = PyBytes_AS_STRING(encoded);
+        length = PyBytes_GET_SIZE(encoded);
+    }
+    needed = *size + length;
+    if (needed > *allocated) {
+        if (needed < *allocated * 2) {
+            needed = *allocated * 2;
+        }
+        grown = PyMem_Realloc(*data, needed);
+        if (grown == NULL) {
+            Py_XDECREF(encoded);
+            PyErr_NoMemory();
+            return -1;
+        }
+        *data = grown;
+        *allocated = needed;
+    }
+    memcpy(*data + *size, source, length);
+    *size += length;
+    Py_XDECREF(encoded);
+    return 0;
+}
+
+static PyObject*
+_zim_to_columns(PyObject* module, PyObject* messages)
+{
+    _zim_module_state* rec = _zim_state(module);
+    PyObject* items;
+    PyObject* fields[7];
+    PyObject** texts = NULL;
+    PyObject* domains = NULL;
+    PyObject* codes_by_domain = NULL;
+    PyObject* numbers = NULL;
+    PyObject* mappings = NULL;
+    PyObject* buffers[4] = {NULL, NULL, NULL, NULL};
+    PyObject* code;
+    PyObject* result = NULL;
+    int* codes = NULL;
+    long long* offsets = NULL;
+    char* valid = NULL;
+    char* data = NULL;
+    Py_ssize_t size = 0;
+    Py_ssize_t allocated = 0;
+    Py_ssize_t count;
+    Py_ssize_t n;
+    Py_ssize_t i;
+    Py_ssize_t k;
+
+    /* A private copy, which the __json__ methods cannot change */
+    items = PySequence_List(messages);
+    if (items == NULL) { return NULL; }
+    n = PyList_GET_SIZE(items);
+    if (n > INT_MAX) {
+        PyErr_SetString(PyExc_OverflowError, "too many messages");
+        goto done;
+    }
+    texts = PyMem_Calloc(COLUMNS_TEXTS * n + 1, sizeof(PyObject*));
+    codes = PyMem_Malloc((n + 1) * sizeof(int));
+    offsets = PyMem_Malloc((COLUMNS_TEXTS * n + 1) * sizeof(long long));
+    valid = PyMem_Malloc(COLUMNS_TEXTS * n + 1);
+    if (texts == NULL || codes == NULL || offsets == NULL || valid == NULL) {
+        PyErr_NoMemory();
+        goto done;
+    }
+    domains = PyList_New(0);
+    codes_by_domain = PyDict_New();
+    numbers = PyList_New(n);
+    mappings = PyList_New(n);
+    if (domains == NULL || codes_by_domain == NULL || numbers == NULL ||
+            mappings == NULL) {
+        goto done;
+    }
+
+    /* Dictionary-encode the domains, and keep the texts by column */
+    for (i = 0; i < n; i++) {
+        if (_zim_message_fields(rec, PyList_GET_ITEM(items, i), fields) < 0) {
+            goto done;
+        }
+        texts[i] = fields[0];
+        texts[n + i] = fields[2];
+        texts[2 * n + i] = fields[4];
+        texts[3 * n + i] = fields[5];
+        PyList_SET_ITEM(mappings, i, fields[3]);
+        PyList_SET_ITEM(numbers, i, fields[6]);
+        code = PyDict_GetItemWithError(codes_by_domain, fields[1]);
+        if (code == NULL) {
+            if (PyErr_Occurred()) {
+                Py_DECREF(fields[1]);
+                goto done;
+            }
+            count = PyList_GET_SIZE(domains);
+            code = PyLong_FromSsize_t(count);
+            if (code == NULL ||
+                    PyDict_SetItem(codes_by_domain, fields[1], code) < 0 ||
+                    PyList_Append(domains, fields[1]) < 0) {
+                Py_XDECREF(code);
+                Py_DECREF(fields[1]);
+                goto done;
+            }
+            Py_DECREF(code);
+            codes[i] = (int)count;
+        } else {
+            codes[i] = (int)PyLong_AsLong(code);
+        }
+        Py_DECREF(fields[1]);
+    }
+
+    /* Encode the texts of each column after those of the previous one, so
+     * that the offsets only grow */
+    offsets[0] = 0;
+    for (k = 0; k < COLUMNS_TEXTS * n; k++) {
+        if (texts[k] == Py_None) {
+            valid[k] = 0;
+        } else {
+            if (_zim_append_utf8(&data, &size, &allocated, texts[k]) < 0) {
+                goto done;
+            }
+            valid[k] = 1;
+        }
+        offsets[k + 1] = size;
+    }
+
+    buffers[0] = PyBytes_FromStringAndSize((char*)codes, n * sizeof(int));
+    buffers[1] = PyBytes_FromStringAndSize(data, size);
+    buffers[2] = PyBytes_FromStringAndSize(
+        (char*)offsets, (COLUMNS_TEXTS * n + 1) * sizeof(long long));
+    buffers[3] = PyBytes_FromStringAndSize(valid, COLUMNS_TEXTS * n);
+    if (buffers[0] != NULL && buffers[1] != NULL && buffers[2] != NULL &&
+            buffers[3] != NULL) {
+        result = PyTuple_Pack(7, domains, buffers[0], buffers[1],
+                              buffers[2], buffers[3], numbers, mappings);
+    }
+
+done:
+    if (texts != NULL) {
+        for (k = 0; k < COLUMNS_TEXTS * n; k++) {
+            Py_XDECREF(texts[k]);
+        }
+        PyMem_Free(texts);
+    }
+    for (k = 0; k < 4; k++) {
+        Py_XDECREF(buffers[k]);
+    }
+    PyMem_Free(codes);
+    PyMem_Free(offsets);
+    PyMem_Free(valid);
+    PyMem_Free(data);
+    Py_XDECREF(domains);
+    Py_XDECREF(codes_by_domain);
+    Py_XDECREF(numbers);
+    Py_XDECREF(mappings);
+    Py_DECREF(items);
+    return result;
+}
+
 /*
- *  Message type slot handlers
+ *  JSON encoding of documents holding messages, used by
+ *  zope.i18nmessageid.json
+ *
+ *  json writes instances of str subclasses as plain strings, without
+ *  calling the default hook of its encoder.  This encoder writes each
+ *  message as an object with a single "__message__" key, whose value is
+ *  the array of its constructor arguments, as reduced for pickling,
+ *  straight from the fields of the message.  It only supports the
+ *  options of json.dumps which zope.i18nmessageid.json passes to it.
  */
 
+enum {
+    JSON_NULL,
+    JSON_TRUE,
+    JSON_FALSE,
+    JSON_OPEN_OBJECT,
+    JSON_CLOSE_OBJECT,
+    JSON_OPEN_ARRAY,
+    JSON_CLOSE_ARRAY,
+    JSON_NAN,
+    JSON_INFINITY,
+    JSON_NEG_INFINITY,
+    JSON_TAG,
+    JSON_EMPTY,
+    JSON_CONSTANTS
+};
+
+static const char* _zim_json_texts[] = {
+    "null", "true", "false", "{", "}", "[", "]",
+    "NaN", "Infinity", "-Infinity", "__message__", ""
+};
+
+typedef struct {
+    _zim_module_state* state;
+    /* The strings making up the document */
+    PyObject* parts;
+    PyObject* default_;
+    PyObject* item_separator;
+    PyObject* key_separator;
+    /* json.encoder.encode_basestring(_ascii) */
+    PyObject* encode_string;
+    /* The ids of the containers being encoded */
+    PyObject* markers;
+    PyObject* constants[JSON_CONSTANTS];
+    /* '{"__message__":', with the key separator */
+    PyObject* open_message;
+} _zim_json_encoder;
+
+static int _zim_json_encode(_zim_json_encoder* enc, PyObject* obj);
+
 static int
-Message_traverse(PyObject* pyobj_self, visitproc visit, void* arg)
+_zim_json_append(_zim_json_encoder* enc, PyObject* part)
 {
-    PyTypeObject* tp = Py_TYPE(pyobj_self);
-    Py_VISIT(tp);
-    Message* self = (Message*)pyobj_self;
-    Py_VISIT(self->domain);
-    Py_VISIT(self->default_);
-    Py_VISIT(self->mapping);
-    Py_VISIT(self->value_plural);
-    Py_VISIT(self->default_plural);
-    Py_VISIT(self->number);
-    return 0;
+    return PyList_Append(enc->parts, part);
 }
 
+/* Append 'part', a new reference, if not NULL */
 static int
-Message_clear(PyObject* pyobj_self)
+_zim_json_append_new(_zim_json_encoder* enc, PyObject* part)
 {
-    Message* self = (Message*)pyobj_self;
-    Py_CLEAR(self->domain);
-    Py_CLEAR(self->default_);
-    Py_CLEAR(self->mapping);
-    Py_CLEAR(self->value_plural);
-    Py_CLEAR(self->default_plural);
-    Py_CLEAR(self->number);
-    return 0;
+    int status;
+
+    if (part == NULL) { return -1; }
+    status = PyList_Append(enc->parts, part);
+    Py_DECREF(part);
+    return status;
 }
 
-static void
-Message_dealloc(PyObject* self)
+static int
+_zim_json_string(_zim_json_encoder* enc, PyObject* text)
 {
-    PyTypeObject* tp = Py_TYPE(self);
-    PyObject_GC_UnTrack(self);
-    Message_clear(self);
-    PyUnicode_Type.tp_dealloc((PyObject*)self);
-    Py_DECREF(tp);
+    return _zim_json_append_new(
+        enc, PyObject_CallOneArg(enc->encode_string, text));
 }
 
+/* Return the JSON text of a float, as json does */
 static PyObject*
-Message_new(PyTypeObject* type, PyObject* args, PyObject* kwds)
+_zim_json_float_text(_zim_json_encoder* enc, PyObject* obj)
 {
-    PyObject *value;
-    PyObject *domain = NULL;
-    PyObject *default_ = NULL;
-    PyObject *mapping = NULL;
-    PyObject *value_plural = NULL;
-    PyObject *default_plural = NULL;
-    PyObject *number = NULL;
+    double value = PyFloat_AS_DOUBLE(obj);
+    PyObject* text;
 
-    static char* kwlist[] = {
-        "value", "domain", "default", "mapping",
-        "msgid_plural", "default_plural", "number", NULL
-    };
+    if (Py_IS_NAN(value)) {
+        text = enc->constants[JSON_NAN];
+    } else if (Py_IS_INFINITY(value)) {
+        text = enc->constants[value > 0 ? JSON_INFINITY : JSON_NEG_INFINITY];
+    } else {
+        return PyFloat_Type.tp_repr(obj);
+    }
+    Py_INCREF(text);
+    return text;
+}
 
-    PyObject *new_args;
-    PyObject *new_str;
-    Message  *new_msg;
-    Message  *other = NULL;
+/*
+ * Mark 'obj' as being encoded, setting 'id' to a new reference to its
+ * id, and fail on circular references.
+ */
+static int
+_zim_json_mark(_zim_json_encoder* enc, PyObject* obj, PyObject** id)
+{
+    int found;
 
-    if (!PyArg_ParseTupleAndKeywords(
-        args, kwds, "O|OOOOOO", kwlist,
-        &value, &domain, &default_, &mapping,
-        &value_plural, &default_plural, &number)
-    ) { return NULL; }
+    *id = PyLong_FromVoidPtr(obj);
+    if (*id == NULL) { return -1; }
+    found = PySet_Contains(enc->markers, *id);
+    if (found == 0) {
+        found = PySet_Add(enc->markers, *id);
+    } else if (found > 0) {
+        PyErr_SetString(PyExc_ValueError, "Circular reference detected");
+        found = -1;
+    }
+    if (found < 0) {
+        Py_CLEAR(*id);
+    }
+    return found;
+}
 
-    if (number != NULL && Py_None != number) {
-        if (!(PyLong_Check(number) || PyFloat_Check(number))) {
-            PyErr_SetString(PyExc_TypeError,
-                            "`number` should be an integer or a float");
-            return NULL;
+static int
+_zim_json_unmark(_zim_json_encoder* enc, PyObject* id)
+{
+    int status = PySet_Discard(enc->markers, id);
+    Py_DECREF(id);
+    return status < 0 ? -1 : 0;
+}
+
+static int
+_zim_json_array(_zim_json_encoder* enc, PyObject* obj)
+{
+    PyObject* seq;
+    PyObject* item;
+    PyObject* id = NULL;
+    Py_ssize_t i;
+    int status = -1;
+
+    seq = PySequence_Fast(obj, "expected a list or a tuple");
+    if (seq == NULL) { return -1; }
+    if (_zim_json_mark(enc, obj, &id) < 0 ||
+        _zim_json_append(enc, enc->constants[JSON_OPEN_ARRAY]) < 0) {
+        goto done;
+    }
+    for (i = 0; i < PySequence_Fast_GET_SIZE(seq); i++) {
+        if (i > 0 && _zim_json_append(enc, enc->item_separator) < 0) {
+            goto done;
         }
+        item = PySequence_Fast_GET_ITEM(seq, i);
+        Py_INCREF(item);
+        status = _zim_json_encode(enc, item);
+        Py_DECREF(item);
+        if (status < 0) { goto done; }
     }
+    status = _zim_json_append(enc, enc->constants[JSON_CLOSE_ARRAY]);
+    if (status == 0) {
+        status = _zim_json_unmark(enc, id);
+        id = NULL;
+    }
+done:
+    Py_XDECREF(id);
+    Py_DECREF(seq);
+    return status;
+}
+
+/* Return the text of a key of a dict, as json does */
+static PyObject*
+_zim_json_key(_zim_json_encoder* enc, PyObject* key)
+{
+    PyObject* text;
 
-    new_args = Py_BuildValue("(O)", value);
-    if (new_args == NULL) { return NULL; }
+    if (PyUnicode_Check(key)) {
+        Py_INCREF(key);
+        return key;
+    }
+    if (PyFloat_Check(key)) {
+        return _zim_json_float_text(enc, key);
+    }
+    if (key == Py_True || key == Py_False || key == Py_None) {
+        text = enc->constants[key == Py_True ? JSON_TRUE :
+                              key == Py_False ? JSON_FALSE : JSON_NULL];
+        Py_INCREF(text);
+        return text;
+    }
+    if (PyLong_Check(key)) {
+        return PyLong_Type.tp_repr(key);
+    }
+    PyErr_Format(PyExc_TypeError,
+                 "keys must be str, int, float, bool or None, not %.100s",
+                 Py_TYPE(key)->tp_name);
+    return NULL;
+}
 
-    new_str = PyUnicode_Type.tp_new(type, new_args, NULL);
-    Py_DECREF(new_args);
-    if (new_str == NULL) { return NULL; }
+static int
+_zim_json_object(_zim_json_encoder* enc, PyObject* obj)
+{
+    PyObject* items;
+    PyObject* item;
+    PyObject* key;
+    PyObject* value;
+    PyObject* id = NULL;
+    Py_ssize_t i;
+    int status = -1;
 
-    if (!is_message(type, new_str)) {
-        PyErr_SetString(PyExc_TypeError,
-                        "unicode.__new__ didn't return a Message");
-        Py_DECREF(new_str);
-        return NULL;
+    items = PyMapping_Items(obj);
+    if (items == NULL) { return -1; }
+    if (_zim_json_mark(enc, obj, &id) < 0 ||
+        _zim_json_append(enc, enc->constants[JSON_OPEN_OBJECT]) < 0) {
+        goto done;
+    }
+    for (i = 0; i < PyList_GET_SIZE(items); i++) {
+        item = PyList_GET_ITEM(items, i);
+        if (!PyTuple_Check(item) || PyTuple_GET_SIZE(item) != 2) {
+            PyErr_SetString(PyExc_ValueError, "items must return 2-tuples");
+            goto done;
+        }
+        if (i > 0 && _zim_json_append(enc, enc->item_separator) < 0) {
+            goto done;
+        }
+        key = _zim_json_key(enc, PyTuple_GET_ITEM(item, 0));
+        if (key == NULL) { goto done; }
+        status = _zim_json_string(enc, key);
+        Py_DECREF(key);
+        if (status < 0 ||
+            (status = _zim_json_append(enc, enc->key_separator)) < 0) {
+            goto done;
+        }
+        value = PyTuple_GET_ITEM(item, 1);
+        Py_INCREF(value);
+        status = _zim_json_encode(enc, value);
+        Py_DECREF(value);
+        if (status < 0) { goto done; }
     }
+    status = _zim_json_append(enc, enc->constants[JSON_CLOSE_OBJECT]);
+    if (status == 0) {
+        status = _zim_json_unmark(enc, id);
+        id = NULL;
+    }
+done:
+    Py_XDECREF(id);
+    Py_DECREF(items);
+    return status;
+}
 
-    new_msg = (Message*)new_str;
+/* Write a C message from its fields, without copying them */
+static int
+_zim_json_message(_zim_json_encoder* enc, Message* self)
+{
+    Message_extras extras;
+    PyObject* fields[7];
+    PyObject* mapping = NULL;
+    Py_ssize_t size;
+    Py_ssize_t i;
+    int status = -1;
 
-    if (is_message(type, value)) {
-        /* value is a Message so we copy it and use it as base */
-        other = (Message*)value;
-        new_msg->domain = other->domain;
-        new_msg->default_ = other->default_;
-        new_msg->mapping = other->mapping;
-        new_msg->value_plural = other->value_plural;
-        new_msg->default_plural = other->default_plural;
-        new_msg->number = other->number;
+    Message_get_extras(self, &extras);
+    if (extras.mapping != NULL && !PyDict_CheckExact(extras.mapping)) {
+        mapping = PyObject_CallOneArg((PyObject*)&PyDict_Type,
+                                      extras.mapping);
+        if (mapping == NULL) { return -1; }
     } else {
-        new_msg->domain = NULL;
-        new_msg->default_ = NULL;
-        new_msg->mapping = NULL;
-        new_msg->value_plural = NULL;
-        new_msg->default_plural = NULL;
-        new_msg->number = NULL;
+        mapping = extras.mapping;
+        Py_XINCREF(mapping);
     }
-
-    if (domain != NULL) {
-        new_msg->domain = domain;
+    fields[0] = (PyObject*)self;
+    fields[1] = self->domain;
+    fields[2] = self->default_;
+    fields[3] = mapping;
+    fields[4] = extras.value_plural;
+    fields[5] = extras.default_plural;
+    fields[6] = extras.number;
+    size = 7;
+    while (size > 1 && (fields[size - 1] == NULL ||
+                        fields[size - 1] == Py_None)) {
+        size--;
     }
-
-    if (default_ != NULL) {
-        new_msg->default_ = default_;
+    /* Hooks may run while encoding the fields: keep them alive */
+    for (i = 1; i < size; i++) {
+        if (fields[i] == NULL) {
+            fields[i] = Py_None;
+        }
+        if (i != 3) {
+            Py_INCREF(fields[i]);
+        }
     }
 
-    if (mapping == Py_None) {
-        new_msg->mapping = Py_None;
-        Py_INCREF(Py_None);
-    } else if (mapping != NULL) {
-        /* Ensure that our mapping is immutable */
-        new_msg->mapping = PyDictProxy_New(mapping);
-    } else if (other != NULL && new_msg->mapping == other->mapping) {
-        /* borrowed? */
-        Py_XINCREF(new_msg->mapping);
+    if (_zim_json_append(enc, enc->open_message) < 0 ||
+        _zim_json_append(enc, enc->constants[JSON_OPEN_ARRAY]) < 0 ||
+        _zim_json_string(enc, (PyObject*)self) < 0) {
+        goto done;
     }
-
-    if (value_plural != NULL) {
-        new_msg->value_plural = value_plural;
+    for (i = 1; i < size; i++) {
+        if (_zim_json_append(enc, enc->item_separator) < 0 ||
+            _zim_json_encode(enc, fields[i]) < 0) {
+            goto done;
+        }
     }
-
-    if (default_plural != NULL) {
-        new_msg->default_plural = default_plural;
+    if (_zim_json_append(enc, enc->constants[JSON_CLOSE_ARRAY]) < 0 ||
+        _zim_json_append(enc, enc->constants[JSON_CLOSE_OBJECT]) < 0) {
+        goto done;
     }
-
-    if (number != NULL) {
-        new_msg->number = number;
+    status = 0;
+done:
+    for (i = 1; i < size; i++) {
+        if (i != 3) {
+            Py_DECREF(fields[i]);
+        }
     }
+    Py_XDECREF(mapping);
+    return status;
+}
 
-    /* Don't:  Py_XINCREF(new_msg->mapping); we handed it above */
-    Py_XINCREF(new_msg->default_);
-    Py_XINCREF(new_msg->domain);
-    Py_XINCREF(new_msg->value_plural);
-    Py_XINCREF(new_msg->default_plural);
-    Py_XINCREF(new_msg->number);
+/* Write a str subclass, a message if it has a __json__ method */
+static int
+_zim_json_str_subclass(_zim_json_encoder* enc, PyObject* obj)
+{
+    PyObject* to_json;
+    PyObject* args;
+    int status;
 
-    return (PyObject*)new_msg;
+    if (PyObject_TypeCheck(obj, enc->state->message_type)) {
+        return _zim_json_message(enc, (Message*)obj);
+    }
+    to_json = PyObject_GetAttrString((PyObject*)Py_TYPE(obj), "__json__");
+    if (to_json == NULL) {
+        if (!PyErr_ExceptionMatches(PyExc_AttributeError)) { return -1; }
+        PyErr_Clear();
+        return _zim_json_string(enc, obj);
+    }
+    args = PyObject_CallOneArg(to_json, obj);
+    Py_DECREF(to_json);
+    if (args == NULL) { return -1; }
+    status = _zim_json_append(enc, enc->open_message);
+    if (status == 0) {
+        status = _zim_json_encode(enc, args);
+    }
+    if (status == 0) {
+        status = _zim_json_append(enc, enc->constants[JSON_CLOSE_OBJECT]);
+    }
+    Py_DECREF(args);
+    return status;
 }
 
-/*
- * Message type methods
- */
+/* Write the result of the default hook for 'obj' */
+static int
+_zim_json_default(_zim_json_encoder* enc, PyObject* obj)
+{
+    PyObject* id;
+    PyObject* converted;
+    int status;
 
-static char Message_reduce__doc__[] = (
-    "Reduce messages to a serializable form\n\n"
-    "Notably, for use in pickling."
-);
+    if (_zim_json_mark(enc, obj, &id) < 0) { return -1; }
+    converted = PyObject_CallOneArg(enc->default_, obj);
+    if (converted == NULL) {
+        Py_DECREF(id);
+        return -1;
+    }
+    status = _zim_json_encode(enc, converted);
+    Py_DECREF(converted);
+    if (status < 0) {
+        Py_DECREF(id);
+        return -1;
+    }
+    return _zim_json_unmark(enc, id);
+}
 
-static PyObject*
-Message_reduce(Message* self)
+static int
+_zim_json_encode(_zim_json_encoder* enc, PyObject* obj)
 {
-    PyObject *value;
-    PyObject *mapping;
-    PyObject *result;
-
-    value = PyObject_CallFunctionObjArgs(
-        (PyObject*)&PyUnicode_Type, self, NULL);
-    if (value == NULL) { return NULL;}
+    int status;
 
-    if (self->mapping == NULL) {
-        mapping = Py_None; /* borrowed: Py_BuildValue will incref */
-    } else if (self->mapping == Py_None) {
-        mapping = Py_None; /* borrowed: Py_BuildValue will incref */
+    if (obj == Py_None) {
+        return _zim_json_append(enc, enc->constants[JSON_NULL]);
+    }
+    if (obj == Py_True) {
+        return _zim_json_append(enc, enc->constants[JSON_TRUE]);
+    }
+    if (obj == Py_False) {
+        return _zim_json_append(enc, enc->constants[JSON_FALSE]);
+    }
+    if (PyUnicode_CheckExact(obj)) {
+        return _zim_json_string(enc, obj);
+    }
+    if (PyLong_Check(obj)) {
+        return _zim_json_append_new(enc, PyLong_Type.tp_repr(obj));
+    }
+    if (PyFloat_Check(obj)) {
+        return _zim_json_append_new(enc, _zim_json_float_text(enc, obj));
+    }
+    if (Py_EnterRecursiveCall(" while encoding a JSON object")) {
+        return -1;
+    }
+    if (PyUnicode_Check(obj)) {
+        status = _zim_json_str_subclass(enc, obj);
+    } else if (PyList_Check(obj) || PyTuple_Check(obj)) {
+        status = _zim_json_array(enc, obj);
+    } else if (PyDict_Check(obj)) {
+        status = _zim_json_object(enc, obj);
     } else {
-        mapping = PyObject_CallFunctionObjArgs(
-          (PyObject*)&PyDict_Type, self->mapping, NULL);
-        if (mapping == NULL) { return NULL; }
-    }
-
-    result = Py_BuildValue(
-        "(O(OOOOOOO))",
-        Py_TYPE(&(self->base)),
-        value,
-        self->domain ? self->domain : Py_None,
-        self->default_ ? self->default_ : Py_None,
-        mapping,
-        self->value_plural ? self->value_plural : Py_None,
-        self->default_plural ? self->default_plural : Py_None,
-        self->number ? self->number : Py_None
-    );
-
-    if (mapping != Py_None) {
-        Py_DECREF(mapping);
+        status = _zim_json_default(enc, obj);
     }
-    Py_DECREF(value);
-
-    return result;
+    Py_LeaveRecursiveCall();
+    return status;
 }
 
-/*
- *  Message type declaration structures
- */
-
-static PyMemberDef Message_members[] = {
-    { "domain", T_OBJECT, offsetof(Message, domain), READONLY },
-    { "default", T_OBJECT, offsetof(Message, default_), READONLY },
-    { "mapping", T_OBJECT, offsetof(Message, mapping), READONLY },
-    { "msgid_plural", T_OBJECT, offsetof(Message, value_plural), READONLY },
-    { "default_plural", T_OBJECT, offsetof(Message, default_plural), READONLY },
-    { "number", T_OBJECT, offsetof(Message, number), READONLY },
-    { NULL } /* Sentinel */
-};
-
-static PyMethodDef Message_methods[] = {
-    { "__reduce__",
-        (PyCFunction)Message_reduce, METH_NOARGS, Message_reduce__doc__ },
-    { NULL } /* Sentinel */
-};
+static PyObject*
+_zim_json_dumps(PyObject* module, PyObject* args)
+{
+    _zim_json_encoder enc;
+    PyObject* obj;
+    PyObject* tag;
+    PyObject* result = NULL;
+    int i;
 
-static char Message__name__[] = "zope.i18nmessageid.message.Message";
-static char Message__doc__[] =
-  "Message\n"
-  "\n"
-  "This is a string used as a message.  It has a domain attribute that is\n"
-  "its source domain, and a default attribute that is its default text to\n"
-  "display when there is no translation.  domain may be None meaning there is\n"
-  "no translation domain.  default may also be None, in which case the\n"
-  "message id itself implicitly serves as the default text.\n";
+    memset(&enc, 0, sizeof(enc));
+    if (!PyArg_ParseTuple(args, "OOUUO:_json_dumps", &obj, &enc.default_,
+                          &enc.item_separator, &enc.key_separator,
+                          &enc.encode_string)) {
+        return NULL;
+    }
+    enc.state = _zim_state(module);
+    for (i = 0; i < JSON_CONSTANTS; i++) {
+        enc.constants[i] = PyUnicode_InternFromString(_zim_json_texts[i]);
+        if (enc.constants[i] == NULL) { goto done; }
+    }
+    tag = PyObject_CallOneArg(enc.encode_string, enc.constants[JSON_TAG]);
+    if (tag == NULL) { goto done; }
+    enc.open_message = PyUnicode_FromFormat("{%U%U", tag, enc.key_separator);
+    Py_DECREF(tag);
+    if (enc.open_message == NULL) { goto done; }
+    enc.parts = PyList_New(0);
+    if (enc.parts == NULL) { goto done; }
+    enc.markers = PySet_New(NULL);
+    if (enc.markers == NULL) { goto done; }
 
-/*
- *  Heap type: MessageType
- */
-static PyType_Slot Message_type_slots[] = {
-    {Py_tp_doc,         Message__doc__},
-    {Py_tp_new,         Message_new},
-    {Py_tp_dealloc,     Message_dealloc},
-    {Py_tp_traverse,    Message_traverse},
-    {Py_tp_clear,       Message_clear},
-    {Py_tp_methods,     Message_methods},
-    {Py_tp_members,     Message_members},
-    {0,                 NULL}
-};
+    if (_zim_json_encode(&enc, obj) == 0) {
+        result = PyUnicode_Join(enc.constants[JSON_EMPTY], enc.parts);
+    }
+done:
+    for (i = 0; i < JSON_CONSTANTS; i++) {
+        Py_XDECREF(enc.constants[i]);
+    }
+    Py_XDECREF(enc.open_message);
+    Py_XDECREF(enc.parts);
+    Py_XDECREF(enc.markers);
+    return result;
+}
 
-static PyType_Spec Message_type_spec = {
-    .name             = Message__name__,
-    .basicsize        = sizeof(Message),
-    .flags            = Py_TPFLAGS_DEFAULT |
-                        Py_TPFLAGS_BASETYPE |
-#if PY_VERSION_HEX >= 0x030a0000
-                        Py_TPFLAGS_IMMUTABLETYPE |
-#endif
-                        Py_TPFLAGS_HAVE_GC,
-    .slots            = Message_type_slots
+static PyMethodDef _zim_module_methods[] = {
+    { "_configure_stats", (PyCFunction)_zim_configure_stats, METH_VARARGS,
+      "_configure_stats(enabled, sample_every, sampler)" },
+    { "_get_stats", (PyCFunction)_zim_get_stats, METH_NOARGS,
+      "Return the counters recorded by domain" },
+    { "_reset_stats", (PyCFunction)_zim_reset_stats, METH_NOARGS,
+      "Reset the counters" },
+    { "_to_columns", (PyCFunction)_zim_to_columns, METH_O,
+      "Return the columnar buffers of a sequence of messages" },
+    { "_json_dumps", (PyCFunction)_zim_json_dumps, METH_VARARGS,
+      "_json_dumps(obj, default, item_separator, key_separator,"
+      " encode_string)" },
+    { NULL, NULL }  /* Sentinel */
 };
 
-
-/*
- *  Module initialization structures
- */
-
-static char _zim__name__[]  = "_zope_i18nmessageid_message";
-static char _zim__doc__[]   = "I18n Messages";
-
-typedef struct {
-    PyTypeObject*  message_type;
-} _zim_module_state;
-
-/*
- *  Macro to speed lookup of state members
- */
-#define _zim_state(o) ((_zim_module_state*)PyModule_GetState(o))
-
-/*
- * Utility: returns True if 'obj' is an instance of 'MessageType'.
- */
-static int is_message(PyTypeObject* type, PyObject* obj)
-{
-    PyTypeObject* message_type;
-    _zim_module_state* rec = (_zim_module_state*)PyType_GetModuleState(type);
-    /* PT_GMS will already have set the exception */
-    if (rec == NULL) { return 0; }
-
-    message_type = rec->message_type;
-    return PyObject_TypeCheck(obj, message_type);
-}
-
 static _zim_module_state*
 _zim_state_init(PyObject* module)
 {
     _zim_module_state* rec = _zim_state(module);
+    int i;
     rec->message_type = NULL;
+    rec->factory_type = NULL;
+    rec->call_name = NULL;
+    for (i = 0; i < 7; i++) {
+        rec->arg_names[i] = NULL;
+    }
+    rec->interpolate = NULL;
+    rec->stats_enabled = 0;
+    rec->stats = NULL;
+    rec->sample_every = rec->sample_countdown = 0;
+    rec->sampler = NULL;
     return rec;
 }
 
@@ -333,7 +2246,16 @@ static int
 _zim_state_traverse(PyObject* module, visitproc visit, void* arg)
 {
     _zim_module_state* rec = _zim_state(module);
+    int i;
     Py_VISIT(rec->message_type);
+    Py_VISIT(rec->factory_type);
+    Py_VISIT(rec->call_name);
+    for (i = 0; i < 7; i++) {
+        Py_VISIT(rec->arg_names[i]);
+    }
+    Py_VISIT(rec->interpolate);
+    Py_VISIT(rec->stats);
+    Py_VISIT(rec->sampler);
     return 0;
 }
 
@@ -341,7 +2263,17 @@ static int
 _zim_state_clear(PyObject* module)
 {
     _zim_module_state* rec = _zim_state(module);
+    int i;
     Py_CLEAR(rec->message_type);
+    Py_CLEAR(rec->factory_type);
+    Py_CLEAR(rec->call_name);
+    for (i = 0; i < 7; i++) {
+        Py_CLEAR(rec->arg_names[i]);
+    }
+    Py_CLEAR(rec->interpolate);
+    rec->stats_enabled = 0;
+    Py_CLEAR(rec->stats);
+    Py_CLEAR(rec->sampler);
     return 0;
 }
 
@@ -354,6 +2286,16 @@ _zim_module_exec(PyObject* module)
 
     PyObject* message_bases;
     PyObject* message_type;
+    PyObject* factory_type;
+    int i;
+
+    for (i = 0; i < 7; i++) {
+        rec->arg_names[i] = PyUnicode_InternFromString(Message_arg_names[i]);
+        if (rec->arg_names[i] == NULL) { return -1; }
+    }
+
+    rec->stats = PyDict_New();
+    if (rec->stats == NULL) { return -1; }
 
     message_bases = Py_BuildValue("(O)", (PyObject*)&PyUnicode_Type);
     if (message_bases == NULL) { return -1; }
@@ -366,12 +2308,29 @@ _zim_module_exec(PyObject* module)
 
     rec->message_type = (PyTypeObject*)message_type;
 
+    /* Calling the type goes through Message_vectorcall */
+    rec->message_type->tp_vectorcall = Message_vectorcall;
+
     if (PyModule_AddObject(module, "Message", message_type) < 0) {
         return -1;
     }
 
     Py_INCREF(message_type);  /* Recover stolen ref */
 
+    rec->call_name = PyUnicode_InternFromString("_call");
+    if (rec->call_name == NULL) { return -1; }
+
+    factory_type = PyType_FromModuleAndSpec(module, &Factory_type_spec, NULL);
+    if (factory_type == NULL) { return -1; }
+
+    rec->factory_type = (PyTypeObject*)factory_type;
+
+    if (PyModule_AddObject(module, "_FactoryBase", factory_type) < 0) {
+        return -1;
+    }
+
+    Py_INCREF(factory_type);  /* Recover stolen ref */
+
     return 0;
 }
 
@@ -383,6 +2342,14 @@ _zim_module_exec(PyObject* module)
  */
 static PyModuleDef_Slot _zim_module_slots[] = {
     {Py_mod_exec,       _zim_module_exec},
+#ifdef Py_mod_multiple_interpreters
+    /* All the state is per module, hence per interpreter */
+    {Py_mod_multiple_interpreters, Py_MOD_PER_INTERPRETER_GIL_SUPPORTED},
+#endif
+#ifdef Py_mod_gil
+    /* Shared mutable data is protected by critical sections */
+    {Py_mod_gil,        Py_MOD_GIL_NOT_USED},
+#endif
     {0,                 NULL}
 };
 
@@ -391,6 +2358,7 @@ static struct PyModuleDef _zim_module = {
     .m_name     =_zim__name__,
     .m_doc      =_zim__doc__,
     .m_size     = sizeof(_zim_module_state),
+    .m_methods  = _zim_module_methods,
     .m_traverse = _zim_state_traverse,
     .m_clear    = _zim_state_clear,
     .m_slots    = _zim_module_slots,
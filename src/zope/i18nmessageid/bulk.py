@@ -0,0 +1,213 @@
+##############################################################################
+#
+# Copyright (c) 2026 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""Bulk serialization of messages.
+
+Messages can be serialized into a single pickled buffer with
+`dumps_many`, or exported into columnar buffers with `to_columns`, e.g.
+for analyzing or comparing many messages at once.
+"""
+import pickle
+from array import array
+from collections import namedtuple
+
+from zope.i18nmessageid import message as _message
+
+
+try:
+    from zope.i18nmessageid._zope_i18nmessageid_message import _to_columns
+except ModuleNotFoundError:  # pragma: no cover
+    _to_columns = None
+
+__docformat__ = "reStructuredText"
+
+#: The columnar buffers of messages returned by `to_columns`.
+#:
+#: *domains* is the list of the distinct domains, and *domain_codes* the
+#: ``array('i')`` of the index of the domain of each message in it.  The
+#: texts of the messages are encoded in UTF-8 into the single *data*
+#: blob, column after column: all the message ids, then the defaults,
+#: the ``msgid_plural`` and the ``default_plural``.  The text of column
+#: *k* of the message *i* of *n* messages lies between the offsets
+#: ``offsets[k * n + i]`` and ``offsets[k * n + i + 1]``, an
+#: ``array('q')`` of ``4 * n + 1`` offsets, and is None unless
+#: ``valid[k * n + i]`` is set.  *numbers* and *mappings* are the lists
+#: of the numbers and mappings of the messages.
+Columns = namedtuple('Columns', [
+    'domains', 'domain_codes', 'data', 'offsets', 'valid', 'numbers',
+    'mappings'])
+
+_FORMAT = 1
+# Positions of the text arguments in a reduced message (msgid, domain,
+# default, msgid_plural and default_plural): they are stored in the
+# table and referenced by index, index 0 meaning None.
+_TEXT_FIELDS = (0, 1, 2, 4, 5)
+
+
+def dumps_many(messages, protocol=None):
+    """Serialize a sequence of messages into a single `bytes` buffer.
+
+    Texts such as domains and defaults are stored once in a shared table
+    and each message refers to them by index, so repeating them costs
+    little.  Use `loads_many` to restore the messages.
+    """
+    table = [None]
+    indexes = {}
+    records = []
+    for message in messages:
+        record = list(message.__reduce__()[1])
+        for i in _TEXT_FIELDS:
+            if i >= len(record):
+                break
+            value = record[i]
+            if value is None:
+                record[i] = 0
+                continue
+            try:
+                key = (type(value), value)
+                index = indexes.get(key)
+            except TypeError:
+                # Unhashable default, store it as is.
+                key = index = None
+            if index is None:
+                index = len(table)
+                table.append(value)
+                if key is not None:
+                    indexes[key] = index
+            record[i] = index
+        records.append(tuple(record))
+    return pickle.dumps((_FORMAT, table, records), protocol)
+
+
+def loads_many(data, message_class=None):
+    """Restore the list of messages serialized by `dumps_many`.
+
+    The messages are created using *message_class*, by default
+    `zope.i18nmessageid.message.Message`.  As with `pickle`, only load
+    data from trusted sources.
+    """
+    if message_class is None:
+        message_class = _message.Message
+    format, table, records = pickle.loads(data)
+    if format != _FORMAT:
+        raise ValueError(f'Unsupported bulk format: {format!r}')
+    return message_class.from_records(
+        _restore(record, table) for record in records)
+
+
+def _restore(record, table):
+    args = list(record)
+    for i in _TEXT_FIELDS:
+        if i >= len(args):
+            break
+        args[i] = table[args[i]]
+    return tuple(args)
+
+
+def to_columns(messages):
+    """Export a sequence of messages into `Columns` buffers.
+
+    The domains are dictionary-encoded, and the texts encoded into one
+    UTF-8 blob, which can be processed without going through the
+    attributes of each message.  The buffers support the buffer
+    protocol.  Texts other than strings, e.g. some defaults, cannot be
+    exported, and raise `TypeError`.
+    """
+    if _to_columns is None:  # pragma: no cover
+        return _py_to_columns(messages)
+    (domains, codes, data, offsets, valid,
+     numbers, mappings) = _to_columns(messages)
+    return Columns(domains, _array('i', codes), data, _array('q', offsets),
+                   valid, numbers, mappings)
+
+
+def from_columns(columns, message_class=None):
+    """Create the list of messages exported by `to_columns`.
+
+    The messages are created using *message_class*, by default
+    `zope.i18nmessageid.message.Message`.
+    """
+    if message_class is None:
+        message_class = _message.Message
+    domains, codes, data, offsets, valid, numbers, mappings = columns
+    n = len(codes)
+    msgids, defaults, msgid_plurals, default_plurals = [
+        _decode(data, offsets, valid, k * n, n) for k in range(4)]
+    return message_class.from_records(zip(
+        msgids, [domains[code] for code in codes], defaults, mappings,
+        msgid_plurals, default_plurals, numbers))
+
+
+def _array(typecode, data):
+    result = array(typecode)
+    result.frombytes(data)
+    return result
+
+
+def _py_to_columns(messages):
+    domains = []
+    codes_by_domain = {}
+    codes = array('i')
+    texts = ([], [], [], [])
+    numbers = []
+    mappings = []
+    for message in messages:
+        args = (message,) if type(message) is str else message.__json__()
+        (msgid, domain, default, mapping, msgid_plural, default_plural,
+         number) = args + (None,) * (7 - len(args))
+        code = codes_by_domain.get(domain)
+        if code is None:
+            code = codes_by_domain[domain] = len(domains)
+            domains.append(domain)
+        codes.append(code)
+        texts[0].append(msgid)
+        texts[1].append(default)
+        texts[2].append(msgid_plural)
+        texts[3].append(default_plural)
+        numbers.append(number)
+        mappings.append(mapping)
+    chunks = []
+    offsets = array('q', [0])
+    valid = bytearray()
+    size = 0
+    for column in texts:
+        for text in column:
+            if text is None:
+                valid.append(0)
+            elif not isinstance(text, str):
+                raise TypeError(f'message texts must be str, not'
+                                f' {type(text).__name__}')
+            else:
+                encoded = text.encode('utf-8')
+                chunks.append(encoded)
+                size += len(encoded)
+                valid.append(1)
+            offsets.append(size)
+    return Columns(domains, codes, b''.join(chunks), offsets, bytes(valid),
+                   numbers, mappings)
+
+
+def _decode(data, offsets, valid, first, n):
+    # Return the texts of the column starting at offsets[first].
+    if 1 not in valid[first:first + n]:
+        # E.g. no message has a plural.
+        return [None] * n
+    start = offsets[first]
+    chunk = data[start:offsets[first + n]]
+    if chunk.isascii():
+        # Offsets in bytes are offsets in characters.
+        text = chunk.decode('ascii')
+        return [text[offsets[i] - start:offsets[i + 1] - start]
+                if valid[i] else None for i in range(first, first + n)]
+    return [data[offsets[i]:offsets[i + 1]].decode('utf-8')
+            if valid[i] else None for i in range(first, first + n)]
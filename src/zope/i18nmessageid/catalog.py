@@ -0,0 +1,210 @@
+##############################################################################
+#
+# Copyright (c) 2026 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""Compiled, memory-mapped translation catalogs.
+
+A compiled catalog holds the translations of one language, keyed by
+domain and message id, in a read-only binary file.  The file is opened
+with :mod:`mmap`, so that all the processes using it share one copy of
+it through the page cache, and texts are only decoded when found.
+
+The file starts with a header, followed by a hash table of buckets, the
+entries sorted by bucket, the plural forms of the entries, and the UTF-8
+encoded texts.  All the integers are unsigned, 32 bit and little-endian.
+"""
+import mmap
+import os
+import struct
+from zlib import crc32
+
+from zope.i18nmessageid.plural import GERMANIC
+from zope.i18nmessageid.plural import plural_rule
+from zope.i18nmessageid.plural import select_form
+
+
+__docformat__ = "reStructuredText"
+
+_MAGIC = b'ZIMC'
+_VERSION = 1
+# magic, version, number of buckets, number of entries, offset and length
+# of the Plural-Forms header.
+_HEADER = struct.Struct('<4sIIIII')
+# Index of the first entry of the bucket, number of entries.
+_BUCKET = struct.Struct('<II')
+# Hash, offset and length of the key, index of the first form, number of
+# forms.
+_ENTRY = struct.Struct('<IIIII')
+# Offset and length of the text.
+_FORM = struct.Struct('<II')
+
+
+def _key(domain, msgid):
+    # The byte 0xff never occurs in UTF-8: it stands for no domain, which
+    # differs from the empty domain.
+    domain = b'\xff' if domain is None else domain.encode('utf-8')
+    return b'%s\0%s' % (domain, msgid.encode('utf-8'))
+
+
+def write_catalog(path, translations, plural_forms=None):
+    """Compile *translations* into the catalog file at *path*.
+
+    *translations* maps ``(domain, msgid)`` pairs to either a text or the
+    sequence of the plural forms of the translation.  The domain of
+    messages without one is ``None``, which differs from ``''``.
+    *plural_forms* is the ``Plural-Forms`` header of the language, by
+    default that of the germanic languages.
+
+    The file is written next to *path* and then moved into place, so
+    that processes which already mapped the old file keep reading it.
+    """
+    if plural_forms is not None:
+        # Fail early on invalid rules.
+        plural_rule(plural_forms)
+    else:
+        plural_forms = ''
+    entries = []
+    for (domain, msgid), forms in translations.items():
+        if isinstance(forms, str):
+            forms = (forms,)
+        key = _key(domain, msgid)
+        entries.append((crc32(key), key, tuple(forms)))
+    nbuckets = max(len(entries), 1)
+    entries.sort(key=lambda entry: entry[0] % nbuckets)
+    nforms = sum(len(forms) for _, _, forms in entries)
+
+    data = bytearray()
+    start = (_HEADER.size + nbuckets * _BUCKET.size
+             + len(entries) * _ENTRY.size + nforms * _FORM.size)
+
+    def add(text):
+        offset = start + len(data)
+        data.extend(text)
+        return offset
+
+    header = plural_forms.encode('utf-8')
+    parts = [_HEADER.pack(_MAGIC, _VERSION, nbuckets, len(entries),
+                          add(header), len(header))]
+    counts = [0] * nbuckets
+    for hash, _, _ in entries:
+        counts[hash % nbuckets] += 1
+    first = 0
+    for count in counts:
+        parts.append(_BUCKET.pack(first, count))
+        first += count
+    form_parts = []
+    for hash, key, forms in entries:
+        parts.append(_ENTRY.pack(hash, add(key), len(key),
+                                 len(form_parts), len(forms)))
+        for form in forms:
+            text = form.encode('utf-8')
+            form_parts.append(_FORM.pack(add(text), len(text)))
+    parts.extend(form_parts)
+    parts.append(data)
+
+    tmp = f'{os.fspath(path)}.{os.getpid()}.tmp'
+    try:
+        with open(tmp, 'wb') as f:
+            f.writelines(parts)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+class Catalog:
+    """A compiled catalog, opened read-only with :mod:`mmap`.
+
+    Catalogs are context managers which close the file when leaving the
+    block.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._read_header(path)
+        except BaseException:
+            self._mmap.close()
+            raise
+
+    def _read_header(self, path):
+        try:
+            (magic, version, self._nbuckets, self._nentries,
+             offset, length) = _HEADER.unpack_from(self._mmap)
+        except struct.error:
+            magic = version = None
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f'Not a compiled catalog: {path!r}')
+        self._entries = _HEADER.size + self._nbuckets * _BUCKET.size
+        self._forms = self._entries + self._nentries * _ENTRY.size
+        header = self._mmap[offset:offset + length].decode('utf-8')
+        self.plural_forms = header or None
+        self.plural_rule = plural_rule(header) if header else GERMANIC
+
+    def __len__(self):
+        return self._nentries
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Unmap the file."""
+        self._mmap.close()
+
+    def _find(self, key):
+        # Return the (index of the first form, number of forms) of the
+        # entry of *key*, or None.
+        mm = self._mmap
+        hash = crc32(key)
+        first, count = _BUCKET.unpack_from(
+            mm, _HEADER.size + (hash % self._nbuckets) * _BUCKET.size)
+        offset = self._entries + first * _ENTRY.size
+        for offset in range(offset, offset + count * _ENTRY.size,
+                            _ENTRY.size):
+            (entry_hash, key_offset, key_length,
+             form, nforms) = _ENTRY.unpack_from(mm, offset)
+            if (entry_hash == hash and key_length == len(key)
+                    and mm[key_offset:key_offset + key_length] == key):
+                return form, nforms
+        return None
+
+    def _text(self, form):
+        offset, length = _FORM.unpack_from(
+            self._mmap, self._forms + form * _FORM.size)
+        return self._mmap[offset:offset + length].decode('utf-8')
+
+    def get(self, domain, msgid, default=None):
+        """Return the (singular) translation of *msgid* in *domain*."""
+        found = self._find(_key(domain, msgid))
+        if found is None:
+            return default
+        return self._text(found[0])
+
+    def lookup(self, message, default=None):
+        """Return the translation of *message*, or *default*.
+
+        The translation is found using the message's domain and message
+        id.  If the message has a ``msgid_plural``, the plural form
+        matching its ``number`` is returned.
+        """
+        found = self._find(_key(message.domain, message))
+        if found is None:
+            return default
+        form, nforms = found
+        if nforms > 1 and message.msgid_plural is not None:
+            form += min(select_form(message, self.plural_rule), nforms - 1)
+        return self._text(form)
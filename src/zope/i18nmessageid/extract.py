@@ -0,0 +1,296 @@
+##############################################################################
+#
+# Copyright (c) 2026 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""Extraction of message ids from Python sources.
+
+Sources are tokenized, neither imported nor parsed, to find the names
+bound to message factories, e.g. ``_ = MessageFactory('domain')``, and
+the calls of these factories with literal message ids.  The messages
+found are streamed as ``(filename, lineno, record)`` triples, where the
+record is the tuple of the arguments of `Message`: ``(msgid, domain,
+default, mapping, msgid_plural, default_plural)``.  The mapping is always
+``None``, and so are the texts which are not literals.  Records can be
+turned into messages with `Message.from_records`.
+"""
+import ast
+import json
+import os
+import token
+import tokenize
+
+
+__docformat__ = "reStructuredText"
+
+# Tokens which are irrelevant to the extraction.
+_SKIPPED = frozenset([
+    token.COMMENT, token.NL, token.INDENT, token.DEDENT, token.ENCODING,
+    token.ENDMARKER])
+# Positions of the factory arguments which are extracted: the message
+# id, default, msgid_plural and default_plural.
+_FACTORY_ARGS = ('msgid', 'default', None, 'msgid_plural', 'default_plural')
+_NOT_LITERAL = object()
+_CACHE_FORMAT = 1
+# Below this many bytes of files to extract, about a fifth of a second
+# of work, starting worker processes costs more than it saves.
+_PARALLEL_MIN_SIZE = 256 * 1024
+
+
+def extract_source(source, filename='<string>'):
+    """Extract the messages of the Python source code *source*."""
+    lines = iter(source.splitlines(keepends=True))
+    return _extract(lambda: next(lines, ''), filename)
+
+
+def extract_file(filename):
+    """Extract the messages of the Python source file *filename*."""
+    with tokenize.open(filename) as f:
+        yield from _extract(f.readline, filename)
+
+
+def extract(paths, processes=None, cache=None):
+    """Extract the messages of Python source files.
+
+    *paths* are files, or directories which are searched for ``*.py``
+    files.  The files are spread across at most *processes* worker
+    processes, by default one per CPU, and no more than there are files;
+    ``0`` extracts them in this process, as do few or small files, or
+    platforms where worker processes cannot be used.  Messages are
+    streamed in the order of the files.
+
+    *cache* is the path of a file in which the messages of each file are
+    kept, with its modification time: files which did not change since
+    the previous run are not extracted again.  The cache is updated once
+    all the messages have been consumed.
+    """
+    filenames = list(_find_files(paths))
+    entries = _load_cache(cache) if cache is not None else {}
+    stats = {}
+    todo = []
+    for filename in filenames:
+        stat = os.stat(filename)
+        stats[filename] = [stat.st_mtime_ns, stat.st_size]
+        entry = entries.get(filename)
+        if entry is None or entry[0] != stats[filename]:
+            todo.append(filename)
+    if processes is None:
+        processes = os.cpu_count() or 1
+    processes = min(processes, len(todo))
+    if (processes > 1
+            and sum(stats[f][1] for f in todo) >= _PARALLEL_MIN_SIZE):
+        results = _extract_parallel(todo, processes)
+    else:
+        results = map(_extract_list, todo)
+    yield from _collect(filenames, set(todo), results, entries, stats)
+    if cache is not None:
+        _save_cache(cache, entries, filenames)
+
+
+def _extract_parallel(todo, processes):
+    # Results come in the order of the files, as they are ready.  If the
+    # workers cannot be started, or die, the remaining files are extracted
+    # in this process.
+    from concurrent.futures import ProcessPoolExecutor
+    from concurrent.futures.process import BrokenProcessPool
+    done = 0
+    try:
+        with ProcessPoolExecutor(processes) as executor:
+            for found in executor.map(_extract_list, todo, chunksize=4):
+                yield found
+                done += 1
+    except (OSError, NotImplementedError, ImportError, BrokenProcessPool):
+        pass
+    yield from map(_extract_list, todo[done:])
+
+
+def _collect(filenames, todo, results, entries, stats):
+    # Yield the messages of the files in order, updating the cache entries.
+    for filename in filenames:
+        if filename in todo:
+            found = next(results)
+            entries[filename] = [stats[filename], found]
+        else:
+            found = entries[filename][1]
+        for lineno, record in found:
+            yield filename, lineno, tuple(record)
+
+
+def _extract_list(filename):
+    # Also run in worker processes: return picklable results.
+    return [[lineno, record]
+            for _, lineno, record in extract_file(filename)]
+
+
+def _find_files(paths):
+    for path in paths:
+        path = os.fspath(path)
+        if not os.path.isdir(path):
+            yield path
+            continue
+        for dirpath, dirnames, filenames in os.walk(path):
+            dirnames.sort()
+            for name in sorted(filenames):
+                if name.endswith('.py'):
+                    yield os.path.join(dirpath, name)
+
+
+def _load_cache(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, dict) or data.get('format') != _CACHE_FORMAT:
+        return {}
+    return data['files']
+
+
+def _save_cache(path, entries, filenames):
+    data = {
+        'format': _CACHE_FORMAT,
+        'files': {filename: entries[filename] for filename in filenames},
+    }
+    tmp = f'{os.fspath(path)}.{os.getpid()}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def _literal(tokens):
+    # Return the value of a literal string argument, None, or _NOT_LITERAL.
+    if len(tokens) == 1 and tokens[0].string == 'None':
+        return None
+    if not tokens or any(t.type != token.STRING for t in tokens):
+        return _NOT_LITERAL
+    try:
+        value = ''.join(ast.literal_eval(t.string) for t in tokens)
+    except (SyntaxError, ValueError, TypeError):
+        # Bytes, or f-strings on Python < 3.12.
+        return _NOT_LITERAL
+    return value
+
+
+def _arguments(tokens, i):
+    # Split the arguments of the call whose '(' is at tokens[i] into
+    # lists of tokens.
+    args = []
+    current = []
+    depth = 0
+    for j in range(i + 1, len(tokens)):
+        tok = tokens[j]
+        if tok.type == token.OP and tok.string in '([{':
+            depth += 1
+        elif tok.type == token.OP and tok.string in ')]}':
+            if depth == 0:
+                if current:
+                    args.append(current)
+                return args
+            depth -= 1
+        elif depth == 0 and tok.type == token.OP and tok.string == ',':
+            args.append(current)
+            current = []
+            continue
+        current.append(tok)
+    return args
+
+
+def _keyword(arg):
+    # Return the (name, value tokens) of a keyword argument, or None.
+    if (len(arg) >= 2 and arg[0].type == token.NAME
+            and arg[1].type == token.OP and arg[1].string == '='):
+        return arg[0].string, arg[2:]
+    return None
+
+
+def _bindings(tokens):
+    # Return the domains of the names bound to message factories.
+    classes = {'MessageFactory'}
+    factories = {'ZopeMessageFactory': 'zope'}
+    for i, tok in enumerate(tokens[:-2]):
+        # Imports: ... import MessageFactory as MF
+        if (tok.type == token.NAME and tokens[i + 1].string == 'as'
+                and tokens[i + 2].type == token.NAME):
+            if tok.string == 'MessageFactory':
+                classes.add(tokens[i + 2].string)
+            elif tok.string == 'ZopeMessageFactory':
+                factories[tokens[i + 2].string] = 'zope'
+    for i, tok in enumerate(tokens[:-3]):
+        if not (tok.type == token.NAME and tokens[i + 1].string == '='
+                and tokens[i + 2].type == token.NAME):
+            continue
+        if i > 0 and tokens[i - 1].string == '.':
+            # An attribute.
+            continue
+        # Skip a dotted prefix, e.g. zope.i18nmessageid.MessageFactory
+        j = i + 2
+        while (j + 2 < len(tokens) and tokens[j + 1].string == '.'
+               and tokens[j + 2].type == token.NAME):
+            j += 2
+        name = tokens[j].string
+        if name in classes and tokens[j + 1].string == '(':
+            args = _arguments(tokens, j + 1)
+            domain = _NOT_LITERAL
+            for position, arg in enumerate(args):
+                keyword = _keyword(arg)
+                if keyword is not None and keyword[0] == 'domain':
+                    domain = _literal(keyword[1])
+                elif keyword is None and position == 0:
+                    domain = _literal(arg)
+            if domain is not _NOT_LITERAL:
+                factories[tok.string] = domain
+        elif name in factories and tokens[j + 1].type == token.NEWLINE:
+            # An alias of a factory, e.g. _ = ZopeMessageFactory
+            factories[tok.string] = factories[name]
+    return factories
+
+
+def _extract(readline, filename):
+    tokens = []
+    try:
+        for tok in tokenize.generate_tokens(readline):
+            if tok.type not in _SKIPPED:
+                tokens.append(tok)
+    except (tokenize.TokenError, SyntaxError):
+        # Extract what could be tokenized.
+        pass
+    factories = _bindings(tokens)
+    i = 0
+    while i < len(tokens) - 1:
+        tok = tokens[i]
+        if (tok.type != token.NAME or tok.string not in factories
+                or tokens[i + 1].string != '('
+                or (i > 0 and tokens[i - 1].string in ('.', 'def'))):
+            i += 1
+            continue
+        args = _arguments(tokens, i + 1)
+        texts = dict.fromkeys(filter(None, _FACTORY_ARGS))
+        for position, arg in enumerate(args):
+            keyword = _keyword(arg)
+            if keyword is None:
+                name = (_FACTORY_ARGS[position]
+                        if position < len(_FACTORY_ARGS) else None)
+                value = arg
+            else:
+                name, value = keyword
+                if name == 'ustr':
+                    name = 'msgid'
+            if name in texts:
+                texts[name] = _literal(value)
+        for name, value in texts.items():
+            if value is _NOT_LITERAL:
+                texts[name] = None
+        if isinstance(texts['msgid'], str):
+            yield filename, tok.start[0], (
+                texts['msgid'], factories[tok.string], texts['default'],
+                None, texts['msgid_plural'], texts['default_plural'])
+        # Go on inside the call, to find nested calls, e.g. in a mapping.
+        i += 2
@@ -0,0 +1,78 @@
+##############################################################################
+#
+# Copyright (c) 2026 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""Interpolation of mappings into message texts.
+
+Texts refer to the values of a mapping with ``$name`` or ``${name}``
+placeholders, like in :mod:`zope.i18n`; ``$$name`` is left alone.  Each
+text is parsed once into a plan which is then reused.
+"""
+import re
+
+
+__docformat__ = "reStructuredText"
+
+_NAME_RE = r'[a-zA-Z][-a-zA-Z0-9_]*'
+_interp_regex = re.compile(
+    r'(?<!\$)(\$(?:(%(n)s)|{(%(n)s)}))' % {'n': _NAME_RE})
+
+# Plans by text.  The cache is simply emptied when it is full: texts come
+# from a bounded set of messages, so this rarely happens.
+_plans = {}
+_MAX_PLANS = 10000
+
+
+def parse(text):
+    """Return the interpolation plan of *text*.
+
+    The plan is a pair: the tuple of the literal parts of the text, and
+    the tuple of the ``(name, placeholder)`` pairs found between them.
+    """
+    try:
+        return _plans[text]
+    except KeyError:
+        pass
+    text = str(text)
+    literals = []
+    placeholders = []
+    start = 0
+    for match in _interp_regex.finditer(text):
+        literals.append(text[start:match.start()])
+        whole, name, braced_name = match.groups()
+        placeholders.append((name or braced_name, whole))
+        start = match.end()
+    literals.append(text[start:])
+    plan = (tuple(literals), tuple(placeholders))
+    if len(_plans) >= _MAX_PLANS:
+        _plans.clear()
+    _plans[text] = plan
+    return plan
+
+
+def interpolate(text, mapping=None):
+    """Replace the placeholders in *text* by the values of *mapping*.
+
+    Placeholders whose name is not in *mapping* are left as they are.
+    """
+    if not text or not mapping:
+        return text
+    literals, placeholders = parse(text)
+    if not placeholders:
+        return text
+    parts = [literals[0]]
+    append = parts.append
+    get = mapping.get
+    for (name, whole), literal in zip(placeholders, literals[1:]):
+        append(str(get(name, whole)))
+        append(literal)
+    return ''.join(parts)
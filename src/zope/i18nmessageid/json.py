@@ -0,0 +1,200 @@
+##############################################################################
+#
+# Copyright (c) 2026 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""JSON serialization of messages.
+
+Messages are text, which :mod:`json` would serialize as plain strings,
+losing their domain, default and mapping.  `dumps` serializes each
+message as an object with a single ``"__message__"`` key, whose value is
+the compact array returned by the message's ``__json__`` method: the
+arguments of its constructor, as reduced for pickling, e.g.
+``{"__message__":["robot","futurama"]}``.  `loads` turns these objects
+back into messages.
+
+:mod:`json` writes instances of `str` subclasses itself, without calling
+the ``default`` hook of its encoder.  The C extension provides an
+encoder which writes messages from their fields, and is used unless
+options of `json.dumps` it does not support are given.  Otherwise, the
+messages of a document are found before encoding it, and only the lists
+and dicts holding them are copied.  Other objects with a ``__json__``
+method are converted by the ``default`` hook, when the encoder reaches
+them.
+"""
+import json
+from json.encoder import encode_basestring
+from json.encoder import encode_basestring_ascii
+
+from zope.i18nmessageid import message as _message
+
+
+try:
+    from ._zope_i18nmessageid_message import _json_dumps
+except ModuleNotFoundError:  # pragma: no cover
+    _json_dumps = None
+
+
+__docformat__ = "reStructuredText"
+
+_TAG = '__message__'
+_SCALARS = frozenset([str, int, float, bool, type(None)])
+_COMPACT = (',', ':')
+# The options of json.dumps supported by the C encoder.
+_C_OPTIONS = frozenset(['separators', 'default', 'ensure_ascii'])
+
+
+def _encode(obj):
+    # Return obj, with its messages replaced by tagged arrays.  Only the
+    # containers holding messages are copied: obj itself is returned if
+    # it holds none.
+    cls = type(obj)
+    if cls in _SCALARS:
+        return obj
+    if isinstance(obj, str):
+        to_json = getattr(cls, '__json__', None)
+        if to_json is None:
+            return obj
+        args = to_json(obj)
+        if len(args) > 3 and args[3] is not None:
+            # The mapping may hold messages too.
+            mapping = _encode(args[3])
+            if mapping is not args[3]:
+                args = list(args)
+                args[3] = mapping
+        return {_TAG: args}
+    copy = None
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            if type(value) in _SCALARS:
+                continue
+            encoded = _encode(value)
+            if encoded is not value:
+                if copy is None:
+                    copy = dict(obj)
+                copy[key] = encoded
+    elif isinstance(obj, (list, tuple)):
+        for i, item in enumerate(obj):
+            if type(item) in _SCALARS:
+                continue
+            encoded = _encode(item)
+            if encoded is not item:
+                if copy is None:
+                    copy = list(obj)
+                copy[i] = encoded
+    return obj if copy is None else copy
+
+
+def _default(default):
+    # Return the default hook of the encoder, converting the objects
+    # with a __json__ method before calling *default*, if any.
+    def hook(obj):
+        to_json = getattr(type(obj), '__json__', None)
+        if to_json is not None:
+            return to_json(obj)
+        if default is not None:
+            return default(obj)
+        raise TypeError(
+            f'Object of type {type(obj).__name__} is not JSON serializable')
+
+    return hook
+
+
+def _c_dumps(obj, kw):
+    # Return the JSON text of obj, written by the C encoder, or None if it
+    # cannot be used.
+    kw.setdefault('separators', _COMPACT)
+    if _json_dumps is None or not kw.keys() <= _C_OPTIONS:
+        return None
+    item_separator, key_separator = kw['separators']
+    if kw.get('ensure_ascii', True):
+        encode_string = encode_basestring_ascii
+    else:
+        encode_string = encode_basestring
+    return _json_dumps(obj, _default(kw.get('default')),
+                       item_separator, key_separator, encode_string)
+
+
+def _py_options(kw):
+    # Return the options of json.dumps, with a default hook encoding the
+    # messages of the objects it converts.
+    hook = _default(kw.get('default'))
+    kw['default'] = lambda obj: _encode(hook(obj))
+    return kw
+
+
+def _object_hook(message_class, object_hook):
+    # Return a hook creating the messages of a document.  Messages
+    # without a mapping are immutable, so that equal ones are shared.
+    if message_class is None:
+        message_class = _message.Message
+    shared = {}
+
+    def hook(obj):
+        if len(obj) != 1 or _TAG not in obj:
+            return obj if object_hook is None else object_hook(obj)
+        args = obj[_TAG]
+        if len(args) > 3 and args[3] is not None:
+            return message_class(*args)
+        key = tuple(args)
+        try:
+            found = shared.get(key)
+        except TypeError:
+            # An unhashable default.
+            return message_class(*args)
+        if found is None:
+            found = shared[key] = message_class(*args)
+        return found
+
+    return hook
+
+
+def dumps(obj, **kw):
+    """Serialize *obj*, and the messages it contains, to a JSON string.
+
+    Messages are found in lists, tuples and the values of dicts, and
+    also in the mappings of messages.  Objects with a ``__json__`` method
+    are replaced by the result of that method.  The other keyword
+    arguments are those of `json.dumps`; the output is compact by
+    default.
+    """
+    data = _c_dumps(obj, kw)
+    if data is not None:
+        return data
+    return json.dumps(_encode(obj), **_py_options(kw))
+
+
+def dump(obj, fp, **kw):
+    """Serialize *obj* as with `dumps`, into the file *fp*."""
+    data = _c_dumps(obj, kw)
+    if data is not None:
+        fp.write(data)
+    else:
+        json.dump(_encode(obj), fp, **_py_options(kw))
+
+
+def loads(s, message_class=None, object_hook=None, **kw):
+    """Deserialize the JSON document *s*, restoring its messages.
+
+    The messages are created using *message_class*, by default
+    `zope.i18nmessageid.message.Message`.  Their domains are interned,
+    and equal messages without a mapping are only created once.  The
+    other objects are passed to *object_hook*, if any; the other keyword
+    arguments are those of `json.loads`.
+    """
+    hook = _object_hook(message_class, object_hook)
+    return json.loads(s, object_hook=hook, **kw)
+
+
+def load(fp, message_class=None, object_hook=None, **kw):
+    """Deserialize the JSON document in the file *fp*, as with `loads`."""
+    hook = _object_hook(message_class, object_hook)
+    return json.load(fp, object_hook=hook, **kw)
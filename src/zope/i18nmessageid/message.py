@@ -13,111 +13,493 @@
 ##############################################################################
 """I18n Messages and factories.
 """
-import types
+import sys
+from _thread import allocate_lock
+from sys import intern
 
 
+# This module is imported by most Zope packages: keep importing it cheap,
+# by only importing what is needed when it is needed.  The Python
+# implementation of messages and the types of results are only defined
+# when first used, see `__getattr__`.
+
 __docformat__ = "reStructuredText"
 _marker = object()
 
+# The fields of the named tuples returned by `MessageFactory.cache_info`
+# and `stats`.
+_RESULT_FIELDS = {
+    'CacheInfo': ('hits', 'misses', 'evictions', 'maxsize', 'currsize'),
+    'Stats': ('domains', 'call_sites'),
+}
 
-class Message(str):
-    """Message (Python implementation)
+# The counters of the statistics, the first ones also recorded by the C
+# implementation, in the same order.
+STATS_EVENTS = (
+    'created', 'copied', 'mapping_wraps', 'pickled', 'factory_calls')
+_CREATED, _COPIED, _MAPPING_WRAPS, _PICKLED, _FACTORY_CALLS = range(5)
+# Modules skipped when sampling call sites.
+_STATS_INTERNAL = frozenset([
+    __name__, 'zope.i18nmessageid._pymessage',
+    'zope.i18nmessageid._jitmessage', 'zope.i18nmessageid.bulk'])
+# The domain counting the messages whose domain is not hashable.
+_UNHASHABLE = '<unhashable>'
 
-    This is a string used as a message.  It has a domain attribute that is
-    its source domain, and a default attribute that is its default text to
-    display when there is no translation.  domain may be None meaning there is
-    no translation domain.  default may also be None, in which case the
-    message id itself implicitly serves as the default text.
-    """
+_stats_lock = allocate_lock()
+_stats_enabled = False
+_stats = {}
+_call_sites = {}
+_sample_every = _sample_countdown = 0
 
-    __slots__ = (
-        'domain', 'default', 'mapping', '_readonly',
-        'msgid_plural', 'default_plural', 'number')
-
-    def __new__(cls, ustr, domain=_marker, default=_marker, mapping=_marker,
-                msgid_plural=_marker, default_plural=_marker, number=_marker):
-        self = str.__new__(cls, ustr)
-        if isinstance(ustr, self.__class__):
-            self.domain = ustr.domain
-            self.default = ustr.default
-            self.mapping = ustr.mapping
-            self.msgid_plural = ustr.msgid_plural
-            self.default_plural = ustr.default_plural
-            self.number = ustr.number
-        else:
-            self.domain = None
-            self.default = None
-            self.mapping = None
-            self.msgid_plural = None
-            self.default_plural = None
-            self.number = None
-
-        if domain is not _marker:
-            self.domain = domain
-        if default is not _marker:
-            self.default = default
-        if mapping is None:
-            self.mapping = None
-        elif mapping is not _marker:
-            self.mapping = types.MappingProxyType(mapping)
-        if msgid_plural is not _marker:
-            self.msgid_plural = msgid_plural
-        if default_plural is not _marker:
-            self.default_plural = default_plural
-        if number is not _marker:
-            self.number = number
-
-        if self.number is not None and not isinstance(
-                self.number, (int, float)):
-            raise TypeError('`number` should be an integer or a float')
-
-        self._readonly = True
-        return self
-
-    def __setattr__(self, key, value):
-        """Message is immutable
-
-        It cannot be changed once the message id is created.
-        """
-        if getattr(self, '_readonly', False):
-            raise AttributeError('readonly attribute')
-        else:
-            return str.__setattr__(self, key, value)
-
-    def __getstate__(self):
-        # types.MappingProxyType is not picklable
-        mapping = None if self.mapping is None else dict(self.mapping)
-        return (
-            str(self),
-            self.domain,
-            self.default,
-            mapping,
-            self.msgid_plural,
-            self.default_plural,
-            self.number,
-        )
 
-    def __reduce__(self):
-        return self.__class__, self.__getstate__()
+try:
+    from ._zope_i18nmessageid_message import Message
+    from ._zope_i18nmessageid_message import _configure_stats
+    from ._zope_i18nmessageid_message import _FactoryBase
+    from ._zope_i18nmessageid_message import _get_stats
+    from ._zope_i18nmessageid_message import _reset_stats
+except ModuleNotFoundError:  # pragma: no cover
+    # E.g. on PyPy, which the Python implementation is tuned for.
+    from ._jitmessage import Message
+    _configure_stats = _get_stats = _reset_stats = None
+    _FactoryBase = object
 
+# The message classes which were imported.
+_MESSAGE_TYPES = (Message,)
 
-# Name the fallback Python implementation to make it easier to test.
-pyMessage = Message
 
+def __getattr__(name):
+    # Define the attributes which are rarely needed when first accessed.
+    global _MESSAGE_TYPES
+    if name in ('pyMessage', 'jitMessage'):
+        # The Python implementations, named to make it easier to test:
+        # the fallback one derives from the plain one.
+        from ._pymessage import Message as value
+        _MESSAGE_TYPES = (Message, value)
+        if name == 'jitMessage':
+            from ._jitmessage import Message as value
+    elif name in _RESULT_FIELDS:
+        from collections import namedtuple
+        value = namedtuple(name, _RESULT_FIELDS[name])
+    else:
+        raise AttributeError(
+            f'module {__name__!r} has no attribute {name!r}')
+    return globals().setdefault(name, value)
 
-try:
-    from ._zope_i18nmessageid_message import Message
-except ModuleNotFoundError:  # pragma: no cover
-    pass
 
+def _lazy(name):
+    # Return a module attribute defined by `__getattr__`.
+    try:
+        return globals()[name]
+    except KeyError:
+        return __getattr__(name)
+
+
+class _CallSignature:
+    # The signature of calling a factory, for `inspect.signature`, which
+    # cannot find it when the C base of MessageFactory implements calls.
+
+    def __get__(self, factory, cls=None):
+        if factory is None:
+            # The signature of the class is that of its constructor.
+            return None
+        from inspect import isfunction
+        from inspect import signature
+        if isfunction(getattr(type(factory), '__call__', None)):
+            # A subclass overriding __call__.
+            return signature(factory.__call__)
+        return signature(factory._call)
+
+
+class MessageFactory(_FactoryBase):
+    """Factory for creating i18n messages.
+
+    If *cache_size* is not ``0``, the factory interns the messages it
+    creates without a ``mapping`` or a ``number``: calling it again with
+    the same text arguments returns the message built the first time.
+    Messages are immutable, so sharing them is safe.  A positive
+    *cache_size* bounds the cache, evicting the least recently used
+    message first; ``None`` lets it grow without limit.
 
-class MessageFactory:
-    """Factory for creating i18n messages."""
+    If *registry* is true, the factory records every distinct message it
+    creates without a ``mapping`` or a ``number`` in a registry, which is
+    never evicted and takes precedence over the interning cache.  The
+    registry can be written to a file with `dump_registry`, and read back
+    with `preload`, e.g. by the master process of a preforking server.
 
-    def __init__(self, domain):
-        self._domain = domain
+    A factory can also translate its messages, and memoize the results:
+    see `set_translator`.
+
+    Copies and pickles of a factory have its domain and options, but
+    neither its cached messages, its registry nor its translator.
+    """
+
+    # Defaults for subclasses which set `_domain` without calling
+    # `__init__`: such a factory neither interns nor translates.
+    _cache_size = 0
+    _cache = None
+    _registry = None
+    _cache_lock = allocate_lock()
+    _hits = _misses = _evictions = 0
+    _translate = None
+    _translation_cache_size = 0
+    _translations = None
+    if _FactoryBase is object:
+        # The C base stores these, and defaults to direct calls.
+        _domain = None
+        _direct = True
+
+    def __init__(self, domain, cache_size=0, registry=False):
+        if cache_size is not None and cache_size < 0:
+            raise ValueError('`cache_size` should be None or >= 0')
+        self._domain = intern(domain) if type(domain) is str else domain
+        self._cache_size = cache_size
+        self._cache = None
+        if cache_size != 0:
+            from collections import OrderedDict
+            self._cache = OrderedDict()
+        self._registry = {} if registry else None
+        # Whether calls may create messages right away: the C
+        # implementation then does it without calling `_call`.
+        self._direct = cache_size == 0 and not registry
+        self._cache_lock = allocate_lock()
+        self._hits = self._misses = self._evictions = 0
+        self._translate = None
+        self._translation_cache_size = 0
+        self._translations = {}
 
     def __call__(self, ustr, default=None, mapping=None,
                  msgid_plural=None, default_plural=None, number=None):
+        if _stats_enabled:
+            _record(self._domain, _FACTORY_CALLS)
+        if (not self._direct
+                and mapping is None and number is None
+                and type(ustr) is str
+                and (default is None or type(default) is str)
+                and (msgid_plural is None or type(msgid_plural) is str)
+                and (default_plural is None
+                     or type(default_plural) is str)):
+            return self._interned(ustr, default, msgid_plural, default_plural)
         return Message(ustr, self._domain, default, mapping,
                        msgid_plural, default_plural, number)
+
+    if _FactoryBase is not object:
+        # The C base implements calls, and only calls `_call` when it
+        # cannot create the message itself.
+        _call = __call__
+        del __call__
+        __signature__ = _CallSignature()
+
+    def __reduce__(self):
+        return (self.__class__,
+                (self._domain, self._cache_size, self._registry is not None))
+
+    def _interned(self, ustr, default, msgid_plural, default_plural):
+        key = (ustr, default, msgid_plural, default_plural)
+        registry = self._registry
+        if registry is not None:
+            message = registry.get(key)
+            if message is None:
+                message = Message(ustr, self._domain, default, None,
+                                  msgid_plural, default_plural, None)
+                with self._cache_lock:
+                    message = registry.setdefault(key, message)
+            return message
+        cache = self._cache
+        with self._cache_lock:
+            message = cache.get(key)
+            if message is not None:
+                self._hits += 1
+                if self._cache_size is not None:
+                    cache.move_to_end(key)
+                return message
+            self._misses += 1
+        message = Message(ustr, self._domain, default, None,
+                          msgid_plural, default_plural, None)
+        with self._cache_lock:
+            message = cache.setdefault(key, message)
+            if self._cache_size is not None and len(cache) > self._cache_size:
+                cache.popitem(last=False)
+                self._evictions += 1
+        return message
+
+    def many(self, records, defaults=None, mappings=None):
+        """Create a list of messages in the factory's domain.
+
+        Each record is either a string, a tuple of the factory's
+        positional arguments, or a dict with a 'msgid' key and the
+        factory's keyword arguments: a 'domain' key raises a
+        `TypeError`.  If *defaults* or *mappings* are given, *records*
+        holds the message ids and the three are parallel sequences of the
+        same length.  The interning cache is not used.
+        """
+        domain = self._domain
+        if defaults is not None or mappings is not None:
+            from itertools import repeat
+            msgids = list(records)
+            size = len(msgids)
+            if defaults is None:
+                defaults = repeat(None, size)
+            if mappings is None:
+                mappings = repeat(None, size)
+            return Message.from_records(
+                zip(msgids, defaults, mappings, strict=True), domain)
+        return Message.from_records(records, domain)
+
+    def cache_info(self):
+        """Report the interning cache statistics as a `CacheInfo` tuple.
+        """
+        with self._cache_lock:
+            return _lazy('CacheInfo')(
+                self._hits, self._misses, self._evictions,
+                self._cache_size,
+                0 if self._cache is None else len(self._cache))
+
+    def cache_clear(self):
+        """Empty the interning cache and reset its statistics.
+        """
+        with self._cache_lock:
+            if self._cache is not None:
+                self._cache.clear()
+            self._hits = self._misses = self._evictions = 0
+
+    def registered(self):
+        """Return the list of the messages in the registry.
+        """
+        with self._cache_lock:
+            return [] if self._registry is None else list(
+                self._registry.values())
+
+    def dump_registry(self, path):
+        """Write the messages in the registry to the file at *path*.
+
+        The file is written next to *path* and then moved into place.
+        """
+        import os
+
+        from zope.i18nmessageid.bulk import dumps_many
+        data = dumps_many(self.registered())
+        tmp = f'{os.fspath(path)}.{os.getpid()}.tmp'
+        try:
+            with open(tmp, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    def preload(self, path):
+        """Add the messages written by `dump_registry` to the registry.
+
+        Calling the factory then returns the preloaded messages, rather
+        than creating new ones.  Preloading them in the master process of
+        a preforking server, before forking, spares each worker building
+        them, and lets the workers share their memory: call `gc.freeze`
+        after preloading, so that garbage collections in the workers do
+        not write to them.  The C implementation does not track messages
+        holding only texts in the garbage collector anyway.
+
+        Messages of other domains, or with a ``mapping`` or a ``number``,
+        are skipped.  Return the number of messages added.  As with
+        `pickle`, only load files from trusted sources.
+        """
+        from zope.i18nmessageid.bulk import loads_many
+        with open(path, 'rb') as f:
+            messages = loads_many(f.read())
+        added = 0
+        with self._cache_lock:
+            if self._registry is None:
+                self._registry = {}
+                self._direct = False
+            for message in messages:
+                if (message.domain != self._domain
+                        or message.mapping is not None
+                        or message.number is not None):
+                    continue
+                key = (str(message), message.default, message.msgid_plural,
+                       message.default_plural)
+                if key not in self._registry:
+                    self._registry[key] = message
+                    added += 1
+        return added
+
+    def set_translator(self, translate, cache_size=1000):
+        """Register the callable translating the factory's messages.
+
+        *translate* is called with a message and a language, and returns
+        the translated text.  The translations of messages without a
+        ``mapping`` are memoized, up to *cache_size* per language, the
+        least recently used being evicted first; ``None`` lets the memo
+        grow without limit and ``0`` disables it.  Registering a
+        translator empties the memo.
+        """
+        if cache_size is not None and cache_size < 0:
+            raise ValueError('`cache_size` should be None or >= 0')
+        with self._cache_lock:
+            self._translate = translate
+            self._translation_cache_size = cache_size
+            self._translations = {}
+
+    def translate(self, msgid, language, default=None, mapping=None,
+                  msgid_plural=None, default_plural=None, number=None):
+        """Translate a message into *language* using the translator.
+
+        *msgid* is either a message, or the text of a message created by
+        calling the factory with the other arguments.  Results are
+        memoized, so that translating the same message again does not
+        call the translator.
+        """
+        translate = self._translate
+        if translate is None:
+            raise ValueError('No translator registered')
+        if isinstance(msgid, _MESSAGE_TYPES):
+            message = msgid
+        else:
+            message = self(msgid, default, mapping,
+                           msgid_plural, default_plural, number)
+        if self._translation_cache_size == 0 or message.mapping is not None:
+            return translate(message, language)
+        try:
+            key = message.cache_key
+            hash(key)
+        except TypeError:
+            # Unhashable default, e.g. a list.
+            return translate(message, language)
+        with self._cache_lock:
+            translate = self._translate
+            translations = self._translations
+            if translations is None:
+                translations = self._translations = {}
+            cache = translations.get(language)
+            if cache is None:
+                from collections import OrderedDict
+                cache = translations[language] = OrderedDict()
+            text = cache.get(key, _marker)
+            if text is not _marker:
+                if self._translation_cache_size is not None:
+                    cache.move_to_end(key)
+                return text
+        text = translate(message, language)
+        with self._cache_lock:
+            if (self._translations is not translations
+                    or translations.get(language) is not cache):
+                # Invalidated meanwhile, the text may be stale.
+                return text
+            cache[key] = text
+            if (self._translation_cache_size is not None
+                    and len(cache) > self._translation_cache_size):
+                cache.popitem(last=False)
+        return text
+
+    def invalidate(self, language=None):
+        """Forget the memoized translations, e.g. after catalogs reload.
+
+        Only those into *language* are forgotten if it is given.
+        """
+        with self._cache_lock:
+            if language is None:
+                self._translations = {}
+            elif self._translations is not None:
+                self._translations.pop(language, None)
+
+
+def enable_stats(sample_every=0):
+    """Start recording statistics about the messages, see `stats`.
+
+    If *sample_every* is not ``0``, the call site creating every
+    *sample_every*-th message is also recorded.  Statistics cost nothing
+    until they are enabled.
+    """
+    global _stats_enabled, _sample_every, _sample_countdown
+    if sample_every < 0:
+        raise ValueError('`sample_every` should be >= 0')
+    with _stats_lock:
+        _sample_every = _sample_countdown = sample_every
+        _stats_enabled = True
+    if _configure_stats is not None:
+        _configure_stats(True, sample_every, _sample_call_site)
+
+
+def disable_stats():
+    """Stop recording statistics, keeping those recorded so far.
+    """
+    global _stats_enabled
+    with _stats_lock:
+        _stats_enabled = False
+    if _configure_stats is not None:
+        _configure_stats(False, 0, None)
+
+
+def reset_stats():
+    """Forget the statistics recorded so far.
+    """
+    global _sample_countdown
+    with _stats_lock:
+        _stats.clear()
+        _call_sites.clear()
+        _sample_countdown = _sample_every
+    if _reset_stats is not None:
+        _reset_stats()
+
+
+def stats():
+    """Return the statistics recorded since they were enabled or reset.
+
+    The result is a `Stats` tuple.  Its ``domains`` map each domain to
+    the counters of its messages: those ``created`` from text, ``copied``
+    from another message, whose mapping was wrapped (``mapping_wraps``),
+    ``pickled``, and the ``factory_calls`` of the factories of the
+    domain.  Unpickling a message counts as creating it.  Messages whose
+    domain is not hashable are all counted, and their call sites
+    recorded, under the ``'<unhashable>'`` domain.  Its
+    ``call_sites`` map the sampled ``(domain, filename, lineno)`` call
+    sites to the number of messages they created.
+    """
+    with _stats_lock:
+        domains = {domain: list(counts) for domain, counts in _stats.items()}
+        call_sites = dict(_call_sites)
+    if _get_stats is not None:
+        for domain, c_counts in _get_stats().items():
+            counts = domains.setdefault(domain, [0] * len(STATS_EVENTS))
+            for i, count in enumerate(c_counts):
+                counts[i] += count
+    return _lazy('Stats')(
+        {domain: dict(zip(STATS_EVENTS, counts))
+         for domain, counts in domains.items()},
+        call_sites)
+
+
+def _record(domain, event):
+    global _sample_countdown
+    with _stats_lock:
+        try:
+            counts = _stats.get(domain)
+        except TypeError:
+            domain = _UNHASHABLE
+            counts = _stats.get(domain)
+        if counts is None:
+            counts = _stats[domain] = [0] * len(STATS_EVENTS)
+        counts[event] += 1
+        sample = False
+        if event <= _COPIED and _sample_every:
+            _sample_countdown -= 1
+            if _sample_countdown <= 0:
+                _sample_countdown = _sample_every
+                sample = True
+    if sample:
+        _sample_call_site(domain)
+
+
+def _sample_call_site(domain):
+    # Called when creating a message: record the first caller outside of
+    # this package.
+    frame = sys._getframe(1)
+    while (frame is not None
+           and frame.f_globals.get('__name__') in _STATS_INTERNAL):
+        frame = frame.f_back
+    if frame is None:  # pragma: no cover
+        return
+    site = (domain, frame.f_code.co_filename, frame.f_lineno)
+    with _stats_lock:
+        _call_sites[site] = _call_sites.get(site, 0) + 1
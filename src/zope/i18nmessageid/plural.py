@@ -0,0 +1,107 @@
+##############################################################################
+#
+# Copyright (c) 2026 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+"""Selection of plural forms.
+
+Plural rules are written as in the ``Plural-Forms`` header of gettext
+catalogs, e.g. ``nplurals=2; plural=(n != 1);``.  Each rule is compiled
+once into a Python function, and then used to select the form matching
+the ``number`` of a message.
+"""
+import gettext
+import re
+from functools import lru_cache
+
+
+__docformat__ = "reStructuredText"
+
+_plural_forms_regex = re.compile(
+    r'^\s*nplurals\s*=\s*(\d+)\s*;\s*plural\s*=\s*([^;]+?)\s*;?\s*$')
+
+
+class PluralRule:
+    """A compiled plural rule.
+
+    Calling it with a number returns the index of the plural form to use,
+    between 0 and *nplurals* - 1.  As with gettext, whose numbers are
+    integers, the rule is evaluated on the number truncated by `int`, so
+    that ``1.5`` uses the same form as ``1``; numbers `int` cannot
+    convert, e.g. ``nan``, raise its exception.
+    """
+
+    __slots__ = ('nplurals', 'expression', '_evaluate')
+
+    def __init__(self, expression, nplurals):
+        if nplurals < 1:
+            raise ValueError('`nplurals` should be at least 1')
+        self.nplurals = nplurals
+        self.expression = expression
+        self._evaluate = gettext.c2py(expression)
+
+    def __call__(self, number):
+        if type(number) is not int:
+            number = int(number)
+        index = self._evaluate(number)
+        return index if index < self.nplurals else self.nplurals - 1
+
+    def __repr__(self):
+        return (f'<{self.__class__.__name__}'
+                f' nplurals={self.nplurals}; plural={self.expression};>')
+
+
+@lru_cache(maxsize=256)
+def plural_rule(plural_forms):
+    """Return the compiled `PluralRule` of a ``Plural-Forms`` header value.
+
+    Rules are cached, so that each header is only compiled once.
+    """
+    match = _plural_forms_regex.match(plural_forms)
+    if match is None:
+        raise ValueError(f'Invalid Plural-Forms: {plural_forms!r}')
+    nplurals, expression = match.groups()
+    return PluralRule(expression, int(nplurals))
+
+
+#: The rule of English and the other germanic languages.
+GERMANIC = plural_rule('nplurals=2; plural=(n != 1);')
+
+
+def select_form(message, rule=GERMANIC):
+    """Return the index of the plural form matching a message's ``number``.
+
+    Messages without a ``number`` use the singular form, 0.
+    """
+    number = message.number
+    if number is None:
+        return 0
+    return rule(number)
+
+
+def resolve_default(message, rule=GERMANIC):
+    """Return the default text matching a message's ``number``.
+
+    The singular text is the message's ``default``, or else its message
+    id.  The plural text is its ``default_plural``, or else its
+    ``msgid_plural``.  *rule* is the plural rule of the language of these
+    texts.
+    """
+    singular = message.default
+    if singular is None:
+        singular = str(message)
+    if select_form(message, rule) == 0:
+        return singular
+    if message.default_plural is not None:
+        return message.default_plural
+    if message.msgid_plural is not None:
+        return message.msgid_plural
+    return singular
@@ -67,6 +67,49 @@ class PyMessageTests(unittest.TestCase):
         with self.assertRaises(TypeError):
             message.mapping['key'] = 'new value'
 
+    def test_mapping_is_wrapped_lazily(self):
+        mapping = {'key': 'value'}
+        message = self._makeOne('testing', 'domain', mapping=mapping)
+        # Reducing a message whose mapping was not accessed copies it too.
+        state = message.__reduce__()[1]
+        self.assertIsNot(state[3], mapping)
+        self.assertEqual(state[3], mapping)
+        proxy = message.mapping
+        self.assertIs(message.mapping, proxy)
+        self.assertEqual(proxy, mapping)
+        state = message.__reduce__()[1]
+        self.assertIsNot(state[3], mapping)
+        self.assertEqual(state[3], mapping)
+
+    def test_arguments_hold_a_copy_of_the_mapping(self):
+        from zope.i18nmessageid.bulk import to_columns
+        mapping = {'key': 'value'}
+        message = self._makeOne('testing', 'domain', mapping=mapping)
+        message.__reduce__()[1][3]['key'] = 'changed'
+        message.__json__()[3]['key'] = 'changed'
+        to_columns([message]).mappings[0]['key'] = 'changed'
+        self.assertEqual(message.mapping, {'key': 'value'})
+        self.assertEqual(message.interpolate(), 'testing')
+
+    def test_mapping_not_a_dict(self):
+        import collections
+        mapping = collections.UserDict({'key': 'value'})
+        message = self._makeOne('testing', 'domain', mapping=mapping)
+        self.assertEqual(message.mapping, mapping)
+        with self.assertRaises(TypeError):
+            message.mapping['key'] = 'new value'
+        self.assertIs(type(message.__reduce__()[1][3]), dict)
+        with self.assertRaises(TypeError):
+            self._makeOne('testing', mapping=['key'])
+
+    def test_domain_is_interned(self):
+        domain = ''.join(['dom', 'ain'])
+        message = self._makeOne('testing', domain)
+        self.assertIs(message.domain, sys.intern('domain'))
+        copy = self._makeOne(*message.__reduce__()[1])
+        self.assertIs(copy.domain, message.domain)
+        self.assertIs(self._makeOne('testing', None).domain, None)
+
     def test_values_without_defaults(self):
         mapping = {'key': 'value'}
         message = self._makeOne(
@@ -158,6 +201,43 @@ class PyMessageTests(unittest.TestCase):
         if self._TEST_READONLY:
             self.assertTrue(message._readonly)
 
+    def test_with_(self):
+        mapping = {'key': 'value'}
+        source = self._makeOne(
+            'testing', 'domain', 'default', mapping,
+            msgid_plural='testings', default_plural="defaults", number=0)
+        message = source.with_(mapping={'other': 'value'}, number=2)
+        self.assertIs(type(message), self._getTargetClass())
+        self.assertEqual(message, 'testing')
+        self.assertEqual(message.mapping, {'other': 'value'})
+        self.assertEqual(message.number, 2)
+        for attr in ('domain', 'default', 'msgid_plural', 'default_plural'):
+            self.assertIs(getattr(message, attr), getattr(source, attr))
+        self.assertEqual(source.mapping, mapping)
+        self.assertEqual(source.number, 0)
+
+        message = source.with_(domain='other', default=None, mapping=None,
+                               msgid_plural=None, default_plural=None,
+                               number=None)
+        self.assertEqual(message, 'testing')
+        self.assertEqual(message.domain, 'other')
+        for attr in ('default', 'mapping', 'msgid_plural', 'default_plural',
+                     'number'):
+            self.assertIsNone(getattr(message, attr))
+
+        copy = source.with_()
+        self.assertIsNot(copy, source)
+        self.assertIs(copy.mapping, source.mapping)
+
+    def test_with__invalid(self):
+        message = self._makeOne('testing')
+        with self.assertRaises(TypeError):
+            message.with_('domain')
+        with self.assertRaises(TypeError):
+            message.with_(unknown='value')
+        with self.assertRaises(TypeError):
+            message.with_(number='one')
+
     def test_copy_no_default(self):
         # https://github.com/zopefoundation/zope.i18nmessageid/issues/14
         pref_msg = self._makeOne("${name} Preferences")
@@ -222,10 +302,15 @@ class PyMessageTests(unittest.TestCase):
         klass, state = message.__reduce__()
         self.assertIs(klass, self._getTargetClass())
         self.assertIsNone(message.mapping)
+        self.assertEqual(state, ('testing',))
+
+    def test___reduce___trims_trailing_nones(self):
+        message = self._makeOne('testing', 'domain', mapping=None,
+                                msgid_plural='testings')
+        klass, state = message.__reduce__()
+        self.assertIs(klass, self._getTargetClass())
         self.assertEqual(
-            state,
-            ('testing', None, None, None, None, None, None)
-        )
+            state, ('testing', 'domain', None, None, 'testings'))
 
     def test___reduce__(self):
         mapping = {'key': 'value'}
@@ -240,6 +325,236 @@ class PyMessageTests(unittest.TestCase):
             ('testing', 'domain', 'default', {'key': 'value'},
              'testings', 'defaults', 2))
 
+    def test_pickle_roundtrip(self):
+        import pickle
+        klass = self._getTargetClass()
+        message = self._makeOne(
+            'testing', 'domain', 'default', {'key': 'value'},
+            msgid_plural='testings', default_plural="defaults", number=2)
+        for source in (message, self._makeOne('testing', 'domain')):
+            copy = klass(*source.__reduce__()[1])
+            for attr in ('domain', 'default', 'mapping', 'msgid_plural',
+                         'default_plural', 'number'):
+                self.assertEqual(getattr(copy, attr), getattr(source, attr))
+        if klass is messageid.Message:
+            self.assertEqual(pickle.loads(pickle.dumps(message)).mapping,
+                             {'key': 'value'})
+
+    def test_interpolate(self):
+        message = self._makeOne(
+            'testing', 'domain', '${name} is $what, not ${other}',
+            {'name': 'Bender', 'what': 'a robot'})
+        self.assertEqual(message.interpolate(),
+                         'Bender is a robot, not ${other}')
+        self.assertEqual(message.interpolate({'other': 'human'}),
+                         '${name} is $what, not human')
+        self.assertEqual(message.interpolate(mapping={'name': 'Flexo'}),
+                         'Flexo is $what, not ${other}')
+        message = self._makeOne('$name', mapping={'name': 42})
+        result = message.interpolate()
+        self.assertIs(type(result), str)
+        self.assertEqual(result, '42')
+        self.assertEqual(self._makeOne('$name').interpolate(), '$name')
+
+    def test_interpolate_invalid(self):
+        message = self._makeOne('testing')
+        with self.assertRaises(TypeError):
+            message.interpolate({}, {})
+        with self.assertRaises(TypeError):
+            message.interpolate(unknown={})
+
+    def test_cache_key(self):
+        message = self._makeOne('testing')
+        key = message.cache_key
+        self.assertEqual(key, (None, 'testing', None, None, None, None))
+        self.assertIs(type(key[1]), str)
+        self.assertIs(message.cache_key, key)
+        message = self._makeOne('testing', 'domain', 'default', {'a': 1},
+                                msgid_plural='testings',
+                                default_plural='defaults', number=2)
+        self.assertEqual(
+            message.cache_key,
+            ('domain', 'testing', 'default', 'testings', 'defaults', 2))
+        self.assertIs(message.cache_key, message.cache_key)
+        with self.assertRaises(AttributeError):
+            message.cache_key = key
+
+    def test_cache_key_distinguishes_attributes(self):
+        message = self._makeOne('testing', 'domain', 'default')
+        others = [
+            message.with_(domain='other'),
+            message.with_(default='other'),
+            message.with_(msgid_plural='testings'),
+            message.with_(default_plural='defaults'),
+            message.with_(number=1),
+        ]
+        keys = {message.cache_key: message}
+        for other in others:
+            self.assertEqual(other, message)
+            self.assertEqual(hash(other), hash(message))
+            self.assertNotIn(other.cache_key, keys)
+            keys[other.cache_key] = other
+        # The mapping is not part of the key.
+        self.assertIn(message.with_(mapping={'a': 1}).cache_key, keys)
+        self.assertIn(self._makeOne(message).cache_key, keys)
+
+    def test_cache_key_not_shared_with_copies(self):
+        message = self._makeOne('testing', 'domain', number=1)
+        key = message.cache_key
+        copy = message.with_(number=2)
+        self.assertEqual(copy.cache_key[5], 2)
+        self.assertEqual(message.cache_key, key)
+        self.assertEqual(self._makeOne(message, 'other').cache_key[0],
+                         'other')
+
+    def test_cache_key_not_pickled(self):
+        message = self._makeOne('testing', 'domain')
+        message.cache_key
+        self.assertEqual(message.__reduce__()[1], ('testing', 'domain'))
+        klass, args = message.__reduce__()
+        self.assertEqual(klass(*args).cache_key, message.cache_key)
+
+    def test_threads(self):
+        # Threads sharing messages whose mapping, cache key and side
+        # block are set lazily, e.g. without the GIL.
+        import threading
+        klass = self._getTargetClass()
+        nthreads = 8
+        messages = [
+            self._makeOne(f'msgid-{i}', 'domain', '$name',
+                          {'name': str(i)} if i % 2 else None)
+            for i in range(100)]
+        barrier = threading.Barrier(nthreads)
+        errors = []
+
+        def work():
+            try:
+                barrier.wait()
+                for i, message in enumerate(messages):
+                    copy = klass(*message.__reduce__()[1])
+                    self.assertEqual(copy.cache_key, message.cache_key)
+                    self.assertEqual(message.with_(number=i).number, i)
+                    self.assertEqual(
+                        message.interpolate(),
+                        str(i) if i % 2 else '$name')
+                    if i % 2:
+                        self.assertEqual(message.mapping['name'], str(i))
+                    else:
+                        self.assertIsNone(message.mapping)
+            except BaseException as e:  # pragma: no cover
+                errors.append(e)
+
+        threads = [threading.Thread(target=work) for _ in range(nthreads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    def test_from_records(self):
+        klass = self._getTargetClass()
+        source = self._makeOne('source', 'domain', 'Source')
+        mapping = {'key': 'value'}
+        messages = klass.from_records(iter([
+            'plain',
+            ('tuple', 'domain', 'Tuple', mapping, 'tuples', 'Tuples', 2),
+            {'msgid': 'dict', 'domain': 'domain', 'mapping': mapping,
+             'number': 1},
+            source,
+        ]))
+        self.assertEqual(messages, ['plain', 'tuple', 'dict', 'source'])
+        for message in messages:
+            self.assertIs(type(message), klass)
+        self.assertIsNone(messages[0].domain)
+        self.assertEqual(messages[1].domain, 'domain')
+        self.assertEqual(messages[1].default, 'Tuple')
+        self.assertEqual(messages[1].mapping, mapping)
+        self.assertEqual(messages[1].msgid_plural, 'tuples')
+        self.assertEqual(messages[1].default_plural, 'Tuples')
+        self.assertEqual(messages[1].number, 2)
+        self.assertEqual(messages[2].domain, 'domain')
+        self.assertIsNone(messages[2].default)
+        self.assertEqual(messages[2].mapping, mapping)
+        self.assertEqual(messages[2].number, 1)
+        self.assertIs(messages[3].default, source.default)
+        self.assertEqual(klass.from_records([]), [])
+
+    def test_from_records_domain(self):
+        klass = self._getTargetClass()
+        source = self._makeOne('source', 'other', 'Source')
+        messages = klass.from_records([
+            'plain', ('tuple', 'Tuple', None, 'tuples'),
+            {'msgid': 'dict', 'number': 1}, source], 'domain')
+        self.assertEqual([m.domain for m in messages], ['domain'] * 4)
+        self.assertEqual(messages[1].default, 'Tuple')
+        self.assertEqual(messages[1].msgid_plural, 'tuples')
+        self.assertEqual(messages[2].number, 1)
+        self.assertEqual(messages[3].default, 'Source')
+        messages = klass.from_records(['plain'], domain=None)
+        self.assertIsNone(messages[0].domain)
+        for record in (('a',) * 7, {'msgid': 'a', 'domain': 'domain'}):
+            with self.assertRaises(TypeError):
+                klass.from_records([record], 'domain')
+        with self.assertRaises(TypeError):
+            klass.from_records()
+        with self.assertRaises(TypeError):
+            klass.from_records([], 'domain', 'other')
+
+    def test_from_records_invalid(self):
+        klass = self._getTargetClass()
+        for record in ((), ('a',) * 8, {'domain': 'domain'},
+                       {'msgid': 'a', 'unknown': 1}, 42,
+                       ('a', None, None, None, None, None, 'one')):
+            with self.assertRaises(TypeError):
+                klass.from_records([record])
+
+    def test_subclass_init_from_records(self):
+        created = []
+
+        class Subclass(self._getTargetClass()):
+            def __init__(self, *args, **kw):
+                created.append(str(self))
+
+        messages = Subclass.from_records([
+            'plain', ('tuple', 'domain'), {'msgid': 'dict', 'number': 1}])
+        self.assertEqual(created, ['plain', 'tuple', 'dict'])
+        self.assertEqual(messages[1].domain, 'domain')
+        self.assertEqual(messages[2].number, 1)
+
+    def test_subclass_init_with_(self):
+        created = []
+
+        class Subclass(self._getTargetClass()):
+            def __init__(self, *args, **kw):
+                created.append(self.number)
+
+        message = Subclass('testing', 'domain').with_(number=2)
+        self.assertEqual(created, [None, 2])
+        self.assertEqual(message.domain, 'domain')
+
+    def test_subclass_with__passes_given_keywords(self):
+        calls = []
+
+        class Subclass(self._getTargetClass()):
+            def __init__(self, ustr, *args, **kw):
+                calls.append((args, kw))
+
+        message = Subclass('testing', 'domain')
+        message.with_(number=2, default='Testing')
+        self.assertEqual(calls[-1], ((), {'default': 'Testing', 'number': 2}))
+        message.with_()
+        self.assertEqual(calls[-1], ((), {}))
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(TypeError):
+            self._makeOne()
+        with self.assertRaises(TypeError):
+            self._makeOne('testing', None, None, None, None, None, None, None)
+        with self.assertRaises(TypeError):
+            self._makeOne('testing', unknown='unknown')
+        with self.assertRaises(TypeError):
+            self._makeOne('testing', 'domain', domain='domain')
+
     def test_non_unicode_default(self):
         message = self._makeOne('str', default=123)
         self.assertEqual(message.default, 123)
@@ -249,7 +564,40 @@ class PyMessageTests(unittest.TestCase):
             self._makeOne('str', default=123, number="one")
 
 
-@unittest.skipIf(messageid.Message is messageid.pyMessage, "Duplicate tests")
+class JITMessageTests(PyMessageTests):
+
+    def _getTargetClass(self):
+        return messageid.jitMessage
+
+    def test_derives_from_pyMessage(self):
+        message = self._makeOne('testing', 'domain')
+        self.assertIsInstance(message, messageid.pyMessage)
+        self.assertEqual(self._getTargetClass().__name__, 'Message')
+        self.assertEqual(self._getTargetClass().__module__,
+                         'zope.i18nmessageid.message')
+
+    def test_copy_of_pyMessage(self):
+        message = messageid.pyMessage('testing', 'domain', 'default',
+                                      {'key': 'value'}, number=2)
+        copy = self._makeOne(message)
+        self.assertIs(type(copy), self._getTargetClass())
+        self.assertEqual(copy.domain, 'domain')
+        self.assertEqual(copy.default, 'default')
+        self.assertEqual(copy.mapping, {'key': 'value'})
+        self.assertEqual(copy.number, 2)
+        copy = messageid.pyMessage(self._makeOne('testing', 'domain'))
+        self.assertEqual(copy.domain, 'domain')
+
+    def test_no_readonly_flag_per_message(self):
+        message = self._makeOne('testing')
+        self.assertEqual(type(message).__slots__, ())
+        self.assertTrue(message._readonly)
+        with self.assertRaises(AttributeError):
+            message.foo = 'bar'
+
+
+@unittest.skipIf(issubclass(messageid.Message, messageid.pyMessage),
+                 "Duplicate tests")
 class MessageTests(PyMessageTests):
 
     _TEST_READONLY = False
@@ -257,6 +605,125 @@ class MessageTests(PyMessageTests):
     def _getTargetClass(self):
         return messageid.Message
 
+    def test_keyword_arguments(self):
+        message = self._makeOne(
+            value='testing', domain='domain', default='default',
+            mapping={'key': 'value'}, msgid_plural='testings',
+            default_plural='defaults', number=2)
+        self.assertEqual(message, 'testing')
+        self.assertEqual(message.domain, 'domain')
+        self.assertEqual(message.default, 'default')
+        self.assertEqual(message.mapping, {'key': 'value'})
+        self.assertEqual(message.msgid_plural, 'testings')
+        self.assertEqual(message.default_plural, 'defaults')
+        self.assertEqual(message.number, 2)
+        # Keyword names which are not interned are matched, too.
+        domain = ''.join(['dom', 'ain'])
+        message = self._makeOne('testing', **{domain: 'domain'})
+        self.assertEqual(message.domain, 'domain')
+
+    def test_gil_not_enabled(self):
+        import sysconfig
+        if not sysconfig.get_config_var('Py_GIL_DISABLED'):
+            self.skipTest('Not a free-threaded build')
+        # Importing the extension would have enabled the GIL.
+        self.assertFalse(sys._is_gil_enabled())
+
+    def test_isolated_subinterpreter(self):
+        import os
+        try:
+            import _interpreters
+        except ModuleNotFoundError:
+            self.skipTest('Needs Python 3.13 or later')
+        package = os.path.dirname(os.path.dirname(os.path.dirname(
+            messageid.__file__)))
+        code = (
+            f'import sys; sys.path.insert(0, {package!r})\n'
+            'from zope.i18nmessageid import message\n'
+            'assert message.Message is not message.pyMessage\n'
+            'assert message.Message("x", "domain").domain == "domain"\n')
+        interp = _interpreters.create('isolated')
+        try:
+            self.assertIsNone(_interpreters.run_string(interp, code))
+        finally:
+            _interpreters.destroy(interp)
+
+    def test_subclass(self):
+        class Subclass(self._getTargetClass()):
+            pass
+        message = Subclass('testing', 'domain', mapping={'a': 1})
+        self.assertEqual(message.domain, 'domain')
+        copy = Subclass(message, default='default')
+        self.assertIs(type(copy), Subclass)
+        self.assertEqual(copy.mapping, {'a': 1})
+        self.assertIs(type(message.with_(number=1)), Subclass)
+        self.assertEqual(message.__reduce__(),
+                         (Subclass, ('testing', 'domain', None, {'a': 1})))
+
+    def test_footprint(self):
+        import struct
+        pointer = struct.calcsize('P')
+        # The domain, the default and the block of rarely used attributes.
+        self.assertLessEqual(
+            self._getTargetClass().__basicsize__ - str.__basicsize__,
+            3 * pointer)
+
+    def test_footprint_of_rare_attributes(self):
+        import struct
+        import tracemalloc
+        klass = self._getTargetClass()
+        msgids = [f'msgid-{i:04}' for i in range(1000)]
+
+        def bytes_per_message(*args):
+            tracemalloc.start()
+            try:
+                start = tracemalloc.get_traced_memory()[0]
+                messages = [klass(msgid, *args) for msgid in msgids]
+                size = tracemalloc.get_traced_memory()[0] - start
+            finally:
+                tracemalloc.stop()
+            return size / len(messages)
+
+        plain = bytes_per_message('domain', 'default')
+        # Explicit None values, as passed by factories, cost nothing.
+        self.assertAlmostEqual(
+            bytes_per_message('domain', 'default', None, None, None, None),
+            plain, delta=1)
+        self.assertAlmostEqual(
+            bytes_per_message('domain', 'default', None, 'msgids') - plain,
+            5 * struct.calcsize('P'), delta=1)
+
+    def test_atomic_messages_are_not_tracked_by_gc(self):
+        import gc
+        klass = self._getTargetClass()
+        self.assertFalse(gc.is_tracked(klass('testing', 'domain', 'default')))
+        self.assertFalse(gc.is_tracked(klass('testing', 'domain').with_(
+            msgid_plural='testings', number=2.5)))
+        self.assertTrue(gc.is_tracked(klass('testing', mapping={})))
+        self.assertTrue(gc.is_tracked(klass('testing', 'domain', ['list'])))
+
+        class Subclass(klass):
+            pass
+
+        self.assertTrue(gc.is_tracked(Subclass('testing')))
+
+    def test_cycles_through_mapping_are_collected(self):
+        import gc
+        import weakref
+        klass = self._getTargetClass()
+
+        class Value:
+            pass
+
+        value = Value()
+        mapping = {'value': value}
+        message = klass('testing', mapping=mapping)
+        mapping['self'] = message
+        ref = weakref.ref(value)
+        del value, mapping, message
+        gc.collect()
+        self.assertIsNone(ref())
+
     def test_base_type_is_immutable(self):
         klass = self._getTargetClass()
 
@@ -269,7 +736,7 @@ class MessageTests(PyMessageTests):
 class OptimizationTests(unittest.TestCase):
 
     def test_optimizations_available(self):
-        self.assertIsNot(messageid.Message, messageid.pyMessage)
+        self.assertFalse(issubclass(messageid.Message, messageid.pyMessage))
 
 
 class MessageFactoryTests(unittest.TestCase):
@@ -307,6 +774,1341 @@ class MessageFactoryTests(unittest.TestCase):
         self.assertEqual(message.default_plural, 'defaults')
         self.assertEqual(message.number, 2)
 
+    def test___call___keywords(self):
+        factory = self._makeOne('domain')
+        message = factory(ustr='testing', number=1)
+        self.assertEqual(message, 'testing')
+        self.assertEqual(message.number, 1)
+        message = factory('testing', 'default', default_plural='defaults')
+        self.assertEqual(message.default, 'default')
+        self.assertEqual(message.default_plural, 'defaults')
+        for args, kw in (((), {}), (('testing',) * 7, {}),
+                         (('testing', 'default'), {'default': 'default'}),
+                         (('testing',), {'unknown': 1})):
+            with self.assertRaises(TypeError):
+                factory(*args, **kw)
+
+    def test___call___copies_message(self):
+        source = messageid.Message('testing', 'other', 'default')
+        message = self._makeOne('domain')(source)
+        self.assertEqual(message.domain, 'domain')
+        self.assertIsNone(message.default)
+
+    def test___call___overridden(self):
+        class Factory(self._getTargetClass()):
+            def __call__(self, ustr, *args, **kw):
+                return super().__call__(ustr.upper(), *args, **kw)
+
+        message = Factory('domain')('testing', number=1)
+        self.assertEqual(message, 'TESTING')
+        self.assertEqual(message.number, 1)
+
+    def test___call___errors(self):
+        factory = self._makeOne('domain')
+        with self.assertRaisesRegex(TypeError, r'^MessageFactory\b'):
+            factory('testing', unknown=1)
+        with self.assertRaisesRegex(TypeError, r"'default'"):
+            factory('testing', 'default', default='default')
+
+    def test_signature(self):
+        import inspect
+        factory = self._makeOne('domain')
+        self.assertEqual(
+            list(inspect.signature(factory).parameters),
+            ['ustr', 'default', 'mapping', 'msgid_plural', 'default_plural',
+             'number'])
+        self.assertEqual(
+            list(inspect.signature(self._getTargetClass()).parameters),
+            ['domain', 'cache_size', 'registry'])
+
+    def test_copy_and_pickle(self):
+        import copy
+        import pickle
+        for factory in (self._makeOne('domain'),
+                        self._makeOne('domain', cache_size=10, registry=True)):
+            factory('testing')
+            for clone in (copy.copy(factory), copy.deepcopy(factory),
+                          pickle.loads(pickle.dumps(factory))):
+                self.assertIs(type(clone), self._getTargetClass())
+                message = clone('testing')
+                self.assertEqual(message.domain, 'domain')
+                self.assertEqual(clone.cache_info().maxsize,
+                                 factory.cache_info().maxsize)
+                self.assertEqual(clone.registered(),
+                                 [message] if factory._registry else [])
+
+    def test_subclass_without___init__(self):
+        class Factory(self._getTargetClass()):
+            def __init__(self, domain):
+                self._domain = domain
+
+        factory = Factory('domain')
+        message = factory('testing', 'default', {'key': 'value'})
+        self.assertEqual(message, 'testing')
+        self.assertEqual(message.domain, 'domain')
+        self.assertEqual(message.default, 'default')
+        self.assertEqual(message.mapping, {'key': 'value'})
+        self.assertEqual(factory.many(['other'])[0].domain, 'domain')
+        self.assertEqual(factory.cache_info(), (0, 0, 0, 0, 0))
+        factory.cache_clear()
+        self.assertEqual(factory.registered(), [])
+        factory.invalidate('fr')
+        factory.set_translator(lambda message, language: message.upper())
+        self.assertEqual(factory.translate('testing', 'fr'), 'TESTING')
+        self.assertEqual(Factory('other')('testing').domain, 'other')
+
+    def test_threads_reassigning_domain(self):
+        import threading
+        factory = self._makeOne('a')
+        nthreads = 8
+        barrier = threading.Barrier(nthreads)
+        errors = []
+
+        def work(n):
+            try:
+                barrier.wait()
+                for i in range(2000):
+                    if n == 0:
+                        factory._domain = ''.join(['ab'[i % 2]])
+                    else:
+                        self.assertIn(factory('testing').domain, ('a', 'b'))
+            except BaseException as e:  # pragma: no cover
+                errors.append(e)
+
+        threads = [threading.Thread(target=work, args=(n,))
+                   for n in range(nthreads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    def test_domain_is_interned(self):
+        factory = self._makeOne(''.join(['dom', 'ain']))
+        self.assertIs(factory('testing').domain, sys.intern('domain'))
+
+    def test_many(self):
+        mapping = {'key': 'value'}
+        factory = self._makeOne('domain')
+        messages = factory.many([
+            'plain',
+            ('tuple', 'Tuple', mapping, 'tuples', 'Tuples', 2),
+            {'msgid': 'dict', 'default': 'Dict'},
+        ])
+        self.assertEqual(messages, ['plain', 'tuple', 'dict'])
+        for message in messages:
+            self.assertIsInstance(message, messageid.Message)
+            self.assertEqual(message.domain, 'domain')
+        self.assertEqual(messages[1].default, 'Tuple')
+        self.assertEqual(messages[1].mapping, mapping)
+        self.assertEqual(messages[1].msgid_plural, 'tuples')
+        self.assertEqual(messages[1].default_plural, 'Tuples')
+        self.assertEqual(messages[1].number, 2)
+        self.assertEqual(messages[2].default, 'Dict')
+
+    def test_many_columns(self):
+        mapping = {'key': 'value'}
+        factory = self._makeOne('domain')
+        messages = factory.many(
+            iter(['one', 'two']), defaults=['One', None],
+            mappings=[None, mapping])
+        self.assertEqual(messages, ['one', 'two'])
+        self.assertEqual([m.domain for m in messages], ['domain', 'domain'])
+        self.assertEqual([m.default for m in messages], ['One', None])
+        self.assertEqual([m.mapping for m in messages], [None, mapping])
+        messages = factory.many(['one', 'two'], defaults=['One', 'Two'])
+        self.assertEqual([m.default for m in messages], ['One', 'Two'])
+        self.assertEqual([m.mapping for m in messages], [None, None])
+        messages = factory.many(['one'], mappings=[mapping])
+        self.assertEqual(messages[0].mapping, mapping)
+        with self.assertRaises(ValueError):
+            factory.many(['one', 'two'], defaults=['One'])
+
+    def test_many_invalid(self):
+        factory = self._makeOne('domain')
+        with self.assertRaisesRegex(TypeError, "unexpected key 'domain'"):
+            factory.many([{'msgid': 'one', 'domain': 'other'}])
+        with self.assertRaisesRegex(TypeError, r'1 to 6 items \(7 given\)'):
+            factory.many([('one',) * 7])
+
+    def test_cache_disabled_by_default(self):
+        factory = self._makeOne('domain')
+        self.assertIsNot(factory('testing'), factory('testing'))
+        self.assertEqual(factory.cache_info(), (0, 0, 0, 0, 0))
+
+    def test_cache_negative_size(self):
+        with self.assertRaises(ValueError):
+            self._makeOne('domain', cache_size=-1)
+
+    def test_cache_interns_static_messages(self):
+        factory = self._makeOne('domain', cache_size=10)
+        message = factory('testing', 'default', msgid_plural='testings')
+        self.assertIs(
+            factory('testing', 'default', msgid_plural='testings'), message)
+        self.assertIsNot(factory('testing'), message)
+        self.assertEqual(message.domain, 'domain')
+        self.assertEqual(message.default, 'default')
+        self.assertEqual(message.msgid_plural, 'testings')
+        info = factory.cache_info()
+        self.assertEqual(info.hits, 1)
+        self.assertEqual(info.misses, 2)
+        self.assertEqual(info.evictions, 0)
+        self.assertEqual(info.maxsize, 10)
+        self.assertEqual(info.currsize, 2)
+
+    def test_cache_skips_mapping_and_number(self):
+        factory = self._makeOne('domain', cache_size=None)
+        self.assertIsNot(factory('testing', mapping={'key': 'value'}),
+                         factory('testing', mapping={'key': 'value'}))
+        self.assertIsNot(factory('testing', number=1),
+                         factory('testing', number=1))
+        self.assertIsNot(factory('testing', default=123),
+                         factory('testing', default=123))
+        source = factory('testing')
+        self.assertIsNot(factory(source), source)
+        self.assertEqual(factory.cache_info().currsize, 1)
+
+    def test_cache_evicts_least_recently_used(self):
+        factory = self._makeOne('domain', cache_size=2)
+        one = factory('one')
+        two = factory('two')
+        self.assertIs(factory('one'), one)
+        factory('three')
+        self.assertIs(factory('one'), one)
+        self.assertIsNot(factory('two'), two)
+        info = factory.cache_info()
+        self.assertEqual(info.evictions, 2)
+        self.assertEqual(info.currsize, 2)
+
+    def test_cache_unbounded(self):
+        factory = self._makeOne('domain', cache_size=None)
+        messages = [factory(str(i)) for i in range(100)]
+        for i, message in enumerate(messages):
+            self.assertIs(factory(str(i)), message)
+        self.assertEqual(factory.cache_info(), (100, 100, 0, None, 100))
+
+    def test_cache_clear(self):
+        factory = self._makeOne('domain', cache_size=None)
+        message = factory('testing')
+        factory('testing')
+        factory.cache_clear()
+        self.assertEqual(factory.cache_info(), (0, 0, 0, None, 0))
+        self.assertIsNot(factory('testing'), message)
+
+    def _makePath(self):
+        import tempfile
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        return tmpdir.name + '/registry.bin'
+
+    def test_registry_records_static_messages(self):
+        factory = self._makeOne('domain', registry=True)
+        one = factory('one')
+        self.assertIs(factory('one'), one)
+        two = factory('two', 'Two', msgid_plural='twos')
+        self.assertIs(factory('two', 'Two', msgid_plural='twos'), two)
+        self.assertIsNot(factory('two', 'Two'), two)
+        factory('testing', mapping={'key': 'value'})
+        factory('testing', number=1)
+        self.assertEqual(sorted(factory.registered()), ['one', 'two', 'two'])
+        self.assertEqual(factory.cache_info().currsize, 0)
+
+    def test_registry_is_not_evicted(self):
+        factory = self._makeOne('domain', cache_size=1, registry=True)
+        one = factory('one')
+        factory('two')
+        self.assertIs(factory('one'), one)
+
+    def test_registered_without_registry(self):
+        factory = self._makeOne('domain')
+        factory('one')
+        self.assertEqual(factory.registered(), [])
+
+    def test_dump_and_preload(self):
+        path = self._makePath()
+        factory = self._makeOne('domain', registry=True)
+        factory('one')
+        factory('two', 'Two', msgid_plural='twos', default_plural='Twos')
+        factory.dump_registry(path)
+
+        other = self._makeOne('domain')
+        self.assertEqual(other.preload(path), 2)
+        self.assertEqual(other.preload(path), 0)
+        two = other('two', 'Two', msgid_plural='twos', default_plural='Twos')
+        self.assertIn(two, other.registered())
+        self.assertIs(
+            other('two', 'Two', msgid_plural='twos', default_plural='Twos'),
+            two)
+        self.assertEqual(two.domain, 'domain')
+        self.assertEqual(two.default_plural, 'Twos')
+        if not issubclass(messageid.Message, messageid.pyMessage):
+            import gc
+            self.assertFalse(gc.is_tracked(two))
+
+    def test_preload_skips_other_domains(self):
+        path = self._makePath()
+        factory = self._makeOne('domain', registry=True)
+        factory('one')
+        factory.dump_registry(path)
+        other = self._makeOne('other')
+        self.assertEqual(other.preload(path), 0)
+        self.assertEqual(other('one').domain, 'other')
+
+    def test_dump_registry_leaves_no_temporary_file(self):
+        import os
+        path = self._makePath()
+        factory = self._makeOne('domain', registry=True)
+        factory.dump_registry(path)
+        self.assertEqual(os.listdir(os.path.dirname(path)),
+                         [os.path.basename(path)])
+        self.assertEqual(self._makeOne('domain').preload(path), 0)
+
+    def _makeTranslator(self):
+        calls = []
+
+        def translate(message, language):
+            calls.append((message, language))
+            text = message.default or str(message)
+            return f'{language}:{text}'
+
+        return translate, calls
+
+    def test_translate(self):
+        factory = self._makeOne('domain')
+        translate, calls = self._makeTranslator()
+        factory.set_translator(translate)
+        self.assertEqual(factory.translate('apple', 'de'), 'de:apple')
+        self.assertEqual(factory.translate('apple', 'de'), 'de:apple')
+        self.assertEqual(factory.translate('apple', 'fr'), 'fr:apple')
+        self.assertEqual(factory.translate('apple', 'de', 'Apple'),
+                         'de:Apple')
+        self.assertEqual(factory.translate(factory('apple'), 'de'),
+                         'de:apple')
+        self.assertEqual(len(calls), 3)
+        message, language = calls[0]
+        self.assertEqual(message.domain, 'domain')
+        self.assertEqual(language, 'de')
+
+    def test_translate_distinguishes_domains_and_numbers(self):
+        factory = self._makeOne('domain')
+        translate, calls = self._makeTranslator()
+        factory.set_translator(translate)
+        other = self._makeOne('other')('apple')
+        factory.translate('apple', 'de')
+        factory.translate(other, 'de')
+        factory.translate('apple', 'de', msgid_plural='apples', number=1)
+        factory.translate('apple', 'de', msgid_plural='apples', number=2)
+        factory.translate('apple', 'de', msgid_plural='apples', number=2)
+        self.assertEqual(len(calls), 4)
+
+    def test_translate_with_mapping_is_not_memoized(self):
+        factory = self._makeOne('domain')
+        translate, calls = self._makeTranslator()
+        factory.set_translator(translate)
+        for _ in range(2):
+            factory.translate('apple', 'de', mapping={'a': 1})
+            factory.translate('apple', 'de', ['unhashable'])
+        self.assertEqual(len(calls), 4)
+
+    def test_translate_without_translator(self):
+        factory = self._makeOne('domain')
+        with self.assertRaises(ValueError):
+            factory.translate('apple', 'de')
+
+    def test_translate_bounded(self):
+        factory = self._makeOne('domain')
+        translate, calls = self._makeTranslator()
+        factory.set_translator(translate, cache_size=2)
+        for msgid in ('one', 'two', 'one', 'three', 'one', 'two'):
+            factory.translate(msgid, 'de')
+        self.assertEqual([str(message) for message, _ in calls],
+                         ['one', 'two', 'three', 'two'])
+
+    def test_translate_unbounded_and_disabled(self):
+        factory = self._makeOne('domain')
+        translate, calls = self._makeTranslator()
+        factory.set_translator(translate, cache_size=None)
+        for _ in range(2):
+            for i in range(100):
+                factory.translate(str(i), 'de')
+        self.assertEqual(len(calls), 100)
+        factory.set_translator(translate, cache_size=0)
+        factory.translate('1', 'de')
+        factory.translate('1', 'de')
+        self.assertEqual(len(calls), 102)
+        with self.assertRaises(ValueError):
+            factory.set_translator(translate, cache_size=-1)
+
+    def test_invalidate(self):
+        factory = self._makeOne('domain')
+        translate, calls = self._makeTranslator()
+        factory.set_translator(translate)
+        factory.translate('apple', 'de')
+        factory.translate('apple', 'fr')
+        factory.invalidate('de')
+        factory.invalidate('nl')
+        factory.translate('apple', 'de')
+        factory.translate('apple', 'fr')
+        self.assertEqual(len(calls), 3)
+        factory.invalidate()
+        factory.translate('apple', 'de')
+        factory.translate('apple', 'fr')
+        self.assertEqual(len(calls), 5)
+        # Registering a translator also invalidates.
+        factory.set_translator(translate)
+        factory.translate('apple', 'de')
+        self.assertEqual(len(calls), 6)
+
+    def test_invalidate_while_translating(self):
+        factory = self._makeOne('domain')
+        texts = iter(['stale', 'fresh'])
+
+        def translate(message, language):
+            text = next(texts)
+            if text == 'stale':
+                factory.invalidate()
+            return text
+
+        factory.set_translator(translate)
+        self.assertEqual(factory.translate('apple', 'de'), 'stale')
+        self.assertEqual(factory.translate('apple', 'de'), 'fresh')
+        self.assertEqual(factory.translate('apple', 'de'), 'fresh')
+
+
+class InterpolationTests(unittest.TestCase):
+
+    def test_parse(self):
+        from zope.i18nmessageid.interpolation import parse
+        self.assertEqual(
+            parse('Hello ${name}, $count new-$kind $$escaped'),
+            (('Hello ', ', ', ' new-', ' $$escaped'),
+             (('name', '${name}'), ('count', '$count'), ('kind', '$kind'))))
+        self.assertEqual(parse('plain'), (('plain',), ()))
+
+    def test_parse_is_cached(self):
+        from zope.i18nmessageid.interpolation import parse
+        text = 'Hello ${name}'
+        self.assertIs(parse(text), parse(''.join(['Hello ', '${name}'])))
+        self.assertIs(parse(messageid.Message(text)), parse(text))
+
+    def test_parse_cache_is_bounded(self):
+        from zope.i18nmessageid import interpolation
+        interpolation._plans.clear()
+        for i in range(interpolation._MAX_PLANS + 1):
+            interpolation.parse(f'text-{i}')
+        self.assertEqual(len(interpolation._plans), 1)
+
+    def test_interpolate(self):
+        from zope.i18nmessageid.interpolation import interpolate
+        self.assertEqual(
+            interpolate('${name} has $count, $$count $unknown',
+                        {'name': 'Bender', 'count': 3}),
+            'Bender has 3, $$count $unknown')
+        self.assertEqual(interpolate('no placeholder', {'a': 1}),
+                         'no placeholder')
+        self.assertEqual(interpolate('$name', None), '$name')
+        self.assertEqual(interpolate('', {'a': 1}), '')
+
+
+class PluralTests(unittest.TestCase):
+
+    RUSSIAN = ('nplurals=3; plural=(n%10==1 && n%100!=11 ? 0 :'
+               ' n%10>=2 && n%10<=4 && (n%100<10 || n%100>=20) ? 1 : 2);')
+
+    def test_plural_rule(self):
+        from zope.i18nmessageid.plural import plural_rule
+        rule = plural_rule(self.RUSSIAN)
+        self.assertEqual(rule.nplurals, 3)
+        self.assertEqual([rule(n) for n in (1, 2, 5, 11, 21, 22, 25, 111)],
+                         [0, 1, 2, 2, 0, 1, 2, 2])
+        self.assertEqual(rule(21.0), 0)
+        # Truncated, as gettext does.
+        self.assertEqual([rule(n) for n in (1.5, 2.7, 5.2, 21.9)],
+                         [0, 1, 2, 0])
+        for number in (float('nan'), float('inf')):
+            with self.assertRaises((ValueError, OverflowError)):
+                rule(number)
+        self.assertIs(plural_rule(self.RUSSIAN), rule)
+        self.assertIn('nplurals=3', repr(rule))
+
+    def test_plural_rule_single_form(self):
+        from zope.i18nmessageid.plural import plural_rule
+        rule = plural_rule('nplurals=1; plural=0')
+        self.assertEqual([rule(n) for n in (0, 1, 2, 2.5)], [0, 0, 0, 0])
+
+    def test_plural_rule_index_out_of_range(self):
+        from zope.i18nmessageid.plural import plural_rule
+        rule = plural_rule('nplurals=2; plural=n;')
+        self.assertEqual([rule(n) for n in (0, 1, 7)], [0, 1, 1])
+
+    def test_plural_rule_invalid(self):
+        from zope.i18nmessageid.plural import PluralRule
+        from zope.i18nmessageid.plural import plural_rule
+        for header in ('plural=(n != 1);', 'nplurals=2; plural=(n !!= 1);',
+                       'nplurals=2; plural=import os;'):
+            with self.assertRaises(ValueError):
+                plural_rule(header)
+        with self.assertRaises(ValueError):
+            PluralRule('0', 0)
+
+    def test_select_form(self):
+        from zope.i18nmessageid.plural import plural_rule
+        from zope.i18nmessageid.plural import select_form
+        Message = messageid.Message
+        self.assertEqual(select_form(Message('apple')), 0)
+        self.assertEqual(select_form(Message('apple', number=1)), 0)
+        self.assertEqual(select_form(Message('apple', number=0)), 1)
+        self.assertEqual(select_form(Message('apple', number=1.5)), 0)
+        self.assertEqual(select_form(Message('apple', number=2.5)), 1)
+        rule = plural_rule(self.RUSSIAN)
+        self.assertEqual(select_form(Message('apple', number=3), rule), 1)
+
+    def test_resolve_default(self):
+        from zope.i18nmessageid.plural import resolve_default
+        Message = messageid.Message
+        message = Message('apple', default='${n} apple',
+                          msgid_plural='apples', default_plural='${n} apples')
+        self.assertEqual(resolve_default(message), '${n} apple')
+        self.assertEqual(resolve_default(message.with_(number=1)),
+                         '${n} apple')
+        self.assertEqual(resolve_default(message.with_(number=2)),
+                         '${n} apples')
+        message = Message('apple', msgid_plural='apples', number=2)
+        self.assertEqual(resolve_default(message), 'apples')
+        self.assertEqual(resolve_default(message.with_(number=1)), 'apple')
+        self.assertIs(type(resolve_default(message.with_(number=1))), str)
+        message = Message('apple', number=2)
+        self.assertEqual(resolve_default(message), 'apple')
+
+
+class BulkTests(unittest.TestCase):
+
+    def _makeMessages(self, klass):
+        return [
+            klass('one', 'domain'),
+            klass('two', 'domain', 'Two'),
+            klass('three', 'other', 'Three', {'key': 'value'},
+                  msgid_plural='threes', default_plural='Threes', number=3),
+            klass('four', 'domain', ['unhashable']),
+            klass('five'),
+        ]
+
+    def _assertSameMessages(self, messages, expected):
+        self.assertEqual(len(messages), len(expected))
+        for message, other in zip(messages, expected):
+            self.assertEqual(message, other)
+            for attr in ('domain', 'default', 'mapping', 'msgid_plural',
+                         'default_plural', 'number'):
+                self.assertEqual(getattr(message, attr), getattr(other, attr))
+
+    def test_roundtrip(self):
+        from zope.i18nmessageid.bulk import dumps_many
+        from zope.i18nmessageid.bulk import loads_many
+        for klass in (messageid.Message, messageid.pyMessage):
+            messages = self._makeMessages(klass)
+            loaded = loads_many(dumps_many(messages))
+            self.assertTrue(
+                all(type(m) is messageid.Message for m in loaded))
+            self._assertSameMessages(loaded, messages)
+
+    def test_roundtrip_across_implementations(self):
+        from zope.i18nmessageid.bulk import dumps_many
+        from zope.i18nmessageid.bulk import loads_many
+        messages = self._makeMessages(messageid.Message)
+        loaded = loads_many(dumps_many(messages), messageid.pyMessage)
+        self.assertTrue(all(type(m) is messageid.pyMessage for m in loaded))
+        self._assertSameMessages(loaded, messages)
+        self.assertEqual(dumps_many(loaded), dumps_many(messages))
+
+    def test_shares_texts(self):
+        from zope.i18nmessageid.bulk import dumps_many
+        from zope.i18nmessageid.bulk import loads_many
+        loaded = loads_many(dumps_many(self._makeMessages(messageid.Message)))
+        self.assertIs(loaded[0].domain, sys.intern('domain'))
+        self.assertIs(loaded[1].domain, loaded[0].domain)
+        self.assertIs(loaded[3].domain, loaded[0].domain)
+        self.assertIs(loaded[2].domain, sys.intern('other'))
+
+    def test_empty(self):
+        from zope.i18nmessageid.bulk import dumps_many
+        from zope.i18nmessageid.bulk import loads_many
+        self.assertEqual(loads_many(dumps_many([])), [])
+
+    def test_unknown_format(self):
+        import pickle
+
+        from zope.i18nmessageid.bulk import loads_many
+        with self.assertRaises(ValueError):
+            loads_many(pickle.dumps((0, [None], [])))
+
+    def _makeTextMessages(self, klass):
+        return [
+            klass('one', 'domain'),
+            klass('two', 'domain', 'Two'),
+            klass('three', 'other', 'Three', {'key': 'value'},
+                  msgid_plural='threes', default_plural='Threes', number=3),
+            klass('qu\xe4tre', 'domain', ''),
+            klass('five'),
+            'six',
+        ]
+
+    def test_to_columns(self):
+        from zope.i18nmessageid.bulk import to_columns
+        for klass in (messageid.Message, messageid.pyMessage):
+            columns = to_columns(self._makeTextMessages(klass))
+            self.assertEqual(columns.domains, ['domain', 'other', None])
+            self.assertEqual(list(columns.domain_codes), [0, 0, 1, 0, 2, 2])
+            self.assertEqual(
+                columns.data,
+                'onetwothreequ\xe4tre'
+                'fivesixTwoThreethreesThrees'.encode('utf-8'))
+            self.assertEqual(len(columns.offsets), 4 * 6 + 1)
+            self.assertEqual(memoryview(columns.offsets).format, 'q')
+            self.assertEqual(list(columns.valid),
+                             [1] * 6 + [0, 1, 1, 1, 0, 0]
+                             + [0, 0, 1, 0, 0, 0] * 2)
+            self.assertEqual(columns.numbers, [None, None, 3, None, None,
+                                               None])
+            self.assertEqual(columns.mappings,
+                             [None, None, {'key': 'value'}, None, None, None])
+
+    def test_to_columns_implementations_agree(self):
+        from zope.i18nmessageid.bulk import _py_to_columns
+        from zope.i18nmessageid.bulk import to_columns
+        for klass in (messageid.Message, messageid.pyMessage):
+            messages = self._makeTextMessages(klass)
+            self.assertEqual(to_columns(messages), _py_to_columns(messages))
+
+    def test_columns_roundtrip(self):
+        from zope.i18nmessageid.bulk import from_columns
+        from zope.i18nmessageid.bulk import to_columns
+        for klass in (messageid.Message, messageid.pyMessage):
+            messages = self._makeTextMessages(klass)
+            loaded = from_columns(to_columns(messages))
+            self.assertTrue(
+                all(type(m) is messageid.Message for m in loaded))
+            self._assertSameMessages(
+                loaded, messages[:-1] + [messageid.Message('six')])
+            loaded = from_columns(to_columns(messages[:3]),
+                                  messageid.pyMessage)
+            self.assertTrue(
+                all(type(m) is messageid.pyMessage for m in loaded))
+            self._assertSameMessages(loaded, messages[:3])
+
+    def test_columns_empty(self):
+        from zope.i18nmessageid.bulk import _py_to_columns
+        from zope.i18nmessageid.bulk import from_columns
+        from zope.i18nmessageid.bulk import to_columns
+        columns = to_columns([])
+        self.assertEqual(columns, _py_to_columns([]))
+        self.assertEqual(list(columns.offsets), [0])
+        self.assertEqual(from_columns(columns), [])
+
+    def test_to_columns_not_text(self):
+        from zope.i18nmessageid.bulk import _py_to_columns
+        from zope.i18nmessageid.bulk import to_columns
+        for klass in (messageid.Message, messageid.pyMessage):
+            messages = [klass('one', 'domain', ['unhashable'])]
+            for export in (to_columns, _py_to_columns):
+                with self.assertRaises(TypeError):
+                    export(messages)
+            with self.assertRaises(AttributeError):
+                to_columns([object()])
+
+
+class JsonTests(unittest.TestCase):
+
+    def _makeMessages(self, klass):
+        return [
+            klass('one', 'domain'),
+            klass('two', 'domain', 'Two'),
+            klass('three', 'other', 'Three', {'key': 'value'},
+                  msgid_plural='threes', default_plural='Threes', number=3),
+            klass('four', 'domain', ['unhashable']),
+            klass('five'),
+        ]
+
+    def _assertSameMessages(self, messages, expected):
+        self.assertEqual(len(messages), len(expected))
+        for message, other in zip(messages, expected):
+            self.assertEqual(message, other)
+            for attr in ('domain', 'default', 'mapping', 'msgid_plural',
+                         'default_plural', 'number'):
+                self.assertEqual(getattr(message, attr), getattr(other, attr))
+
+    def test___json__(self):
+        for klass in (messageid.Message, messageid.pyMessage):
+            message = klass('one', 'domain', mapping={'key': 'value'})
+            self.assertEqual(message.__json__(),
+                             ('one', 'domain', None, {'key': 'value'}))
+            self.assertIs(type(message.__json__()[0]), str)
+            self.assertEqual(klass('one').__json__(), ('one',))
+            self.assertEqual(message.__json__(), message.__reduce__()[1])
+
+    def test_dumps(self):
+        from zope.i18nmessageid.json import dumps
+        for klass in (messageid.Message, messageid.pyMessage):
+            self.assertEqual(
+                dumps({'title': klass('one', 'domain'), 'count': 1}),
+                '{"title":{"__message__":["one","domain"]},"count":1}')
+            self.assertEqual(dumps([klass('one')], separators=(', ', ': ')),
+                             '[{"__message__": ["one"]}]')
+
+    def test_roundtrip(self):
+        from zope.i18nmessageid.json import dumps
+        from zope.i18nmessageid.json import loads
+        for klass in (messageid.Message, messageid.pyMessage):
+            messages = self._makeMessages(klass)
+            loaded = loads(dumps(messages))
+            self.assertTrue(
+                all(type(m) is messageid.Message for m in loaded))
+            self._assertSameMessages(loaded, messages)
+
+    def test_roundtrip_across_implementations(self):
+        from zope.i18nmessageid.json import dumps
+        from zope.i18nmessageid.json import loads
+        messages = self._makeMessages(messageid.Message)
+        loaded = loads(dumps(messages), messageid.pyMessage)
+        self.assertTrue(all(type(m) is messageid.pyMessage for m in loaded))
+        self._assertSameMessages(loaded, messages)
+        self.assertEqual(dumps(loaded), dumps(messages))
+
+    def test_nested_messages(self):
+        from zope.i18nmessageid.json import dumps
+        from zope.i18nmessageid.json import loads
+        name = messageid.Message('bender', 'futurama', 'Bender')
+        message = messageid.Message('robot', 'futurama', mapping={
+            'name': name})
+        loaded = loads(dumps({'rows': [(message, 1)]}))
+        self.assertEqual(loaded, {'rows': [['robot', 1]]})
+        loaded = loaded['rows'][0][0]
+        self.assertEqual(loaded.mapping['name'].default, 'Bender')
+        self.assertEqual(loaded.mapping['name'].domain, 'futurama')
+
+    def test_shares_messages_and_domains(self):
+        from zope.i18nmessageid.json import dumps
+        from zope.i18nmessageid.json import loads
+        messages = self._makeMessages(messageid.Message)
+        loaded = loads(dumps(messages * 2))
+        self.assertIs(loaded[5], loaded[0])
+        self.assertIs(loaded[6], loaded[1])
+        self.assertIsNot(loaded[7], loaded[2])
+        self.assertIsNot(loaded[8], loaded[3])
+        self.assertIs(loaded[0].domain, sys.intern('domain'))
+        self.assertIs(loaded[2].domain, sys.intern('other'))
+
+    def test_hooks(self):
+        from zope.i18nmessageid.json import dumps
+        from zope.i18nmessageid.json import loads
+
+        class Point:
+            def __json__(self):
+                return {'x': 1, 'label': messageid.Message('point', 'geo')}
+
+        data = dumps([Point()])
+        self.assertEqual(
+            data, '[{"x":1,"label":{"__message__":["point","geo"]}}]')
+        loaded = loads(data, object_hook=lambda obj: sorted(obj))
+        self.assertEqual(loaded, [['label', 'x']])
+
+    def test_copies_only_containers_with_messages(self):
+        from zope.i18nmessageid.json import _encode
+        plain = {'rows': [['one', 1], ('two', 2)], 'title': 'Title'}
+        self.assertIs(_encode(plain), plain)
+        other = ['three']
+        document = {'rows': [[messageid.Message('one')], other], 'count': 2}
+        encoded = _encode(document)
+        self.assertEqual(
+            encoded, {'rows': [[{'__message__': ('one',)}], ['three']],
+                      'count': 2})
+        self.assertIs(encoded['rows'][1], other)
+        self.assertEqual(document['rows'][0], ['one'])
+
+    def test_encoders_agree(self):
+        import collections
+        import enum
+
+        from zope.i18nmessageid.json import dumps
+
+        class Size(enum.IntEnum):
+            LARGE = 3
+
+        mapping = collections.OrderedDict(name=messageid.pyMessage('n'))
+        document = {
+            'texts': ['plain', 'caf\xe9 \u2603 "quoted"\n', ''],
+            'numbers': (0, -1, 2 ** 70, 1.5, 1e300, float('nan'),
+                        float('inf'), float('-inf'), Size.LARGE),
+            'constants': [None, True, False, [], {}, ()],
+            1: 'int key', 2.5: 'float key', None: 'null', False: 'false',
+            'messages': [
+                messageid.Message('one'),
+                messageid.Message('two', 'domain', None, mapping),
+                messageid.Message('three', None, None, {'a': [1]},
+                                  'threes', None, 3),
+                messageid.Message('four', mapping=collections.UserDict(a=1)),
+                messageid.pyMessage('five', 'domain', 'Five'),
+                collections.UserString('six'),
+            ],
+        }
+
+        def default(obj):
+            return {'repr': repr(obj)}
+
+        for options in ({}, {'ensure_ascii': False},
+                        {'separators': (', ', ': ')}):
+            # check_circular is only supported by json itself.
+            self.assertEqual(
+                dumps(document, default=default, **options),
+                dumps(document, default=default, check_circular=True,
+                      **options))
+
+    @unittest.skipIf(issubclass(messageid.Message, messageid.pyMessage),
+                     'Without the C extension, cycles exceed the recursion'
+                     ' limit')
+    def test_encoder_errors(self):
+        from zope.i18nmessageid.json import dumps
+        cycle = []
+        cycle.append(cycle)
+        mapping = {}
+        message = messageid.Message('cycle', mapping=mapping)
+        mapping['self'] = message
+        for document in (cycle, [message]):
+            with self.assertRaises(ValueError):
+                dumps(document)
+        with self.assertRaises(TypeError):
+            dumps({(1, 2): 'tuple key'})
+        with self.assertRaises(TypeError):
+            dumps([object()])
+
+    def test_default(self):
+        from zope.i18nmessageid.json import dumps
+
+        def default(obj):
+            return [messageid.Message(str(obj))]
+
+        self.assertEqual(dumps({'a': {1, 2} - {2}}, default=default),
+                         '{"a":[{"__message__":["{1}"]}]}')
+        with self.assertRaises(TypeError):
+            dumps({'a': object()})
+
+    def test_dump_load(self):
+        import io
+
+        from zope.i18nmessageid.json import dump
+        from zope.i18nmessageid.json import load
+        messages = self._makeMessages(messageid.Message)
+        f = io.StringIO()
+        dump(messages, f)
+        f.seek(0)
+        self._assertSameMessages(load(f), messages)
+
+
+class CatalogTests(unittest.TestCase):
+
+    POLISH = ('nplurals=3; plural=(n==1 ? 0 : n%10>=2 && n%10<=4 &&'
+              ' (n%100<10 || n%100>=20) ? 1 : 2);')
+
+    def setUp(self):
+        import tempfile
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.path = tmpdir.name + '/catalog.zimc'
+
+    def _makeCatalog(self, translations, plural_forms=None):
+        from zope.i18nmessageid.catalog import Catalog
+        from zope.i18nmessageid.catalog import write_catalog
+        write_catalog(self.path, translations, plural_forms)
+        catalog = Catalog(self.path)
+        self.addCleanup(catalog.close)
+        return catalog
+
+    def test_lookup(self):
+        catalog = self._makeCatalog({
+            ('domain', 'apple'): 'jab\u0142ko',
+            ('other', 'apple'): 'Apfel',
+            (None, 'pear'): 'gruszka',
+        })
+        self.assertEqual(len(catalog), 3)
+        Message = messageid.Message
+        self.assertEqual(catalog.lookup(Message('apple', 'domain')),
+                         'jab\u0142ko')
+        self.assertEqual(catalog.lookup(Message('apple', 'other')), 'Apfel')
+        self.assertEqual(catalog.lookup(messageid.pyMessage('pear')),
+                         'gruszka')
+        self.assertIsNone(catalog.lookup(Message('apple')))
+        self.assertIsNone(catalog.lookup(Message('plum', 'domain')))
+        self.assertEqual(catalog.lookup(Message('plum'), 'plum'), 'plum')
+        self.assertEqual(catalog.get('other', 'apple'), 'Apfel')
+        self.assertIsNone(catalog.get('other', 'pear'))
+        self.assertIsNone(catalog.plural_forms)
+
+    def test_no_domain_is_not_empty_domain(self):
+        catalog = self._makeCatalog({
+            (None, 'apple'): 'jab\u0142ko',
+            ('', 'apple'): 'Apfel',
+        })
+        self.assertEqual(catalog.get(None, 'apple'), 'jab\u0142ko')
+        self.assertEqual(catalog.get('', 'apple'), 'Apfel')
+        self.assertEqual(catalog.lookup(messageid.Message('apple', '')),
+                         'Apfel')
+
+    def test_lookup_plural(self):
+        catalog = self._makeCatalog({
+            ('domain', 'apple'): ['jab\u0142ko', 'jab\u0142ka',
+                                  'jab\u0142ek'],
+            ('domain', 'pear'): ['gruszka'],
+        }, self.POLISH)
+        self.assertEqual(catalog.plural_forms, self.POLISH)
+        Message = messageid.Message
+        apple = Message('apple', 'domain', msgid_plural='apples')
+        self.assertEqual(
+            [catalog.lookup(apple.with_(number=n)) for n in (1, 2, 5, 22)],
+            ['jab\u0142ko', 'jab\u0142ka', 'jab\u0142ek', 'jab\u0142ka'])
+        self.assertEqual(catalog.lookup(apple), 'jab\u0142ko')
+        # Without a msgid_plural, the singular is used.
+        self.assertEqual(catalog.lookup(Message('apple', 'domain', number=5)),
+                         'jab\u0142ko')
+        pear = Message('pear', 'domain', msgid_plural='pears', number=5)
+        self.assertEqual(catalog.lookup(pear), 'gruszka')
+
+    def test_many_entries(self):
+        translations = {('domain', f'msgid-{i}'): f'text-{i}'
+                        for i in range(1000)}
+        catalog = self._makeCatalog(translations)
+        self.assertTrue(all(
+            catalog.get(domain, msgid) == text
+            for (domain, msgid), text in translations.items()))
+
+    def test_empty(self):
+        catalog = self._makeCatalog({})
+        self.assertEqual(len(catalog), 0)
+        self.assertIsNone(catalog.lookup(messageid.Message('apple')))
+
+    def test_context_manager(self):
+        from zope.i18nmessageid.catalog import Catalog
+        from zope.i18nmessageid.catalog import write_catalog
+        write_catalog(self.path, {('domain', 'apple'): 'Apfel'})
+        with Catalog(self.path) as catalog:
+            self.assertEqual(catalog.get('domain', 'apple'), 'Apfel')
+        with self.assertRaises(ValueError):
+            catalog.get('domain', 'apple')
+
+    def test_replace_while_open(self):
+        catalog = self._makeCatalog({('domain', 'apple'): 'Apfel'})
+        other = self._makeCatalog({('domain', 'apple'): 'pomme'})
+        self.assertEqual(catalog.get('domain', 'apple'), 'Apfel')
+        self.assertEqual(other.get('domain', 'apple'), 'pomme')
+
+    def test_invalid_plural_forms(self):
+        from zope.i18nmessageid.catalog import write_catalog
+        with self.assertRaises(ValueError):
+            write_catalog(self.path, {}, 'plural=n;')
+
+    def test_invalid_plural_forms_in_file(self):
+        import mmap
+        from unittest import mock
+
+        from zope.i18nmessageid.catalog import Catalog
+        self._makeCatalog({}, 'nplurals=2; plural=n != 1;').close()
+        with open(self.path, 'r+b') as f:
+            data = f.read().replace(b'plural=', b'plurax=')
+            f.seek(0)
+            f.write(data)
+        maps = []
+
+        def open_mmap(*args, **kw):
+            maps.append(real_mmap(*args, **kw))
+            return maps[-1]
+
+        real_mmap = mmap.mmap
+        with mock.patch('mmap.mmap', open_mmap):
+            with self.assertRaises(ValueError):
+                Catalog(self.path)
+        self.assertTrue(maps[0].closed)
+
+    def test_not_a_catalog(self):
+        from zope.i18nmessageid.catalog import Catalog
+        for data in (b'not a catalog at all', b'ZIMC'):
+            with open(self.path, 'wb') as f:
+                f.write(data)
+            with self.assertRaises(ValueError):
+                Catalog(self.path)
+
+
+class StatsTests(unittest.TestCase):
+
+    def setUp(self):
+        from zope.i18nmessageid import reset_stats
+        reset_stats()
+        self.addCleanup(reset_stats)
+
+    def _enable(self, sample_every=0):
+        from zope.i18nmessageid import disable_stats
+        from zope.i18nmessageid import enable_stats
+        enable_stats(sample_every)
+        self.addCleanup(disable_stats)
+
+    def _domains(self):
+        from zope.i18nmessageid import stats
+        return stats().domains
+
+    def test_disabled(self):
+        from zope.i18nmessageid import stats
+        messageid.Message('testing', 'domain').__reduce__()
+        messageid.MessageFactory('domain')('testing')
+        self.assertEqual(stats(), ({}, {}))
+
+    def test_counters(self):
+        self._enable()
+        for klass in (messageid.Message, messageid.pyMessage):
+            message = klass('testing', 'stats', mapping={'a': 1})
+            copy = klass(message, mapping={'b': 2})
+            message.mapping
+            message.mapping
+            copy.__reduce__()
+            klass('other')
+        factory = messageid.MessageFactory('stats', cache_size=None)
+        factory('testing')
+        factory('testing')
+        self.assertEqual(self._domains(), {
+            'stats': {'created': 3, 'copied': 2, 'mapping_wraps': 2,
+                      'pickled': 2, 'factory_calls': 2},
+            None: {'created': 2, 'copied': 0, 'mapping_wraps': 0,
+                   'pickled': 0, 'factory_calls': 0},
+        })
+
+    def test_factory_calls_without_cache(self):
+        self._enable()
+        messageid.MessageFactory('stats')('testing', default='Testing')
+        self.assertEqual(self._domains()['stats']['factory_calls'], 1)
+        self.assertEqual(self._domains()['stats']['created'], 1)
+
+    def test_disable_keeps_counters(self):
+        from zope.i18nmessageid import disable_stats
+        self._enable()
+        messageid.Message('testing', 'stats')
+        disable_stats()
+        messageid.Message('testing', 'stats')
+        self.assertEqual(self._domains()['stats']['created'], 1)
+
+    def test_reset(self):
+        from zope.i18nmessageid import reset_stats
+        from zope.i18nmessageid import stats
+        self._enable(sample_every=1)
+        messageid.Message('testing', 'stats')
+        messageid.pyMessage('testing', 'stats')
+        reset_stats()
+        self.assertEqual(stats(), ({}, {}))
+
+    def test_call_sites(self):
+        from zope.i18nmessageid import stats
+        self._enable(sample_every=2)
+        factory = messageid.MessageFactory('stats')
+        line = sys._getframe().f_lineno + 2
+        for klass in (messageid.Message, messageid.pyMessage):
+            [klass('testing', 'stats') for _ in range(4)]
+        factory.many(['one', 'two'])
+        line_many = sys._getframe().f_lineno - 1
+        self.assertEqual(stats().call_sites, {
+            ('stats', __file__, line): 4,
+            ('stats', __file__, line_many): 1,
+        })
+
+    def test_unhashable_domain(self):
+        from zope.i18nmessageid import stats
+        self._enable(sample_every=1)
+        line = sys._getframe().f_lineno + 2
+        for klass in (messageid.Message, messageid.pyMessage):
+            klass('testing', ['stats'])
+            klass('testing', {'other': 'stats'})
+        self.assertEqual(self._domains(), {
+            '<unhashable>': {'created': 4, 'copied': 0, 'mapping_wraps': 0,
+                             'pickled': 0, 'factory_calls': 0},
+        })
+        self.assertEqual(stats().call_sites, {
+            ('<unhashable>', __file__, line): 2,
+            ('<unhashable>', __file__, line + 1): 2,
+        })
+
+    def test_invalid_sample_every(self):
+        from zope.i18nmessageid import enable_stats
+        with self.assertRaises(ValueError):
+            enable_stats(-1)
+
+
+class ImportTimeTests(unittest.TestCase):
+
+    # The modules which importing the package may import.
+    ALLOWED = frozenset([
+        'zope',
+        'zope.i18nmessageid',
+        'zope.i18nmessageid.message',
+        'zope.i18nmessageid._zope_i18nmessageid_message',
+        # Without the C extension:
+        'zope.i18nmessageid._jitmessage',
+        'zope.i18nmessageid._pymessage',
+        'types',
+    ])
+    # A generous budget for the cumulative import time of the package, in
+    # microseconds: it usually takes about 1ms.
+    BUDGET = 50000
+
+    def _importtime(self, code):
+        import os
+        import subprocess
+        path = os.path.dirname(os.path.dirname(os.path.dirname(
+            messageid.__file__)))
+        env = dict(os.environ)
+        env['PYTHONPATH'] = os.pathsep.join(
+            filter(None, [path, env.get('PYTHONPATH')]))
+        output = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', code],
+            env=env, stderr=subprocess.PIPE, check=True, text=True).stderr
+        times = {}
+        for line in output.splitlines():
+            if not line.startswith('import time:') or 'cumulative' in line:
+                continue
+            _, cumulative, name = line[len('import time:'):].split('|')
+            times[name.strip()] = int(cumulative)
+        return times
+
+    def test_imported_modules(self):
+        baseline = self._importtime('pass')
+        times = self._importtime('import zope.i18nmessageid')
+        imported = set(times) - set(baseline)
+        self.assertIn('zope.i18nmessageid', imported)
+        self.assertLessEqual(imported, self.ALLOWED)
+
+    def test_budget(self):
+        times = self._importtime('import zope.i18nmessageid')
+        self.assertLess(times['zope.i18nmessageid'], self.BUDGET)
+
+    def test_lazy_attributes(self):
+        import zope.i18nmessageid
+        factory = zope.i18nmessageid.ZopeMessageFactory
+        self.assertIs(zope.i18nmessageid.ZopeMessageFactory, factory)
+        self.assertEqual(factory('testing').domain, 'zope')
+        self.assertEqual(messageid.pyMessage.__name__, 'Message')
+        self.assertEqual(messageid.pyMessage.__module__,
+                         'zope.i18nmessageid.message')
+        self.assertTrue(
+            issubclass(messageid.jitMessage, messageid.pyMessage))
+        self.assertEqual(messageid.CacheInfo._fields,
+                         ('hits', 'misses', 'evictions', 'maxsize',
+                          'currsize'))
+        self.assertIs(messageid.Stats, messageid.Stats)
+        with self.assertRaises(AttributeError):
+            messageid.unknown
+        with self.assertRaises(AttributeError):
+            zope.i18nmessageid.unknown
+
+
+class ExtractTests(unittest.TestCase):
+
+    SOURCE = """\
+from zope.i18nmessageid import MessageFactory as MF
+from zope.i18nmessageid import ZopeMessageFactory as _z
+import zope.i18nmessageid
+
+_ = MF('domain')
+P_ = zope.i18nmessageid.MessageFactory(domain='other')
+alias = _
+
+
+def view(count, name):
+    _('hello', 'Hello ' 'world', mapping={'name': _('nested')})
+    P_('apple', msgid_plural='apples', default_plural='Apples',
+       number=count)
+    _z(
+        'zope-message',  # a comment
+        default=None)
+    alias(ustr='aliased')
+    _(name)
+    _(f'{name}')
+    _(b'bytes')
+    view._('attribute')
+    unknown('unknown')
+"""
+
+    def setUp(self):
+        import tempfile
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.tmpdir = tmpdir.name
+
+    def _write(self, name, source):
+        import os
+        path = os.path.join(self.tmpdir, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(source)
+        return path
+
+    def test_extract_source(self):
+        from zope.i18nmessageid.extract import extract_source
+        self.assertEqual(list(extract_source(self.SOURCE, 'view.py')), [
+            ('view.py', 11,
+             ('hello', 'domain', 'Hello world', None, None, None)),
+            ('view.py', 11, ('nested', 'domain', None, None, None, None)),
+            ('view.py', 12,
+             ('apple', 'other', None, None, 'apples', 'Apples')),
+            ('view.py', 14,
+             ('zope-message', 'zope', None, None, None, None)),
+            ('view.py', 17, ('aliased', 'domain', None, None, None, None)),
+        ])
+
+    def test_records_make_messages(self):
+        from zope.i18nmessageid.extract import extract_source
+        messages = messageid.Message.from_records(
+            record for _, _, record in extract_source(self.SOURCE))
+        self.assertEqual(messages[2].msgid_plural, 'apples')
+        self.assertEqual(messages[3].domain, 'zope')
+
+    def test_factory_without_literal_domain(self):
+        from zope.i18nmessageid.extract import extract_source
+        source = "_ = MessageFactory(DOMAIN)\n_('message')\n"
+        self.assertEqual(list(extract_source(source)), [])
+
+    def test_invalid_source(self):
+        from zope.i18nmessageid.extract import extract_source
+        source = "_ = MessageFactory('domain')\n_('message')\n_('unclosed'"
+        # What could be tokenized is extracted.
+        self.assertEqual(list(extract_source(source))[:1], [
+            ('<string>', 2, ('message', 'domain', None, None, None, None)),
+        ])
+
+    def test_extract_file_encoding(self):
+        from zope.i18nmessageid.extract import extract_file
+        path = self._write('latin.py', '')
+        with open(path, 'wb') as f:
+            f.write(b"# -*- coding: latin-1 -*-\n"
+                    b"_ = MessageFactory('domain')\n"
+                    b"_('caf\xe9')\n")
+        self.assertEqual(list(extract_file(path)), [
+            (path, 3, ('caf\xe9', 'domain', None, None, None, None))])
+
+    def _makeTree(self):
+        return [
+            self._write('pkg/a.py', "_ = MessageFactory('a')\n_('one')\n"),
+            self._write('pkg/b.py', "_ = MessageFactory('b')\n_('two')\n"),
+            self._write('pkg/sub/c.py',
+                        "_ = MessageFactory('c')\n_('three')\n"),
+            self._write('pkg/README.txt', "_('not python')\n"),
+        ]
+
+    def test_extract(self):
+        from zope.i18nmessageid.extract import extract
+        a, b, c, _ = self._makeTree()
+        expected = [
+            (a, 2, ('one', 'a', None, None, None, None)),
+            (b, 2, ('two', 'b', None, None, None, None)),
+            (c, 2, ('three', 'c', None, None, None, None)),
+        ]
+        self.assertEqual(list(extract([self.tmpdir], processes=0)),
+                         expected)
+        self.assertEqual(list(extract([c, a], processes=0)),
+                         [expected[2], expected[0]])
+
+    def test_extract_processes(self):
+        from unittest import mock
+
+        from zope.i18nmessageid import extract as module
+        self._makeTree()
+        expected = list(module.extract([self.tmpdir], processes=0))
+        with mock.patch.object(module, '_PARALLEL_MIN_SIZE', 0):
+            self.assertEqual(list(module.extract([self.tmpdir], processes=2)),
+                             expected)
+
+    def test_extract_small_files_serially(self):
+        from unittest import mock
+
+        from zope.i18nmessageid import extract as module
+        self._makeTree()
+        with mock.patch('concurrent.futures.ProcessPoolExecutor') as pool:
+            list(module.extract([self.tmpdir], processes=2))
+            with mock.patch.object(module, '_PARALLEL_MIN_SIZE', 0):
+                # A single process, or a single file, is not worth it.
+                list(module.extract([self.tmpdir], processes=1))
+                list(module.extract([self._makeTree()[0]], processes=2))
+        pool.assert_not_called()
+
+    def test_extract_processes_capped_by_files(self):
+        from unittest import mock
+
+        from zope.i18nmessageid import extract as module
+        self._makeTree()
+        with mock.patch.object(module, '_PARALLEL_MIN_SIZE', 0), \
+                mock.patch('concurrent.futures.ProcessPoolExecutor') as pool:
+            pool.return_value.__enter__.return_value.map = (
+                lambda function, filenames, chunksize: map(function,
+                                                           filenames))
+            list(module.extract([self.tmpdir], processes=64))
+        pool.assert_called_once_with(3)
+
+    def test_extract_falls_back_to_serial(self):
+        from concurrent.futures.process import BrokenProcessPool
+        from unittest import mock
+
+        from zope.i18nmessageid import extract as module
+        self._makeTree()
+        expected = list(module.extract([self.tmpdir], processes=0))
+
+        def broken(function, filenames, chunksize):
+            # The first file is extracted before the workers die.
+            yield function(filenames[0])
+            raise BrokenProcessPool('worker died')
+
+        for error in (OSError, NotImplementedError):
+            with mock.patch.object(module, '_PARALLEL_MIN_SIZE', 0), \
+                    mock.patch('concurrent.futures.ProcessPoolExecutor',
+                               side_effect=error):
+                self.assertEqual(
+                    list(module.extract([self.tmpdir], processes=2)),
+                    expected)
+        with mock.patch.object(module, '_PARALLEL_MIN_SIZE', 0), \
+                mock.patch('concurrent.futures.ProcessPoolExecutor') as pool:
+            pool.return_value.__enter__.return_value.map = broken
+            self.assertEqual(list(module.extract([self.tmpdir], processes=2)),
+                             expected)
+
+    def test_extract_cache(self):
+        import os
+        from unittest import mock
+
+        from zope.i18nmessageid import extract as module
+        a, b, c, _ = self._makeTree()
+        cache = os.path.join(self.tmpdir, 'cache.json')
+        expected = list(module.extract([self.tmpdir], 0, cache))
+        self.assertTrue(os.path.exists(cache))
+        with mock.patch.object(module, 'extract_file') as extract_file:
+            self.assertEqual(list(module.extract([self.tmpdir], 0, cache)),
+                             expected)
+        extract_file.assert_not_called()
+        # Only the changed file is extracted again.
+        self._write('pkg/b.py', "_ = MessageFactory('b')\n\n_('four')\n")
+        stat = os.stat(b)
+        os.utime(b, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        with mock.patch.object(module, 'extract_file',
+                               wraps=module.extract_file) as extract_file:
+            found = list(module.extract([self.tmpdir], 0, cache))
+        extract_file.assert_called_once_with(b)
+        self.assertEqual(found[1], (b, 3, ('four', 'b', None, None, None,
+                                           None)))
+        self.assertEqual(found[::2], expected[::2])
+
+    def test_extract_invalid_cache(self):
+        import os
+
+        from zope.i18nmessageid.extract import extract
+        self._makeTree()
+        cache = os.path.join(self.tmpdir, 'cache.json')
+        expected = list(extract([self.tmpdir], 0))
+        for data in ('not json', '{"format": 0}'):
+            with open(cache, 'w') as f:
+                f.write(data)
+            self.assertEqual(list(extract([self.tmpdir], 0, cache)),
+                             expected)
+
 
 def test_suite():
     return unittest.TestSuite((